@@ -0,0 +1,85 @@
+# bench_backends.py
+# Compara la latencia por frame y las asignaciones de memoria del wrapper de ultralytics
+# frente a OnnxPersonModel (onnxruntime directo), sobre el mismo modelo ONNX.
+#
+#   python camara/bench_backends.py --model yolo11n.onnx [--imagen sala.jpg] [--threads 4]
+#
+# Las asignaciones se miden con tracemalloc (pico de memoria asignada durante una llamada):
+# cubre objetos Python y arrays NumPy, no la memoria interna de torch ni de onnxruntime.
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import cv2
+
+from postproceso import PERSON_CLASS, boxes_to_numpy, filtrar_personas
+
+
+def cargar_frame(path):
+    if path:
+        frame = cv2.imread(path)
+        if frame is None:
+            raise SystemExit(f"No se pudo leer la imagen {path}")
+        return cv2.resize(frame, (640, 480))
+    return np.random.default_rng(0).integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+
+
+def medir(fn, iteraciones, warmup=5):
+    for _ in range(warmup):
+        fn()
+
+    latencias = np.empty(iteraciones)
+    for i in range(iteraciones):
+        t0 = time.perf_counter()
+        fn()
+        latencias[i] = time.perf_counter() - t0
+
+    # Memoria asignada por llamada (pico transitorio), en una pasada aparte para no
+    # distorsionar los tiempos
+    tracemalloc.start()
+    picos = []
+    for _ in range(10):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        picos.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return latencias * 1e3, np.median(picos) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ultralytics vs onnxruntime")
+    parser.add_argument("--model", default="yolo11n.onnx")
+    parser.add_argument("--imagen", default=None, help="imagen de prueba (por defecto, ruido)")
+    parser.add_argument("--iteraciones", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=0, help="hilos intra-op de onnxruntime")
+    args = parser.parse_args()
+
+    frame = cargar_frame(args.imagen)
+    backends = {}
+
+    try:
+        from ultralytics import YOLO
+        yolo = YOLO(args.model)
+
+        def run_ultralytics():
+            results = yolo(frame, verbose=False, classes=[PERSON_CLASS], conf=0.5)
+            return filtrar_personas(boxes_to_numpy(results[0].boxes), 0.5)
+        backends["ultralytics"] = run_ultralytics
+    except ImportError:
+        print("ultralytics no disponible, se omite")
+
+    from onnx_backend import OnnxPersonModel
+    ort_model = OnnxPersonModel(args.model, conf_threshold=0.5, intra_op_threads=args.threads)
+    backends["onnxruntime"] = lambda: ort_model.predict([frame])[0]
+
+    print(f"{'backend':>12} | {'media (ms)':>10} | {'p50':>7} | {'p95':>7} | {'p99':>7} | {'KB asignados/frame':>18}")
+    print("-" * 77)
+    for nombre, fn in backends.items():
+        lat, kb = medir(fn, args.iteraciones)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        print(f"{nombre:>12} | {lat.mean():>10.2f} | {p50:>7.2f} | {p95:>7.2f} | {p99:>7.2f} | {kb:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
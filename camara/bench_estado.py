@@ -0,0 +1,170 @@
+# bench_estado.py
+# Generador de carga para /estado: cientos de clientes haciendo polling con conexiones
+# keep-alive mientras un escritor cambia el estado, como haría el detector.
+#
+#   python camara/bench_estado.py --servidor flask --clientes 200 --duracion 10
+#   python camara/bench_estado.py --servidor async --clientes 500 --procesos 4
+#   python camara/bench_estado.py --url http://192.168.1.20:5000/estado   # servidor ya en marcha
+#
+# Con --servidor se arranca un DetectionServer local en un proceso aparte (sin cámaras ni
+# modelo) para que los clientes no compitan por el GIL con él. Los clientes se reparten
+# entre --procesos procesos, cada uno con un event loop propio.
+import time
+import socket
+import asyncio
+import argparse
+import multiprocessing as mp
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+# ------------------ Servidor local ------------------
+def _servidor_local(modo, port, escrituras_hz):
+    import logging
+    from threading import Thread
+    from deteccion_server import DetectionServer
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = DetectionServer(host="127.0.0.1", port=port)
+    if modo == "async":
+        from servidor_async import AsyncDetectionServer
+        http = AsyncDetectionServer(server)
+    else:
+        http = server
+    Thread(target=http.run, daemon=True).start()
+
+    # Escritor: alterna la presencia como lo haría el detector
+    personas = False
+    while True:
+        time.sleep(1.0 / escrituras_hz if escrituras_hz > 0 else 3600)
+        personas = not personas
+        server.procesar_mensaje(personas, time.time())
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_servidor(host, port, timeout=10.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit(f"El servidor no respondió en {host}:{port}")
+
+
+# ------------------ Clientes ------------------
+async def _leer_respuesta(reader):
+    """Lee una respuesta HTTP/1.x; devuelve (estado, keep_alive)."""
+    cabecera = await reader.readuntil(b"\r\n\r\n")
+    lineas = cabecera.decode("latin-1").split("\r\n")
+    estado = int(lineas[0].split()[1])
+    headers = {k.strip().lower(): v.strip().lower()
+               for k, _, v in (l.partition(":") for l in lineas[1:] if l)}
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+        keep_alive = headers.get("connection") != "close" and not lineas[0].startswith("HTTP/1.0")
+    else:
+        await reader.read()  # sin longitud: el cuerpo termina al cerrar la conexión
+        keep_alive = False
+    return estado, keep_alive
+
+
+async def _cliente(host, port, path, fin, intervalo, latencias, errores):
+    peticion = f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n".encode()
+    reader = writer = None
+    while time.monotonic() < fin:
+        t0 = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(peticion)
+            estado, keep_alive = await _leer_respuesta(reader)
+            latencias.append(time.perf_counter() - t0)
+            if estado != 200:
+                errores[0] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError):
+            errores[0] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+        if intervalo > 0:
+            await asyncio.sleep(intervalo)
+    if writer is not None:
+        writer.close()
+
+
+def _proceso_clientes(host, port, path, clientes, duracion, intervalo):
+    async def correr():
+        latencias, errores = [], [0]
+        fin = time.monotonic() + duracion
+        await asyncio.gather(*(_cliente(host, port, path, fin, intervalo, latencias, errores)
+                               for _ in range(clientes)))
+        return latencias, errores[0]
+    latencias, errores = asyncio.run(correr())
+    return np.asarray(latencias), errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de polling concurrente sobre /estado")
+    parser.add_argument("--servidor", choices=["flask", "async"], default=None,
+                        help="arranca un DetectionServer local con ese núcleo HTTP")
+    parser.add_argument("--url", default=None, help="endpoint externo (si no se usa --servidor)")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--procesos", type=int, default=max(1, min(4, mp.cpu_count() // 2)))
+    parser.add_argument("--duracion", type=float, default=10.0)
+    parser.add_argument("--intervalo", type=float, default=0.0,
+                        help="pausa entre peticiones de cada cliente (0: sin pausa, carga máxima)")
+    parser.add_argument("--escrituras-hz", type=float, default=2.0,
+                        help="cambios de estado por segundo del servidor local")
+    args = parser.parse_args()
+
+    servidor = None
+    if args.servidor:
+        host, port, path = "127.0.0.1", _puerto_libre(), "/estado"
+        servidor = mp.Process(target=_servidor_local, args=(args.servidor, port, args.escrituras_hz),
+                              daemon=True)
+        servidor.start()
+    elif args.url:
+        url = urlsplit(args.url)
+        host, port, path = url.hostname, url.port or 80, url.path or "/estado"
+    else:
+        raise SystemExit("Indica --servidor flask|async o --url")
+
+    try:
+        _esperar_servidor(host, port)
+        reparto = [args.clientes // args.procesos + (i < args.clientes % args.procesos)
+                   for i in range(args.procesos)]
+        with mp.Pool(args.procesos) as pool:
+            partes = pool.starmap(_proceso_clientes, [(host, port, path, n, args.duracion, args.intervalo)
+                                                      for n in reparto if n > 0])
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+
+    ms = np.concatenate([lat for lat, _ in partes]) * 1e3
+    errores = sum(e for _, e in partes)
+    if ms.size == 0:
+        raise SystemExit(f"Ninguna petición completada ({errores} errores)")
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"\n{args.servidor or args.url}: {args.clientes} clientes en {args.procesos} procesos, "
+          f"{args.duracion:.0f}s")
+    print(f"{'peticiones':>10} | {'req/s':>8} | {'errores':>7} | {'p50':>7} | {'p95':>7} | {'p99':>7} | "
+          f"{'máx':>7}  (ms)")
+    print("-" * 78)
+    print(f"{ms.size:>10} | {ms.size / args.duracion:>8.0f} | {errores:>7} | {p50:>7.2f} | {p95:>7.2f} | "
+          f"{p99:>7.2f} | {ms.max():>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# bench_multicam.py
+# Benchmark de inferencia multi-cámara: FPS por cámara al crecer el nº de cámaras N,
+# infiriendo los N frames en un solo lote frente a N llamadas independientes al modelo.
+#
+#   python camara/bench_multicam.py --model yolo11n.onnx --max-cams 4 [--imagen sala.jpg]
+#
+# Para lotes > 1 con ONNX, exportar el modelo con batch dinámico:
+#   yolo export model=yolo11n.pt format=onnx dynamic=True
+import time
+import argparse
+import numpy as np
+import cv2
+from ultralytics import YOLO
+
+from postproceso import PERSON_CLASS
+
+
+def cargar_frame(path):
+    if path:
+        frame = cv2.imread(path)
+        if frame is None:
+            raise SystemExit(f"No se pudo leer la imagen {path}")
+        return cv2.resize(frame, (640, 480))
+    return np.random.default_rng(0).integers(0, 255, size=(480, 640, 3), dtype=np.uint8)
+
+
+def medir(fn, iteraciones, warmup=3):
+    for _ in range(warmup):
+        fn()
+    t0 = time.perf_counter()
+    for _ in range(iteraciones):
+        fn()
+    return (time.perf_counter() - t0) / iteraciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia multi-cámara")
+    parser.add_argument("--model", default="yolo11n.onnx")
+    parser.add_argument("--max-cams", type=int, default=4)
+    parser.add_argument("--iteraciones", type=int, default=30)
+    parser.add_argument("--imagen", default=None, help="imagen de prueba (por defecto, ruido)")
+    args = parser.parse_args()
+
+    model = YOLO(args.model)
+    frame = cargar_frame(args.imagen)
+    kwargs = dict(verbose=False, classes=[PERSON_CLASS], conf=0.5)
+
+    print(f"{'cámaras':>7} | {'lote (ms/tick)':>14} | {'FPS/cám lote':>12} | "
+          f"{'secuencial (ms/tick)':>20} | {'FPS/cám secuencial':>18}")
+    print("-" * 86)
+    for n in range(1, args.max_cams + 1):
+        frames = [frame.copy() for _ in range(n)]
+
+        t_lote = medir(lambda: model(frames, **kwargs), args.iteraciones)
+        t_seq = medir(lambda: [model(f, **kwargs) for f in frames], args.iteraciones)
+
+        # Cada tick procesa un frame de cada cámara: FPS por cámara = 1 / tiempo del tick
+        print(f"{n:>7} | {t_lote * 1e3:>14.1f} | {1 / t_lote:>12.1f} | "
+              f"{t_seq * 1e3:>20.1f} | {1 / t_seq:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
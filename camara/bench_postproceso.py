@@ -0,0 +1,95 @@
+# bench_postproceso.py
+# Micro-benchmark del post-proceso de cajas: bucle por caja (versión anterior)
+# contra el filtrado vectorizado de postproceso.py, en función del nº de cajas.
+#
+#   python camara/bench_postproceso.py [--repeticiones 2000]
+import time
+import argparse
+import numpy as np
+
+from postproceso import boxes_to_numpy, filtrar_personas
+
+try:
+    import torch
+except ImportError:  # sin torch medimos sobre arrays NumPy
+    torch = None
+
+
+class FakeBox:
+    """Imita una caja individual de ultralytics (cls/conf escalares, xyxy con forma (1, 4))."""
+    def __init__(self, row):
+        self.xyxy = row[None, :4]
+        self.conf = row[4]
+        self.cls = row[5]
+
+
+class FakeBoxes:
+    """Imita `result.boxes`: expone `.data` (N, 6) y es iterable caja a caja."""
+    def __init__(self, data):
+        self.data = data
+
+    def __iter__(self):
+        for row in self.data:
+            yield FakeBox(row)
+
+
+def generar_cajas(n, rng):
+    data = np.zeros((n, 6), dtype=np.float32)
+    xy = rng.uniform(0, 600, size=(n, 2))
+    data[:, 0:2] = xy
+    data[:, 2:4] = xy + rng.uniform(10, 200, size=(n, 2))
+    data[:, 4] = rng.uniform(0.1, 1.0, size=n)
+    data[:, 5] = rng.integers(0, 3, size=n)  # mezcla de personas y otras clases
+    if torch is not None:
+        return FakeBoxes(torch.from_numpy(data))
+    return FakeBoxes(data)
+
+
+def filtro_bucle(boxes, conf_threshold):
+    """Versión anterior: conversión tensor -> Python por caja y atributo."""
+    kept = []
+    for box in boxes:
+        try:
+            cls = int(box.cls)
+            conf = float(box.conf)
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+        except Exception:
+            continue
+        if cls == 0 and conf >= conf_threshold:
+            kept.append((x1, y1, x2, y2, conf))
+    return kept
+
+
+def filtro_vectorizado(boxes, conf_threshold):
+    return filtrar_personas(boxes_to_numpy(boxes), conf_threshold)
+
+
+def medir(fn, boxes, repeticiones, conf_threshold=0.5):
+    fn(boxes, conf_threshold)  # calentamiento
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        fn(boxes, conf_threshold)
+    return (time.perf_counter() - t0) / repeticiones * 1e6  # µs por frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de post-proceso de cajas")
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    backend = "torch" if torch is not None else "numpy"
+    print(f"Tensores: {backend}")
+    print(f"{'cajas':>6} | {'bucle (µs)':>11} | {'vectorizado (µs)':>16} | {'speedup':>7}")
+    print("-" * 50)
+    for n in (0, 1, 5, 10, 25, 50, 100, 300):
+        boxes = generar_cajas(n, rng)
+        # Ambas versiones deben quedarse con las mismas personas
+        assert len(filtro_bucle(boxes, 0.5)) == len(filtro_vectorizado(boxes, 0.5))
+        t_bucle = medir(filtro_bucle, boxes, args.repeticiones)
+        t_vec = medir(filtro_vectorizado, boxes, args.repeticiones)
+        print(f"{n:>6} | {t_bucle:>11.1f} | {t_vec:>16.1f} | {t_bucle / t_vec:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
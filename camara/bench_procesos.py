@@ -0,0 +1,116 @@
+# bench_procesos.py
+# Latencia de /estado mientras el detector infiere: detector en un hilo del mismo proceso
+# que Flask (modo clásico) frente a captura y detección en procesos propios (--procesos).
+#
+#   python camara/bench_procesos.py --source clip_largo.mp4 --backend onnxruntime \
+#       [--clientes 50] [--duracion 10] [--realtime]
+#
+# Cada modo se mide en un proceso nuevo. Los clientes (los de bench_estado.py) corren en
+# procesos aparte para no sumar su propio consumo de GIL. La fuente debe durar al menos
+# --duracion segundos (o ser una cámara); también se reporta los FPS del detector
+# durante la medición, para ver cuánto lo frena la carga HTTP.
+import re
+import time
+import argparse
+import multiprocessing as mp
+from threading import Thread
+
+import numpy as np
+
+from bench_estado import _proceso_clientes, _puerto_libre
+
+
+def _frames(metrics):
+    m = re.search(r"^deteccion_frames_total (\d+)", metrics.render(), re.MULTILINE)
+    return int(m.group(1)) if m else 0
+
+
+def _medir(modo, args, resultados):
+    import logging
+    from deteccion_server import DetectionServer, PersonDetector
+    from metricas import PrometheusMetrics
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    port = _puerto_libre()
+    metrics = PrometheusMetrics()
+    server = DetectionServer(host="127.0.0.1", port=port, metrics=metrics)
+    Thread(target=server.run, daemon=True).start()
+
+    kwargs = dict(headless=True, backend=args.backend, model_path=args.model, imgsz=args.imgsz,
+                  ort_threads=args.threads)
+    cam = int(args.source) if args.source.isdigit() else args.source
+    if modo == "procesos":
+        from procesos import DetectorProcesos
+        workers = DetectorProcesos(server, [cam], kwargs, replay_realtime=args.realtime,
+                                   metricas_interval=0.5)
+        workers.start()
+        detector = Thread(target=workers.run, daemon=True)
+    else:
+        workers = None
+        detector = Thread(target=PersonDetector(cam_index=[cam], server=server, metrics=metrics,
+                                                replay_realtime=args.realtime, **kwargs).run,
+                          daemon=True)
+    detector.start()
+
+    # Medir solo con el detector ya inferiendo
+    while not server.detector_listo:
+        time.sleep(0.1)
+    time.sleep(1.0)
+
+    reparto = [args.clientes // args.procesos_clientes + (i < args.clientes % args.procesos_clientes)
+               for i in range(args.procesos_clientes)]
+    f0 = _frames(metrics)
+    with mp.get_context("spawn").Pool(args.procesos_clientes) as pool:
+        partes = pool.starmap(_proceso_clientes, [("127.0.0.1", port, "/estado", n, args.duracion, args.intervalo)
+                                                  for n in reparto if n > 0])
+    fps = (_frames(metrics) - f0) / args.duracion
+    if not detector.is_alive():
+        print(f"⚠️ [{modo}] la fuente terminó antes que la medición: usa un clip más largo o --realtime")
+
+    ms = np.concatenate([lat for lat, _ in partes]) * 1e3
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    resultados.put({"modo": modo, "peticiones": int(ms.size), "rps": ms.size / args.duracion,
+                    "errores": sum(e for _, e in partes), "p50": p50, "p95": p95, "p99": p99,
+                    "max": float(ms.max()), "fps_detector": fps})
+    if workers is not None:
+        workers.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/estado p99 con el detector en hilo vs en procesos")
+    parser.add_argument("--source", required=True, help="vídeo, carpeta de imágenes o índice de cámara")
+    parser.add_argument("--realtime", action="store_true", help="reproducir al ritmo del vídeo")
+    parser.add_argument("--backend", choices=["ultralytics", "onnxruntime"], default="onnxruntime")
+    parser.add_argument("--model", default="yolo11n.onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--procesos-clientes", type=int, default=2)
+    parser.add_argument("--duracion", type=float, default=10.0)
+    parser.add_argument("--intervalo", type=float, default=0.01,
+                        help="pausa entre peticiones de cada cliente (s)")
+    parser.add_argument("--modos", nargs="+", choices=["hilo", "procesos"], default=["hilo", "procesos"])
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    filas = []
+    for modo in args.modos:
+        cola = ctx.Queue()
+        p = ctx.Process(target=_medir, args=(modo, args, cola), name=f"bench-{modo}")
+        p.start()
+        filas.append(cola.get())
+        p.join(timeout=10)
+        if p.is_alive():
+            p.terminate()
+
+    print(f"\n/estado con {args.clientes} clientes durante {args.duracion:.0f}s, detector sobre {args.source}")
+    print(f"{'modo':>9} | {'req/s':>7} | {'errores':>7} | {'p50':>7} | {'p95':>7} | {'p99':>7} | {'máx':>7} | "
+          f"{'FPS det.':>8}")
+    print("-" * 80)
+    for r in filas:
+        print(f"{r['modo']:>9} | {r['rps']:>7.0f} | {r['errores']:>7} | {r['p50']:>7.2f} | {r['p95']:>7.2f} | "
+              f"{r['p99']:>7.2f} | {r['max']:>7.2f} | {r['fps_detector']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_seguimiento.py
+# Compara el CPU consumido por YOLO en cada frame frente al modo detectar-y-seguir
+# (PersonTracker) sobre la misma grabación, sobre todo mientras hay alguien en escena.
+#
+#   python camara/bench_seguimiento.py --source clip_con_persona.mp4 --track 10 \
+#       [--backend ultralytics] [--model yolo11n.onnx]
+#
+# El CPU se mide con time.process_time(): incluye los hilos internos de torch/onnxruntime.
+# "Presente" son los frames en los que YOLO, ejecutado en todos los frames, ve a alguien;
+# la coincidencia indica en cuántos de ellos el modo con seguimiento también mantuvo la evidencia.
+import time
+import argparse
+
+import numpy as np
+
+from captura import FileSource
+from evaluar_variantes import crear_predictor
+from seguimiento import PersonTracker
+
+
+def leer_frames(path):
+    source = FileSource(path)
+    if not source.isOpened():
+        raise SystemExit(f"No se pudo abrir la fuente {path}")
+    frames = []
+    while True:
+        ts = source.timestamp()
+        ok, frame = source.read()
+        if not ok:
+            break
+        frames.append((ts, frame))
+    source.release()
+    return frames
+
+
+def solo_yolo(predecir, frames):
+    presencia, cpu = [], []
+    for _, frame in frames:
+        t0 = time.process_time()
+        presencia.append(len(predecir(frame)) > 0)
+        cpu.append(time.process_time() - t0)
+    return np.asarray(presencia), np.asarray(cpu)
+
+
+def con_seguimiento(predecir, frames, tracker):
+    presencia, cpu = [], []
+    for ts, frame in frames:
+        t0 = time.process_time()
+        if tracker.should_detect(ts):
+            boxes = predecir(frame)
+            tracker.start(frame, boxes, ts)
+            presente = len(boxes) > 0
+        else:
+            presente, _ = tracker.update(frame)
+        cpu.append(time.process_time() - t0)
+        presencia.append(presente)
+    return np.asarray(presencia), np.asarray(cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU de YOLO en cada frame vs detectar-y-seguir")
+    parser.add_argument("--source", required=True, help="vídeo o carpeta de imágenes")
+    parser.add_argument("--backend", choices=["ultralytics", "onnxruntime"], default="onnxruntime")
+    parser.add_argument("--model", default="yolo11n.onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--track", type=int, default=10, help="re-detección cada N frames")
+    parser.add_argument("--max-interval", type=float, default=1.0, help="re-detección como máximo cada X s")
+    args = parser.parse_args()
+
+    frames = leer_frames(args.source)
+    predecir = crear_predictor(args.backend, args.model, args.imgsz, args.conf, args.threads)
+    for _ in range(3):
+        predecir(frames[0][1])  # warm-up
+
+    base, cpu_base = solo_yolo(predecir, frames)
+    tracker = PersonTracker(redetect_every=args.track, max_interval=args.max_interval)
+    seg, cpu_seg = con_seguimiento(predecir, frames, tracker)
+
+    print(f"\n{len(frames)} frames, {base.sum()} con persona según YOLO en cada frame; "
+          f"{tracker.tracked_ratio():.0%} de frames sin YOLO con --track {args.track}")
+    print(f"{'frames':>14} | {'YOLO (ms CPU)':>13} | {'seguir (ms CPU)':>15} | {'ahorro':>6}")
+    print("-" * 58)
+    for nombre, sel in (("con persona", base), ("sin persona", ~base), ("todos", np.ones_like(base))):
+        if not sel.any():
+            continue
+        a, b = cpu_base[sel].mean() * 1e3, cpu_seg[sel].mean() * 1e3
+        print(f"{nombre:>14} | {a:>13.2f} | {b:>15.2f} | {1 - b / a if a > 0 else 0.0:>6.0%}")
+    if base.any():
+        print(f"Coincidencia en frames con persona: {seg[base].mean():.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmark.py
+# Reproduce un vídeo o una carpeta de imágenes a través de PersonDetector, sin GUI,
+# y reporta FPS, latencia p50/p95/p99 por etapa y las transiciones de estado.
+#
+#   python camara/benchmark.py --source clip.mp4 [--realtime] [--backend onnxruntime]
+#                              [--motion-gate] [--presence-filter 5 3 5] [--roi] [--out resultados.json]
+#
+# Con --presence-filter se hace además una pasada sin filtro sobre la misma fuente y se
+# reportan las transiciones y los mensajes al servidor (POST en despliegue remoto) ahorrados.
+import json
+import time
+import argparse
+import logging
+import platform
+from datetime import datetime
+
+from deteccion_server import PersonDetector
+from metricas import LatencyRecorder
+from movimiento import MotionGate
+from suavizado import PresenceFilter
+from planificador import FrameRateGovernor
+from roi import RoiSelector
+
+logger = logging.getLogger(__name__)
+
+
+class TransitionRecorder:
+    """
+    Ocupa el lugar de DetectionServer: registra cada mensaje del detector
+    en vez de publicarlo. Las transiciones se fechan en segundos desde el inicio.
+    """
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.t0 = time.monotonic()
+        self.mensajes = 0
+        self.transiciones = []
+        self._estado = None
+
+    def procesar_mensaje(self, personas_detectadas, timestamp, camaras=None, traza=None):
+        self.mensajes += 1
+        if personas_detectadas != self._estado:
+            self._estado = personas_detectadas
+            self.transiciones.append({
+                "t": round(time.monotonic() - self.t0, 3),
+                "frame": self.metrics.counters["frames"],
+                "personas_presentes": personas_detectadas,
+            })
+
+
+def ejecutar(args, presence_filter=None):
+    """Una pasada completa del detector sobre la fuente; devuelve el diccionario de resultados."""
+    metrics = LatencyRecorder()
+    recorder = TransitionRecorder(metrics)
+    detector = PersonDetector(
+        cam_index=args.source,
+        no_persons_grace=args.grace,
+        conf_threshold=args.conf,
+        headless=True,
+        server=recorder,
+        motion_gate=MotionGate() if args.motion_gate else None,
+        presence_filter=presence_filter,
+        governor=FrameRateGovernor(args.fps, args.fps_incierto, args.cpu_budget) if args.fps else None,
+        roi=RoiSelector(imgsz=args.roi_imgsz, model_path=args.roi_model) if args.roi else None,
+        backend=args.backend,
+        model_path=args.model,
+        imgsz=args.imgsz,
+        ort_threads=args.threads,
+        replay_realtime=args.realtime,
+        metrics=metrics,
+    )
+
+    recorder.t0 = t0 = time.monotonic()
+    detector.run()
+    duracion = time.monotonic() - t0
+
+    frames = metrics.counters["frames"]
+    return {
+        "arranque_s": detector.startup_times,
+        "frames": frames,
+        "frames_inferidos": metrics.counters["frames_inferidos"],
+        "duracion_s": duracion,
+        "fps": frames / duracion if duracion > 0 else 0.0,
+        "etapas": metrics.resumen(),
+        "gauges": dict(metrics.gauges),
+        "mensajes_servidor": recorder.mensajes,
+        "transiciones": recorder.transiciones,
+        "captura": detector.grabbers.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline de detección")
+    parser.add_argument("--source", nargs="+", required=True,
+                        help="vídeo(s) o carpeta(s) de imágenes; varias fuentes se infieren en lote")
+    parser.add_argument("--realtime", action="store_true",
+                        help="reproducir al ritmo del vídeo (por defecto, lo más rápido posible)")
+    parser.add_argument("--backend", choices=["ultralytics", "onnxruntime"], default="ultralytics")
+    parser.add_argument("--model", default="yolo11n.onnx")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--grace", type=float, default=10.0, help="no_persons_grace (s)")
+    parser.add_argument("--motion-gate", action="store_true")
+    parser.add_argument("--presence-filter", type=int, nargs=3, metavar=("N", "K_ON", "K_OFF"), default=None,
+                        help="filtro k-de-n; se compara contra una pasada sin filtro")
+    parser.add_argument("--roi", action="store_true", help="inferencia sobre recorte tras cada detección")
+    parser.add_argument("--roi-imgsz", type=int, default=320)
+    parser.add_argument("--roi-model", default=None)
+    parser.add_argument("--fps", type=float, default=None, help="FPS objetivo estable (usar con --realtime)")
+    parser.add_argument("--fps-incierto", type=float, default=15.0)
+    parser.add_argument("--cpu-budget", type=float, default=None)
+    parser.add_argument("--out", default=None, help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "maquina": {"cpu": platform.processor() or platform.machine(), "python": platform.python_version()},
+        "config": vars(args),
+    }
+    if args.presence_filter:
+        sin_filtro = ejecutar(args)
+        resultados.update(ejecutar(args, PresenceFilter(*args.presence_filter)))
+        resultados["sin_filtro"] = {k: sin_filtro[k] for k in ("mensajes_servidor", "transiciones")}
+    else:
+        resultados.update(ejecutar(args))
+
+    print(f"\n{resultados['frames']} frames en {resultados['duracion_s']:.1f}s -> {resultados['fps']:.1f} FPS")
+    print(f"{'etapa':>13} | {'n':>6} | {'media':>7} | {'p50':>7} | {'p95':>7} | {'p99':>7}  (ms)")
+    print("-" * 64)
+    for nombre, e in resultados["etapas"].items():
+        print(f"{nombre:>13} | {e['n']:>6} | {e['media_ms']:>7.2f} | {e['p50_ms']:>7.2f} | "
+              f"{e['p95_ms']:>7.2f} | {e['p99_ms']:>7.2f}")
+    print(f"Transiciones de estado: {len(resultados['transiciones'])}")
+    if args.fps:
+        g = resultados["gauges"]
+        print(f"Governor: {g.get('fps_logrado', 0.0):.1f} FPS logrados, último objetivo {g.get('fps_objetivo', 0.0):g}")
+    if args.presence_filter:
+        base = resultados["sin_filtro"]
+        ahorro_t = len(base["transiciones"]) - len(resultados["transiciones"])
+        ahorro_m = base["mensajes_servidor"] - resultados["mensajes_servidor"]
+        print(f"Filtro {' '.join(map(str, args.presence_filter))}: {ahorro_t} transiciones y "
+              f"{ahorro_m} mensajes al servidor menos que sin filtro "
+              f"({len(base['transiciones'])} / {base['mensajes_servidor']})")
+
+    out = args.out or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(out, "w") as f:
+        json.dump(resultados, f, indent=2)
+    print(f"Resultados guardados en {out}")
+
+
+if __name__ == "__main__":
+    main()
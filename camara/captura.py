@@ -0,0 +1,269 @@
+# captura.py
+import os
+import time
+import logging
+from threading import Thread, Condition
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Captura en hilo (buffer de un slot) ------------------
+class FrameGrabber:
+    """
+    Lee la cámara en un hilo dedicado y conserva solo el frame más reciente.
+    Como la inferencia es más lenta que la cámara, leer en el mismo hilo que YOLO
+    hace que el buffer interno de OpenCV se llene y se procesen frames viejos;
+    aquí los frames que nadie llegó a consumir se sobrescriben y se cuentan como descartados.
+    """
+    def __init__(self, cap, name="captura", cond=None, lockstep=False, metrics=None):
+        self.cap = cap
+        self.name = name
+        # lockstep: no leer el siguiente frame hasta que se consuma el actual (replays sin pérdidas)
+        self.lockstep = lockstep
+        self.metrics = metrics
+
+        # Con varias cámaras, todos los grabbers comparten la Condition del grupo
+        self._cond = cond if cond is not None else Condition()
+        self._frame = None
+        self._timestamp = 0.0       # time.monotonic() del momento de captura
+        self._seq = 0               # frames capturados
+        self._consumed_seq = 0      # último frame entregado a la inferencia
+
+        # Contadores
+        self.dropped_frames = 0     # frames sobrescritos sin haber sido consumidos
+        self.read_errors = 0
+        self.eof = False            # fin de una fuente grabada
+
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self._thread = Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        is_file = isinstance(self.cap, FileSource)
+        while self.running:
+            if self.lockstep:
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._has_new() or not self.running)
+
+            t0 = time.perf_counter()
+            ret, frame = self.cap.read()
+            # Las fuentes grabadas dan su propio reloj (tiempo del vídeo al reproducir sin pausa)
+            ts = self.cap.timestamp() if is_file else time.monotonic()
+            if not ret:
+                with self._cond:
+                    if is_file:
+                        self.eof = True
+                        self._cond.notify_all()
+                        return
+                    self.read_errors += 1
+                time.sleep(0.05)
+                continue
+            if self.metrics is not None:
+                self.metrics.observe("captura", time.perf_counter() - t0)
+
+            # cap.read() devuelve un array nuevo en cada llamada, así que podemos
+            # entregar la referencia sin copiar.
+            with self._cond:
+                if self._seq > self._consumed_seq:
+                    self.dropped_frames += 1
+                    if self.metrics is not None:
+                        self.metrics.incr("frames_descartados")
+                self._frame = frame
+                self._timestamp = ts
+                self._seq += 1
+                self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Espera un frame que no se haya entregado antes y devuelve (ok, frame, timestamp).
+        Si no llega ninguno en `timeout` segundos devuelve (False, None, None).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._has_new() or not self.running, timeout)
+            if not self._has_new():
+                return False, None, None
+            return (True,) + self._take()
+
+    def _has_new(self):
+        # Llamar con self._cond tomado
+        return self._seq > self._consumed_seq
+
+    def _take(self):
+        # Llamar con self._cond tomado
+        self._consumed_seq = self._seq
+        if self.lockstep:
+            self._cond.notify_all()
+        return self._frame, self._timestamp
+
+    def stats(self):
+        with self._cond:
+            return {
+                "frames_capturados": self._seq,
+                "frames_descartados": self.dropped_frames,
+                "errores_lectura": self.read_errors,
+            }
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+
+# ------------------ Grupo de cámaras ------------------
+class FrameGrabberGroup:
+    """
+    Un FrameGrabber por cámara, todos notificando sobre una misma Condition.
+    `read()` espera a que al menos una cámara tenga un frame nuevo y devuelve los
+    frames nuevos de todas, para inferirlos juntos en un solo lote.
+    """
+    def __init__(self, caps, batch_window=0.01, metrics=None):
+        self.batch_window = batch_window  # espera extra para juntar frames de todas las cámaras
+        self._cond = Condition()
+        # Las fuentes grabadas sin ritmo real se leen en lockstep para no descartar frames
+        self.grabbers = [FrameGrabber(cap, name=f"captura-{i}", cond=self._cond, metrics=metrics,
+                                      lockstep=isinstance(cap, FileSource) and not cap.realtime)
+                         for i, cap in enumerate(caps)]
+
+    def __len__(self):
+        return len(self.grabbers)
+
+    def start(self):
+        for g in self.grabbers:
+            g.start()
+        return self
+
+    def read(self, timeout=1.0):
+        """
+        Devuelve una lista [(i, frame, timestamp)] con el frame más reciente de cada cámara
+        que tenga uno nuevo. Lista vacía si ninguna produjo frames en `timeout` segundos.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: any(g._has_new() for g in self.grabbers)
+                                       or self._finished(), timeout):
+                return []
+            if len(self.grabbers) > 1:
+                self._cond.wait_for(lambda: all(g._has_new() or g.eof for g in self.grabbers),
+                                    self.batch_window)
+            return [(i,) + g._take() for i, g in enumerate(self.grabbers) if g._has_new()]
+
+    def _finished(self):
+        # Llamar con self._cond tomado
+        return all(g.eof and not g._has_new() for g in self.grabbers)
+
+    def finished(self):
+        """True cuando todas las fuentes grabadas terminaron y no quedan frames por entregar."""
+        with self._cond:
+            return self._finished()
+
+    def stats(self):
+        return [g.stats() for g in self.grabbers]
+
+    def stop(self):
+        for g in self.grabbers:
+            g.stop()
+
+
+# ------------------ Fuentes grabadas ------------------
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FileSource:
+    """
+    Vídeo o carpeta de imágenes (en orden alfabético) con la interfaz de cv2.VideoCapture
+    que usa el detector (read / isOpened / set / release).
+    Con `realtime=True` entrega los frames al ritmo de su FPS; si no, tan rápido como se lean,
+    y `timestamp()` avanza según el tiempo del vídeo para que las ventanas de gracia
+    se evalúen igual que en vivo.
+    """
+    def __init__(self, path, realtime=False, fps=None):
+        self.path = path
+        self.realtime = realtime
+        if os.path.isdir(path):
+            self._images = sorted(os.path.join(path, f) for f in os.listdir(path)
+                                  if f.lower().endswith(IMAGE_EXTENSIONS))
+            self._cap = None
+            self.fps = fps or 30.0
+        else:
+            self._images = None
+            self._cap = cv2.VideoCapture(path)
+            self.fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_index = 0
+        self._t0 = time.monotonic()
+
+    def isOpened(self):
+        if self._images is not None:
+            return len(self._images) > 0
+        return self._cap.isOpened()
+
+    def set(self, prop, value):
+        return False  # las propiedades de cámara no aplican a una grabación
+
+    def timestamp(self):
+        """Instante (reloj monotónico) del último frame leído."""
+        if self.realtime:
+            return time.monotonic()
+        return self._t0 + self.frame_index / self.fps
+
+    def read(self):
+        if self.realtime:
+            # Esperar al instante que le corresponde al siguiente frame
+            delay = self._t0 + self.frame_index / self.fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        if self._images is not None:
+            # Una imagen ilegible se salta: solo el final de la lista es fin de la fuente
+            frame = None
+            while frame is None:
+                if self.frame_index >= len(self._images):
+                    return False, None
+                frame = cv2.imread(self._images[self.frame_index])
+                if frame is None:
+                    logger.warning(f"No se pudo leer {self._images[self.frame_index]}: se salta")
+                    self.frame_index += 1
+            ret = True
+        else:
+            ret, frame = self._cap.read()
+        if ret:
+            self.frame_index += 1
+        return ret, frame
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+def abrir_fuente(idx, realtime=False):
+    """
+    Abre una cámara (índice entero) a 640x480 con buffer mínimo, o una fuente grabada
+    (ruta de vídeo o carpeta de imágenes). Lanza una excepción si no se puede abrir.
+    """
+    if isinstance(idx, str):
+        # Vídeo o carpeta de imágenes (benchmarks reproducibles sin webcam)
+        logger.info(f"Abriendo fuente grabada {idx}...")
+        cap = FileSource(idx, realtime=realtime)
+        if not cap.isOpened():
+            raise Exception(f"No se pudo abrir la fuente {idx}")
+        return cap
+
+    logger.info(f"Configurando cámara {idx}...")
+    cap = cv2.VideoCapture(idx)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    # no forzamos FPS — la inferencia será por frame
+    if not cap.isOpened():
+        raise Exception(f"No se pudo abrir la cámara {idx}")
+    return cap
@@ -0,0 +1,95 @@
+# cuantizar.py
+# Genera variantes INT8 del modelo ONNX con onnxruntime.quantization.
+#
+#   Dinámica (sin datos, solo pesos en INT8):
+#     python camara/cuantizar.py --model yolo11n.onnx --modo dinamica
+#   Estática (pesos y activaciones en INT8, calibrada con imágenes de la sala):
+#     python camara/cuantizar.py --model yolo11n.onnx --modo estatica --calib fotos_sala/
+#
+# La estática suele ser bastante más rápida en CPU; conviene comparar su precisión con
+# evaluar_variantes.py antes de desplegarla.
+import os
+import argparse
+import logging
+
+import numpy as np
+import cv2
+import onnxruntime as ort
+from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                      quantize_dynamic, quantize_static)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+
+from captura import IMAGE_EXTENSIONS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Entrega imágenes de calibración con el mismo letterbox que usa el detector."""
+    def __init__(self, model_path, image_dir, max_images=200):
+        session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        inp = session.get_inputs()[0]
+        self.input_name = inp.name
+        _, _, h, w = inp.shape
+        self.height = h if isinstance(h, int) else 640
+        self.width = w if isinstance(w, int) else 640
+        self.paths = sorted(os.path.join(image_dir, f) for f in os.listdir(image_dir)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))[:max_images]
+        if not self.paths:
+            raise SystemExit(f"No hay imágenes de calibración en {image_dir}")
+        self._iter = iter(self.paths)
+
+    def _preprocess(self, frame):
+        fh, fw = frame.shape[:2]
+        r = min(self.height / fh, self.width / fw)
+        nw, nh = int(round(fw * r)), int(round(fh * r))
+        canvas = np.full((self.height, self.width, 3), 114, dtype=np.uint8)
+        pad_x, pad_y = (self.width - nw) // 2, (self.height - nh) // 2
+        canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(frame, (nw, nh))
+        return (canvas[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+    def get_next(self):
+        for path in self._iter:
+            frame = cv2.imread(path)
+            if frame is not None:
+                return {self.input_name: self._preprocess(frame)}
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuantización INT8 del modelo ONNX")
+    parser.add_argument("--model", default="yolo11n.onnx")
+    parser.add_argument("--modo", choices=["dinamica", "estatica"], default="dinamica")
+    parser.add_argument("--calib", default=None, help="carpeta de imágenes (modo estática)")
+    parser.add_argument("--max-imagenes", type=int, default=200)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    base, _ = os.path.splitext(args.model)
+    out = args.out or f"{base}_int8_{args.modo}.onnx"
+
+    # Inferencia de formas y fusiones previas recomendadas por onnxruntime
+    preprocesado = f"{base}_prep.onnx"
+    quant_pre_process(args.model, preprocesado)
+
+    try:
+        if args.modo == "dinamica":
+            quantize_dynamic(preprocesado, out, weight_type=QuantType.QUInt8)
+        else:
+            if not args.calib:
+                raise SystemExit("--calib es obligatorio en modo estática")
+            reader = ImageCalibrationReader(preprocesado, args.calib, args.max_imagenes)
+            logger.info(f"Calibrando con {len(reader.paths)} imágenes...")
+            quantize_static(preprocesado, out, reader, quant_format=QuantFormat.QDQ,
+                            per_channel=True, activation_type=QuantType.QUInt8,
+                            weight_type=QuantType.QInt8)
+    finally:
+        os.remove(preprocesado)
+
+    tam = lambda p: os.path.getsize(p) / 1e6
+    logger.info(f"✅ {out}: {tam(out):.1f} MB (original {tam(args.model):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,163 @@
 # deteccion_server_no_tracker.py
+import os
 import cv2
+import json
 import time
-import requests
+import argparse
+import numpy as np
 import logging
-from threading import Thread, Lock
+from threading import Thread, Lock, Condition
 from datetime import datetime
-from flask import Flask, request, jsonify
-from ultralytics import YOLO
+from flask import Flask, Response, request, jsonify
+from captura import FrameGrabberGroup, abrir_fuente
+from postproceso import PERSON_CLASS, boxes_to_numpy, filtrar_personas
+from preview import PreviewStream
+from notificacion import LocalNotifier, HttpNotifier
+from movimiento import MotionGate
+from suavizado import PresenceFilter
+from seguimiento import PersonTracker
+from planificador import FrameRateGovernor
+from roi import RoiSelector
+from registro import EventLog
+from metricas import PrometheusMetrics
+# ultralytics (torch) y onnxruntime se importan al cargar el modelo, en paralelo con la
+# apertura de las cámaras y con el servidor ya respondiendo
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Referencia para medir el tiempo hasta la primera detección
+T_ARRANQUE = time.monotonic()
+
 # ------------------ Servidor Flask ------------------
 class DetectionServer:
-    def __init__(self, host='0.0.0.0', port=5000):
+    def __init__(self, host='0.0.0.0', port=5000, preview=None, heartbeat_interval=1.0, metrics=None,
+                 event_log=None):
         self.app = Flask(__name__)
         self.host = host
         self.port = port
+        self.preview = preview  # PreviewStream opcional para /preview.mjpg
+        self.metrics = metrics  # PrometheusMetrics opcional para /metrics
+        self.heartbeat_interval = heartbeat_interval  # latido de /estado/stream (s)
+        self.event_log = event_log  # EventLog opcional: registra cada cambio de estado recibido
 
         # Estado compartido
         self.personas_presentes = False
         self.timestamp = time.time()
-        self.lock = Lock()
+        self.version = 0        # se incrementa en cada cambio de estado
+        self.detector_listo = False  # False mientras el detector carga el modelo y calienta
+        self.camaras = None     # presencia por cámara ({"0": bool, ...}) si el detector usa varias
+        self.traza = None       # traza del último cambio de presencia (id e instantes de cada salto)
+        self.lock = Lock()      # solo serializa a los escritores (y a la espera de /estado/stream)
+        self.cambio = Condition(self.lock)  # despierta a los suscriptores de /estado/stream
+        self._suscriptores = []  # callbacks sin argumentos llamados tras cada cambio (p. ej. el servidor async)
+
+        # Estado publicado: tupla inmutable (version, JSON ya serializado) que los escritores
+        # reemplazan de una vez. Leer un atributo es atómico, así que /estado no toma el lock.
+        self.snapshot = self._serializar()
 
         self._setup_routes()
 
     def _setup_routes(self):
         @self.app.route('/persona_detectada', methods=['POST'])
         def recibir_deteccion():
-            try:
-                data = request.get_json()
-                if not data or 'personas_detectadas' not in data:
-                    return jsonify({"error": "Datos inválidos"}), 400
-
-                personas = bool(data['personas_detectadas'])
-                ts = data.get('timestamp', time.time())
-                self.procesar_mensaje(personas, ts)
-                return jsonify({"status": "success"}), 200
-            except Exception as e:
-                logger.error(f"Error procesando request: {e}")
-                return jsonify({"error": "Error interno"}), 500
+            cuerpo, codigo = self.recibir_json(request.get_json(silent=True))
+            return jsonify(cuerpo), codigo
 
         @self.app.route('/estado', methods=['GET'])
         def estado():
+            t0 = time.perf_counter()
+            _, body = self.snapshot
+            resp = Response(body, mimetype='application/json')
+            if self.metrics is not None:
+                self.metrics.observe("estado_http", time.perf_counter() - t0)
+                self.metrics.incr("estado_peticiones")
+            return resp, 200
+
+        @self.app.route('/reloj', methods=['GET'])
+        def reloj():
+            # Reloj de este equipo: los clientes estiman su desfase para medir latencias entre máquinas
+            return jsonify({"t": time.time()}), 200
+
+        @self.app.route('/estado/stream', methods=['GET'])
+        def estado_stream():
+            # Server-Sent Events: un evento por cambio de estado y latidos periódicos
+            return Response(self._stream_estado(), mimetype='text/event-stream',
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+        if self.metrics is not None:
+            @self.app.route('/metrics', methods=['GET'])
+            def metrics():
+                return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+        if self.preview is not None:
+            @self.app.route('/preview.mjpg', methods=['GET'])
+            def preview():
+                return Response(self.preview.stream(),
+                                mimetype=f"multipart/x-mixed-replace; boundary={self.preview.BOUNDARY}")
+
+    def recibir_json(self, data):
+        """Valida y aplica un mensaje de /persona_detectada; devuelve (cuerpo, código HTTP)."""
+        try:
+            if not data or 'personas_detectadas' not in data:
+                return {"error": "Datos inválidos"}, 400
+
+            personas = bool(data['personas_detectadas'])
+            ts = data.get('timestamp', time.time())
+            self.procesar_mensaje(personas, ts, data.get('camaras'), data.get('traza'))
+            return {"status": "success"}, 200
+        except Exception as e:
+            logger.error(f"Error procesando request: {e}")
+            return {"error": "Error interno"}, 500
+
+    def suscribir(self, callback):
+        """Registra `callback()` para que se llame (desde el hilo escritor) tras cada cambio."""
+        self._suscriptores.append(callback)
+
+    def _serializar(self):
+        # Llamar con self.lock tomado (o desde __init__)
+        return self.version, json.dumps(self._estado_dict()).encode()
+
+    def _estado_dict(self):
+        # Llamar con self.lock tomado
+        estado = {
+            "personas_presentes": self.personas_presentes,
+            "timestamp": self.timestamp,
+            "version": self.version,
+            "detector": "listo" if self.detector_listo else "calentando"
+        }
+        if self.camaras is not None:
+            estado["camaras"] = self.camaras
+        if self.traza is not None:
+            estado["traza"] = self.traza
+        return estado
+
+    def _stream_estado(self):
+        """
+        Generador SSE: envía el estado actual al conectar, luego cada cambio en cuanto
+        `procesar_mensaje` lo publica y, si no hay cambios, un latido cada `heartbeat_interval`.
+        """
+        version, body = self.snapshot
+        yield b"event: estado\ndata: " + body + b"\n\n"
+
+        while True:
             with self.lock:
-                return jsonify({
-                    "personas_presentes": self.personas_presentes,
-                    "timestamp": self.timestamp
-                }), 200
+                self.cambio.wait_for(lambda: self.snapshot[0] != version, self.heartbeat_interval)
+            nueva, body = self.snapshot
+            evento = b"estado" if nueva != version else b"heartbeat"
+            version = nueva
+            yield b"event: " + evento + b"\ndata: " + body + b"\n\n"
 
-    def procesar_mensaje(self, personas_detectadas, timestamp):
+    def procesar_mensaje(self, personas_detectadas, timestamp, camaras=None, traza=None):
+        """
+        Aplica un mensaje del detector. `traza` (opcional) trae el id y los instantes del
+        detector; en los cambios de presencia se le añade `t_servidor` y se publica en /estado.
+        """
+        t_servidor = time.time()
         with self.lock:
+            # Cualquier mensaje del detector indica que ya está en marcha
+            cambio = not self.detector_listo
+            self.detector_listo = True
             if personas_detectadas != self.personas_presentes:
                 fecha_hora = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
                 if personas_detectadas:
@@ -59,6 +166,23 @@ class DetectionServer:
                     print(f"🔴 [{fecha_hora}] YA NO HAY PERSONAS")
                 self.personas_presentes = personas_detectadas
                 self.timestamp = timestamp
+                cambio = True
+                if traza is not None:
+                    self.traza = dict(traza, t_servidor=t_servidor)
+                    if self.metrics is not None and "t_captura" in traza:
+                        self.metrics.observe("traza_captura_servidor", t_servidor - traza["t_captura"])
+                if self.event_log is not None:
+                    self.event_log.registrar_transicion(timestamp, personas_detectadas)
+            if camaras is not None and camaras != self.camaras:
+                self.camaras = dict(camaras)
+                cambio = True
+            if cambio:
+                self.version += 1
+                self.snapshot = self._serializar()
+                self.cambio.notify_all()
+        if cambio:
+            for callback in self._suscriptores:
+                callback()
 
     def run(self):
         self.app.run(host=self.host, port=self.port, debug=False, use_reloader=False, threaded=True)
@@ -67,115 +191,383 @@ class DetectionServer:
 # ------------------ Detector (sin tracker, inferencia en real-time) ------------------
 class PersonDetector:
     def __init__(self,
-                 server_ip="127.0.0.1", server_port=5000, cam_index=0,
+                 server_ip="127.0.0.1", server_port=5000,
+                 cam_index=0,                # índice de cámara, ruta de vídeo/carpeta de imágenes, o lista
                  no_persons_grace=10.0,      # 10s sin detecciones para declarar "no hay"
-                 conf_threshold=0.5):
+                 conf_threshold=0.5,
+                 headless=False,             # sin ventana ni anotaciones (servidores sin pantalla)
+                 preview=None,               # PreviewStream opcional: anota solo si hay visores
+                 server=None,                # DetectionServer del mismo proceso (evita HTTP)
+                 motion_gate=None,           # MotionGate opcional: salta YOLO en escenas estáticas
+                 presence_filter=None,       # PresenceFilter opcional: confirma presencia/ausencia k-de-n
+                 tracker=None,               # PersonTracker opcional: sigue a las personas entre pasadas de YOLO
+                 governor=None,              # FrameRateGovernor opcional: FPS objetivo y presupuesto de CPU
+                 roi=None,                   # RoiSelector opcional: infiere solo alrededor de la última detección
+                 event_log=None,             # EventLog opcional: guarda las cajas de cada frame inferido o seguido
+                 backend="ultralytics",      # "ultralytics" o "onnxruntime" (OnnxPersonModel)
+                 model_path="yolo11n.onnx",  # ajusta si usas otro checkpoint (p. ej. un export INT8)
+                 imgsz=640,                  # resolución de inferencia (lado mayor)
+                 ort_threads=0,              # hilos intra-op de onnxruntime (0: automático)
+                 replay_realtime=False,      # fuentes grabadas: al ritmo del vídeo o lo más rápido posible
+                 notifier=None,              # emisor de estado ya construido (p. ej. canal IPC hacia el servidor)
+                 grabbers=None,              # fuente de frames ya abierta (p. ej. SharedFrameReader de otro proceso)
+                 metrics=None):              # receptor de tiempos por etapa (observe/incr/set): LatencyRecorder, PrometheusMetrics
         self.server_url = f"http://{server_ip}:{server_port}/persona_detectada"
 
-        logger.info("Cargando modelo YOLO...")
-        self.model = YOLO("yolo11n.onnx")  # ajusta si usas otro checkpoint
+        # Con el servidor en el mismo proceso se le entrega el estado directamente;
+        # si es remoto, un hilo emisor hace los POST sin bloquear el loop de detección.
+        if notifier is not None:
+            self.notifier = notifier
+        elif server is not None:
+            self.notifier = LocalNotifier(server)
+        else:
+            self.notifier = HttpNotifier(self.server_url, timeout=2)
+
+        # Varias cámaras comparten un único modelo: sus frames se infieren en un solo lote
+        self.cam_indices = list(cam_index) if isinstance(cam_index, (list, tuple)) else [cam_index]
+        self.backend = backend
+        self.imgsz = imgsz
+        self.replay_realtime = replay_realtime
+        self.roi = roi
+        if roi is not None and backend != "onnxruntime" and roi.model_path is None and not model_path.endswith(".pt"):
+            # Un modelo exportado (p. ej. yolo11n.onnx) suele tener la entrada fija a `imgsz`
+            raise ValueError(f"ROI con el backend ultralytics y {model_path}: indica un modelo exportado "
+                             f"a imgsz={roi.imgsz} con --roi-model, o usa un modelo .pt")
+        self.event_log = event_log
+        self._epoch = time.time() - time.monotonic()  # los instantes de captura son monotonic
+        self._traza_prefijo = f"{os.getpid():x}{int(time.time()) & 0xffff:04x}"
+        self._trazas = 0
+        self._t_frame = self._t_evidencia = time.monotonic()
+        # Una grabación sin ritmo real da instantes del vídeo, no de reloj: la traza usa
+        # entonces el momento en que el loop recibe el frame
+        self._tiempo_video = not replay_realtime and any(isinstance(idx, str) for idx in self.cam_indices)
+        self.metrics = None                # se asigna tras el warm-up para no medirlo
+        self.startup_times = {}            # duración de cada fase del arranque (s)
+
+        # El modelo se carga en un hilo mientras este abre las cámaras
+        self._load_error = None
+        loader = Thread(target=self._load_model, args=(backend, model_path, conf_threshold, ort_threads),
+                        name="carga-modelo", daemon=True)
+        loader.start()
+        try:
+            if grabbers is None:
+                self._open_cameras()
+            else:
+                self.caps = []             # las cámaras las abre y libera otro proceso
+        finally:
+            loader.join()
+        if self._load_error is not None:
+            raise self._load_error
 
-        logger.info("Configurando cámara...")
-        self.cap = cv2.VideoCapture(cam_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        # no forzamos FPS — la inferencia será por frame
-        if not self.cap.isOpened():
-            raise Exception("No se pudo abrir la cámara")
+        # Hilos de captura: la inferencia siempre toma el frame más reciente de cada cámara
+        self.grabbers = grabbers if grabbers is not None else FrameGrabberGroup(self.caps, metrics=metrics)
 
         # Nombre de ventana único para evitar ventanas múltiples
         self.WINDOW_NAME = "Detección de Personas - YOLO (RealTime)"
-        cv2.namedWindow(self.WINDOW_NAME, cv2.WINDOW_NORMAL)
+        self.headless = headless
+        self.preview = preview
+        if not self.headless:
+            cv2.namedWindow(self.WINDOW_NAME, cv2.WINDOW_NORMAL)
 
         # Parámetros
         self.no_persons_grace = no_persons_grace
         self.conf_threshold = conf_threshold
 
+        # La re-inferencia forzada debe caber holgadamente en la ventana de gracia,
+        # si no una persona quieta se declararía ausente sin volver a mirar
+        self.motion_gate = motion_gate
+        if self.motion_gate is not None:
+            self.motion_gate.recheck_interval = min(self.motion_gate.recheck_interval,
+                                                    no_persons_grace / 2)
+        self.presence_filter = presence_filter
+        self.tracker = tracker
+        self.governor = governor
+        n = len(self.cam_indices)
+        self._last_boxes = [np.empty((0, 5), dtype=np.float32)] * n
+        self._last_annotated = [None] * n  # último frame anotado de cada cámara (para el mosaico)
+
         # Tiempos
-        self.last_detection_time = 0.0     # última vez que YOLO vio una persona
+        self.last_detection_time = 0.0     # última vez que YOLO vio una persona (en cualquier cámara)
+        self.cam_last_detection = [0.0] * n
 
         # Estado enviado al servidor
         self.server_state = False          # False: no hay personas; True: hay
+        self.cam_state = [False] * n       # presencia por cámara (mismas reglas de gracia)
+
+        # Warm-up: la primera inferencia paga la inicialización del grafo; mejor antes del primer frame real
+        t0 = time.monotonic()
+        self._run_yolo_batch([np.zeros((480, 640, 3), dtype=np.uint8)] * n)
+        if self.roi is not None:
+            self._run_yolo_batch([np.zeros((240, 240, 3), dtype=np.uint8)] * n, roi=True)
+        self.startup_times["warmup"] = time.monotonic() - t0
+        self._first_inference_done = False
+        self.metrics = metrics
+        self._fps_frames = 0               # frames del intervalo actual de cálculo de FPS
+        self._fps_t0 = time.monotonic()
+        if backend == "onnxruntime":
+            self.model.metrics = metrics
+            if self.roi is not None:
+                self.roi_model.metrics = metrics
+
+        logger.info("Detector inicializado (sin tracker) — arranque: "
+                    + ", ".join(f"{k} {v:.2f}s" for k, v in self.startup_times.items()))
+
+    def _load_model(self, backend, model_path, conf_threshold, ort_threads):
+        t0 = time.monotonic()
+        try:
+            logger.info("Cargando modelo YOLO...")
+            if backend == "onnxruntime":
+                from onnx_backend import OnnxPersonModel  # onnxruntime solo se requiere con este backend
+                self.model = OnnxPersonModel(model_path, imgsz=self.imgsz, conf_threshold=conf_threshold,
+                                             intra_op_threads=ort_threads,
+                                             max_batch=len(self.cam_indices))
+                if self.roi is not None:
+                    # Segunda sesión a la resolución del recorte
+                    self.roi_model = OnnxPersonModel(self.roi.model_path or model_path, imgsz=self.roi.imgsz,
+                                                     conf_threshold=conf_threshold,
+                                                     intra_op_threads=ort_threads,
+                                                     max_batch=len(self.cam_indices))
+            else:
+                from ultralytics import YOLO
+                self.model = YOLO(model_path)
+                if self.roi is not None:
+                    # Un .pt acepta cualquier resolución; un modelo exportado necesita el suyo
+                    self.roi_model = YOLO(self.roi.model_path) if self.roi.model_path else self.model
+        except Exception as e:
+            self._load_error = e
+        self.startup_times["modelo"] = time.monotonic() - t0
+
+    def _open_cameras(self):
+        t0 = time.monotonic()
+        self.caps = [abrir_fuente(idx, realtime=self.replay_realtime) for idx in self.cam_indices]
+        self.startup_times["camaras"] = time.monotonic() - t0
 
-        logger.info("Detector inicializado (sin tracker)")
+    def _person_boxes(self, result):
+        """
+        Devuelve un array (K, 5) [x1, y1, x2, y2, conf] con las personas por encima del umbral.
+        El filtrado se hace como una sola operación sobre los tensores de todas las cajas.
+        """
+        return filtrar_personas(boxes_to_numpy(result.boxes), self.conf_threshold)
 
     def _pick_any_person(self, result):
         """
-        Recorre cajas y devuelve True si encuentra al menos una persona por encima del umbral.
-        Además dibuja todas las cajas de persona sobre el frame.
+        Devuelve True si el resultado contiene al menos una persona por encima del umbral.
         """
-        found = False
-        if result.boxes is None:
-            return False
+        return len(self._person_boxes(result)) > 0
 
-        for box in result.boxes:
-            try:
-                cls = int(box.cls)
-            except Exception:
-                # algunos formatos pueden diferir; ignorar si no tiene clase
-                continue
-            if cls == 0:  # clase persona (COCO)
-                conf = float(box.conf)
-                if conf >= self.conf_threshold:
-                    found = True
-        return found
+    def _run_yolo(self, frame):
+        """
+        Ejecuta YOLO sobre el frame y devuelve (persona_detectada_bool, boxes (K, 5)).
+        No dibuja nada: la anotación solo se hace si alguien va a ver el frame.
+        """
+        return self._run_yolo_batch([frame])[0]
 
-    def _run_yolo_and_annotate(self, frame):
+    def _run_yolo_batch(self, frames, roi=False):
         """
-        Ejecuta YOLO sobre el frame, dibuja cajas y devuelve (persona_detectada_bool, annotated_frame)
+        Ejecuta YOLO sobre una lista de frames en un solo lote y devuelve una lista
+        [(persona_detectada_bool, boxes (K, 5))] en el mismo orden.
+        Para lotes > 1 el ONNX debe exportarse con batch dinámico (dynamic=True) o batch=N.
+        Con `roi=True` los frames son recortes y se infieren a la resolución de RoiSelector.
         """
+        model = self.roi_model if roi else self.model
+        if self.backend == "onnxruntime":
+            # OnnxPersonModel ya devuelve solo personas por encima del umbral
+            return [(len(boxes) > 0, boxes) for boxes in model.predict(frames)]
+
         # Si tu versión de ultralytics soporta show=False, puedes añadirlo para evitar GUIs internas.
-        results = self.model(frame, verbose=False)
-        persona_detectada = False
-
-        # Dibujar cajas: iteramos resultados y boxes
-        for result in results:
-            if result.boxes is None:
-                continue
-            for box in result.boxes:
-                try:
-                    cls = int(box.cls)
-                    conf = float(box.conf)
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                except Exception:
-                    continue
-                if cls == 0 and conf >= self.conf_threshold:
-                    persona_detectada = True
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(frame, f"Persona {conf:.2f}", (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-        return persona_detectada, frame
+        # classes=[0]: el modelo solo devuelve personas; el resto se descarta ya en el NMS
+        t0 = time.perf_counter()
+        results = model(frames, verbose=False, classes=[PERSON_CLASS], conf=self.conf_threshold,
+                        imgsz=self.roi.imgsz if roi else self.imgsz)
+        t1 = time.perf_counter()
+        salida = []
+        for result in results:  # un frame -> un resultado
+            boxes = self._person_boxes(result)
+            salida.append((len(boxes) > 0, boxes))
+        if self.metrics is not None:
+            self.metrics.observe("inferencia", t1 - t0)
+            self.metrics.observe("postproceso", time.perf_counter() - t1)
+        return salida
+
+    def _detectar(self, to_detect):
+        """
+        YOLO sobre [(i, frame, ts)]: a frame completo o, con RoiSelector, sobre el recorte
+        alrededor de la última detección de cada cámara. Devuelve [(detectada, boxes)] en el
+        mismo orden, con las cajas siempre en coordenadas del frame.
+        """
+        if self.roi is None:
+            return self._run_yolo_batch([frame for _, frame, _ in to_detect])
+
+        salida = [None] * len(to_detect)
+        rects = [self.roi.plan(frame.shape, ts, key=i) for i, frame, ts in to_detect]
+        recortes = [k for k, rect in enumerate(rects) if rect is not None]
+        if recortes:
+            t0 = time.perf_counter()
+            crops = []
+            for k in recortes:
+                x1, y1, x2, y2 = rects[k]
+                crops.append(to_detect[k][1][y1:y2, x1:x2])
+            results = self._run_yolo_batch(crops, roi=True)
+            if self.metrics is not None:
+                self.metrics.observe("yolo_roi", time.perf_counter() - t0)
+            for k, (detectada, boxes) in zip(recortes, results):
+                if detectada:
+                    i, _, ts = to_detect[k]
+                    salida[k] = (True, RoiSelector.to_frame(boxes, rects[k]))
+                    self.roi.update(salida[k][1], ts, completo=False, key=i)
+                else:
+                    self.roi.fallos += 1   # la persona pudo salir del recorte: se mira el frame entero
+
+        completos = [k for k in range(len(to_detect)) if salida[k] is None]
+        if completos:
+            t0 = time.perf_counter()
+            results = self._run_yolo_batch([to_detect[k][1] for k in completos])
+            if self.metrics is not None:
+                self.metrics.observe("yolo_completo", time.perf_counter() - t0)
+            for k, resultado in zip(completos, results):
+                i, _, ts = to_detect[k]
+                salida[k] = resultado
+                self.roi.update(resultado[1], ts, completo=True, key=i)
+        return salida
+
+    def _annotate(self, frame, boxes, now):
+        """
+        Dibuja las cajas de persona y el overlay de estado sobre el frame (in-place).
+        """
+        for x1, y1, x2, y2, conf in boxes:
+            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, f"Persona {conf:.2f}", (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        # Overlay informativo
+        last_elapsed = (now - self.last_detection_time) if self.last_detection_time > 0 else float('inf')
+        info1 = f"Evidencia hace: {0 if last_elapsed == float('inf') else last_elapsed:.1f}s"
+        info2 = f"Estado: {'PRESENTE' if self.server_state else 'AUSENTE'}"
+        cv2.putText(frame, info1, (10, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (220, 220, 220), 2)
+        cv2.putText(frame, info2, (10, 52), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 180, 255), 2)
+        return frame
+
+    def _mosaico(self):
+        """Une los últimos frames anotados de todas las cámaras en una sola imagen."""
+        frames = [f for f in self._last_annotated if f is not None]
+        if len(frames) == 1:
+            return frames[0]
+        h = frames[0].shape[0]
+        frames = [f if f.shape[0] == h else cv2.resize(f, (int(f.shape[1] * h / f.shape[0]), h))
+                  for f in frames]
+        return cv2.hconcat(frames)
+
+    def _update_fps(self, n_frames):
+        """Publica los FPS del loop una vez por segundo."""
+        self._fps_frames += n_frames
+        elapsed = time.monotonic() - self._fps_t0
+        if elapsed >= 1.0:
+            self.metrics.set("fps", self._fps_frames / elapsed)
+            self._fps_frames = 0
+            self._fps_t0 = time.monotonic()
 
     def _notificar_servidor(self, personas_presentes):
-        try:
-            payload = {"personas_detectadas": personas_presentes, "timestamp": time.time()}
-            resp = requests.post(self.server_url, json=payload, timeout=2)
-            if resp.status_code == 200:
-                estado = "ACTIVAR" if personas_presentes else "DESACTIVAR"
-                logger.info(f"✅ Notificación enviada: {estado}")
-            else:
-                logger.warning(f"⚠️ Respuesta inesperada del servidor: {resp.status_code}")
-        except Exception as e:
-            logger.error(f"❌ Error al notificar servidor: {e}")
+        # Con una sola cámara el mensaje no cambia; con varias se añade la presencia por cámara
+        camaras = None
+        if len(self.cam_indices) > 1:
+            camaras = {str(idx): estado for idx, estado in zip(self.cam_indices, self.cam_state)}
+        # Traza de extremo a extremo: captura del frame que decidió, fin de la inferencia y
+        # envío, en epoch de este equipo; el servidor y el robot añaden sus propios instantes
+        self._trazas += 1
+        traza = {"id": f"{self._traza_prefijo}-{self._trazas}",
+                 "t_captura": self._t_frame + self._epoch,
+                 "t_inferencia": self._t_evidencia + self._epoch}
+        t0 = time.perf_counter()
+        traza["t_notificacion"] = time.time()
+        self.notifier.notify(personas_presentes, traza["t_notificacion"], camaras, traza)
+        if self.metrics is not None:
+            self.metrics.observe("notificacion", time.perf_counter() - t0)
 
     def run(self):
-        logger.info("🚀 Loop de detección en tiempo real iniciado (sin tracker)")
+        logger.info("🚀 Loop de detección en tiempo real iniciado "
+                    + ("(con seguimiento entre detecciones)" if self.tracker is not None else "(sin tracker)"))
+        self.grabbers.start()
         try:
             while True:
-                now = time.monotonic()
-                ret, frame = self.cap.read()
-                if not ret:
+                # Frames nuevos de cada cámara: [(i, frame, instante de captura)]
+                frames = self.grabbers.read(timeout=1.0)
+                t_lectura = time.monotonic()
+                if not frames:
+                    if self.grabbers.finished():
+                        logger.info("🏁 Fin de la fuente grabada")
+                        break
                     logger.error("No se pudo leer frame de la cámara")
-                    time.sleep(0.05)
                     continue
+                t_loop = time.perf_counter()
+                # `now` es el instante de captura del frame más reciente, no el de inferencia
+                now = max(ts for _, _, ts in frames)
 
                 # Si el usuario cerró la ventana con el gestor de ventanas, salir limpiamente
-                if cv2.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1:
+                if not self.headless and cv2.getWindowProperty(self.WINDOW_NAME, cv2.WND_PROP_VISIBLE) < 1:
                     logger.info("Ventana cerrada por el usuario. Saliendo...")
                     break
 
-                # Ejecutar YOLO en cada frame (real-time)
-                persona_detectada, annotated = self._run_yolo_and_annotate(frame)
+                # Ejecutar YOLO en cada frame (real-time), salvo que el gate de movimiento
+                # indique que la escena no cambió: entonces no hay evidencia nueva
+                to_infer = [(i, frame, ts) for i, frame, ts in frames
+                            if self.motion_gate is None or self.motion_gate.should_infer(frame, ts, key=i)]
+                # Con tracker, las cámaras con personas seguidas se saltan YOLO hasta que toque re-detectar
+                if self.tracker is None:
+                    to_detect, to_track = to_infer, []
+                else:
+                    to_detect, to_track = [], []
+                    for item in to_infer:
+                        (to_detect if self.tracker.should_detect(item[2], key=item[0]) else to_track).append(item)
+
+                evidencias = []  # [(cámara, instante, persona vista, cajas)]
+                if to_detect:
+                    results = self._detectar(to_detect)
+                    for (i, frame, ts), (detectada, boxes) in zip(to_detect, results):
+                        if self.tracker is not None:
+                            self.tracker.start(frame, boxes, ts, key=i)
+                        evidencias.append((i, ts, detectada, boxes))
+                for i, frame, ts in to_track:
+                    t0 = time.perf_counter()
+                    detectada, boxes = self.tracker.update(frame, key=i)
+                    if self.metrics is not None:
+                        self.metrics.observe("seguimiento", time.perf_counter() - t0)
+                    evidencias.append((i, ts, detectada, boxes))
+
+                persona_detectada = False
+                persona_vista = False      # evidencia cruda, antes del filtro de presencia
+                for i, ts, detectada, boxes in evidencias:
+                    self._last_boxes[i] = boxes
+                    if self.event_log is not None:
+                        self.event_log.registrar_frame(ts + self._epoch, i, boxes)
+                    persona_vista |= detectada
+                    if self.presence_filter is not None:
+                        # Un positivo suelto no cuenta hasta que la ventana k-de-n lo confirma
+                        detectada = self.presence_filter.push(detectada, key=i)
+                    if detectada:
+                        self.cam_last_detection[i] = ts
+                        persona_detectada = True
+
+                # Instantes para la traza de una posible notificación en esta iteración
+                self._t_frame = t_lectura if self._tiempo_video else now
+                self._t_evidencia = time.monotonic()
+
+                if to_detect and not self._first_inference_done:
+                    # Primera detección real: el servidor deja de reportar "calentando"
+                    self._first_inference_done = True
+                    self.startup_times["primera_deteccion"] = time.monotonic() - T_ARRANQUE
+                    logger.info(f"⏱️ Primera detección a {self.startup_times['primera_deteccion']:.2f}s "
+                                f"del arranque")
+                    self._notificar_servidor(self.server_state)
+
+                # Presencia por cámara con la misma ventana de gracia; si cambia sin que cambie
+                # el estado global, se notifica igualmente para mantener el desglose al día
+                cam_state = [(t > 0 and now - t < self.no_persons_grace)
+                             or (self.cam_state[i] and not self._ausencia_confirmada(i))
+                             for i, t in enumerate(self.cam_last_detection)]
+                cam_changed = cam_state != self.cam_state
+                self.cam_state = cam_state
+                estado_previo = self.server_state
 
                 if persona_detectada:
                     # refrescar última detección
@@ -189,61 +581,200 @@ class PersonDetector:
                     # sin detección en este frame: comprobamos si han pasado N segundos desde la última detección
                     # si server_state == True y han pasado no_persons_grace => notificar Ausencia
                     time_since_last = now - self.last_detection_time if self.last_detection_time > 0 else float('inf')
-                    if self.server_state and time_since_last >= self.no_persons_grace:
+                    if (self.server_state and time_since_last >= self.no_persons_grace
+                            and all(self._ausencia_confirmada(i) for i in range(len(self.cam_indices)))):
                         self._notificar_servidor(False)
                         self.server_state = False
 
-                # Overlay informativo
-                last_elapsed = (now - self.last_detection_time) if self.last_detection_time > 0 else float('inf')
-                info1 = f"Evidencia hace: {0 if last_elapsed == float('inf') else last_elapsed:.1f}s"
-                info2 = f"Estado: {'PRESENTE' if self.server_state else 'AUSENTE'}"
-                cv2.putText(annotated, info1, (10, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (220, 220, 220), 2)
-                cv2.putText(annotated, info2, (10, 52), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 180, 255), 2)
-
-                cv2.imshow(self.WINDOW_NAME, annotated)
-
-                # ESC para salir
-                if cv2.waitKey(1) & 0xFF == 27:
-                    break
-
-                # pequeño respiro para la CPU (si tu hardware puede procesar más rápido, reducir o quitar)
-                time.sleep(0.001)
+                if cam_changed and self.server_state == estado_previo and len(self.cam_indices) > 1:
+                    self._notificar_servidor(self.server_state)
+
+                # Anotar solo si alguien mira: ventana local o visores del preview MJPEG
+                send_preview = self.preview is not None and self.preview.wants_frame()
+                if not self.headless or send_preview:
+                    for i, frame, _ in frames:
+                        self._last_annotated[i] = self._annotate(frame, self._last_boxes[i], now)
+                    annotated = self._mosaico()
+                    if send_preview:
+                        self.preview.publish(annotated)
+                    if not self.headless:
+                        cv2.imshow(self.WINDOW_NAME, annotated)
+
+                        # ESC para salir
+                        if cv2.waitKey(1) & 0xFF == 27:
+                            break
+
+                if self.metrics is not None:
+                    self.metrics.observe("loop", time.perf_counter() - t_loop)
+                    self.metrics.incr("frames", len(frames))
+                    self.metrics.incr("frames_inferidos", len(to_detect))
+                    self.metrics.incr("frames_seguidos", len(to_track))
+                    if self.server_state != estado_previo:
+                        self.metrics.incr("transiciones")
+                    self._update_fps(len(frames))
+                    if self.governor is not None:
+                        self.metrics.set("fps_objetivo", self.governor.objetivo)
+                        self.metrics.set("fps_logrado", self.governor.fps_logrado)
+
+                if self.governor is not None:
+                    # Más rápido mientras el estado puede cambiar, más lento con el estado asentado
+                    self.governor.esperar(self._estado_incierto(now, persona_vista))
+                else:
+                    # pequeño respiro para la CPU (si tu hardware puede procesar más rápido, reducir o quitar)
+                    time.sleep(0.001)
         finally:
             self.cleanup()
 
+    def _estado_incierto(self, now, persona_vista):
+        """True si el estado publicado podría cambiar pronto (el governor acelera el loop)."""
+        if self.server_state:
+            return now - self.last_detection_time >= self.no_persons_grace * self.governor.grace_fraction
+        return persona_vista
+
+    def _ausencia_confirmada(self, i):
+        """Sin filtro basta con la ventana de gracia; con filtro, la cámara i debe acumular k_off negativos."""
+        return self.presence_filter is None or self.presence_filter.ausente(key=i)
+
     def cleanup(self):
-        if self.cap:
-            self.cap.release()
-        try:
-            cv2.destroyWindow(self.WINDOW_NAME)
-        except Exception:
-            pass
-        cv2.destroyAllWindows()
+        # Detener los hilos de captura antes de liberar las cámaras
+        self.grabbers.stop()
+        self.notifier.stop()
+        for idx, stats in zip(self.cam_indices, self.grabbers.stats()):
+            logger.info(f"📷 Captura cámara {idx}: {stats}")
+        if self.motion_gate is not None:
+            logger.info(f"🎞️ Gate de movimiento: {self.motion_gate.skip_ratio():.0%} de frames sin inferencia")
+        if self.governor is not None:
+            logger.info(f"🎛️ Ritmo: {self.governor.fps_logrado:.1f} FPS logrados, objetivo "
+                        f"{self.governor.fps_estable:g}/{self.governor.fps_incierto:g} (estable/incierto)")
+        if self.roi is not None:
+            logger.info(f"🔍 ROI: {self.roi.roi_ratio():.0%} de inferencias sobre recorte, "
+                        f"{self.roi.fallos} recortes sin persona repetidos a frame completo")
+        if self.tracker is not None:
+            logger.info(f"🎯 Seguimiento: {self.tracker.tracked_ratio():.0%} de frames sin YOLO")
+        if self.event_log is not None:
+            self.event_log.close()
+        if self.presence_filter is not None:
+            logger.info(f"🗳️ Filtro de presencia ({self.presence_filter}): "
+                        f"{self.presence_filter.descartados}/{self.presence_filter.positivos} positivos sin confirmar")
+        for cap in self.caps:
+            cap.release()
+        if not self.headless:
+            try:
+                cv2.destroyWindow(self.WINDOW_NAME)
+            except Exception:
+                pass
+            cv2.destroyAllWindows()
         logger.info("🧹 Recursos liberados")
 
 
 # ------------------ Main ------------------
 def main():
+    parser = argparse.ArgumentParser(description="Servidor de detección de personas")
+    parser.add_argument("--cam", nargs="+", default=["0"],
+                        help="índices de cámara o rutas de vídeo/carpeta; con varias se infieren en un solo lote")
+    parser.add_argument("--backend", choices=["ultralytics", "onnxruntime"], default="ultralytics",
+                        help="motor de inferencia: wrapper de ultralytics u onnxruntime directo")
+    parser.add_argument("--model", default="yolo11n.onnx", help="ruta del modelo")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="hilos intra-op de onnxruntime (0: automático)")
+    parser.add_argument("--imgsz", type=int, default=640,
+                        help="resolución de inferencia; un ONNX estático solo admite la de su export")
+    parser.add_argument("--headless", action="store_true",
+                        help="sin ventana ni anotaciones (equipos sin pantalla)")
+    parser.add_argument("--preview", action="store_true",
+                        help="habilita /preview.mjpg (solo anota y codifica con visores conectados)")
+    parser.add_argument("--preview-fps", type=float, default=5.0,
+                        help="máximo de frames por segundo codificados para el preview")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="solo ejecuta YOLO cuando la escena cambia (más una re-inferencia periódica)")
+    parser.add_argument("--motion-recheck", type=float, default=2.0,
+                        help="segundos máximos entre inferencias con la escena estática")
+    parser.add_argument("--track", type=int, default=0, metavar="N",
+                        help="con personas presentes, ejecuta YOLO cada N frames y las sigue con flujo óptico entre medias")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="FPS objetivo con el estado estable (por defecto, sin límite)")
+    parser.add_argument("--fps-incierto", type=float, default=15.0,
+                        help="FPS objetivo cuando el estado puede cambiar (con --fps)")
+    parser.add_argument("--cpu-budget", type=float, default=None,
+                        help="fracción máxima de un núcleo para el detector, p. ej. 0.5 (con --fps)")
+    parser.add_argument("--roi", action="store_true",
+                        help="tras una detección, infiere solo un recorte alrededor de la persona")
+    parser.add_argument("--roi-imgsz", type=int, default=320, help="resolución de inferencia del recorte")
+    parser.add_argument("--roi-model", default=None,
+                        help="modelo exportado a --roi-imgsz (obligatorio si --model no es un .pt con "
+                             "el backend ultralytics, o si su ONNX tiene entrada fija)")
+    parser.add_argument("--event-log", default=None, metavar="DIR",
+                        help="guarda cada frame inferido y cada cambio de estado en un registro binario en DIR")
+    parser.add_argument("--event-log-mb", type=float, default=64.0,
+                        help="tamaño máximo de cada segmento del registro (MB)")
+    parser.add_argument("--server", choices=["flask", "async"], default="flask",
+                        help="núcleo HTTP: servidor de Flask o aiohttp asíncrono (muchos clientes concurrentes)")
+    parser.add_argument("--procesos", action="store_true",
+                        help="captura y detección en procesos propios (frames por memoria compartida)")
+    parser.add_argument("--presence-filter", type=int, nargs=3, metavar=("N", "K_ON", "K_OFF"), default=None,
+                        help="confirma presencia con K_ON de N frames y ausencia con K_OFF de N (p. ej. 5 3 5)")
+    args = parser.parse_args()
+
     try:
-        # Servidor Flask en hilo
-        server = DetectionServer(host='0.0.0.0', port=5000)
-        server_thread = Thread(target=server.run, daemon=True)
+        preview = PreviewStream(max_fps=args.preview_fps) if args.preview else None
+        metrics = PrometheusMetrics()
+        event_log = (EventLog(args.event_log, max_bytes=int(args.event_log_mb * 2**20))
+                     if args.event_log else None)
+
+        # Servidor Flask (o su núcleo async) en hilo
+        server = DetectionServer(host='0.0.0.0', port=5000, preview=preview, metrics=metrics,
+                                 event_log=event_log)
+        if args.server == "async":
+            from servidor_async import AsyncDetectionServer  # aiohttp solo se requiere en este modo
+            http = AsyncDetectionServer(server)
+        else:
+            http = server
+        # Arranca antes de cargar modelo y cámaras: /estado responde "calentando" mientras tanto
+        server_thread = Thread(target=http.run, daemon=True)
         server_thread.start()
-        time.sleep(0.5)
 
         print("\n" + "="*50)
         print("📶 SERVIDOR de DETECCIÓN iniciado en: 0.0.0.0:5000")
-        print("Endpoints: /persona_detectada (POST)  /estado (GET)")
+        print("Endpoints: /persona_detectada (POST)  /estado (GET)  /estado/stream (SSE)  /metrics (GET)"
+              + ("  /preview.mjpg (GET)" if preview else ""))
         print(f"Reglas: inferencia en tiempo real, 'No personas' tras {10.0}s sin detecciones")
         print("="*50 + "\n")
 
-        detector = PersonDetector(
-            server_ip="127.0.0.1", server_port=5000,
-            cam_index=0,
+        cam_indices = [int(c) if c.isdigit() else c for c in args.cam]
+        detector_kwargs = dict(
             no_persons_grace=10.0,
-            conf_threshold=0.5
+            conf_threshold=0.5,
+            headless=args.headless,
+            motion_gate=MotionGate(recheck_interval=args.motion_recheck) if args.motion_gate else None,
+            presence_filter=PresenceFilter(*args.presence_filter) if args.presence_filter else None,
+            tracker=PersonTracker(redetect_every=args.track) if args.track > 0 else None,
+            governor=FrameRateGovernor(args.fps, args.fps_incierto, args.cpu_budget) if args.fps else None,
+            roi=RoiSelector(imgsz=args.roi_imgsz, model_path=args.roi_model) if args.roi else None,
+            event_log=event_log,
+            backend=args.backend,
+            model_path=args.model,
+            imgsz=args.imgsz,
+            ort_threads=args.threads,
         )
-        detector.run()
+
+        if args.procesos:
+            # El GIL de este proceso queda solo para el servidor HTTP
+            from procesos import DetectorProcesos
+            DetectorProcesos(server, cam_indices, detector_kwargs, preview=preview,
+                             preview_fps=args.preview_fps, t_arranque=T_ARRANQUE).start().run()
+            if event_log is not None:
+                # El proceso de detección escribe sus frames en segmentos propios; aquí, las transiciones
+                event_log.close()
+        else:
+            detector = PersonDetector(
+                server_ip="127.0.0.1", server_port=5000,
+                cam_index=cam_indices,
+                preview=preview,
+                server=server,
+                metrics=metrics,
+                **detector_kwargs
+            )
+            detector.run()
     except Exception as e:
         logger.error(f"❌ Error fatal: {e}")
 
@@ -0,0 +1,180 @@
+# evaluar_variantes.py
+# Ejecuta cada variante del modelo (ruta y resolución) sobre clips etiquetados y reporta
+# precisión/recall de detección de personas junto a la latencia por frame.
+#
+#   python camara/evaluar_variantes.py --clips clips/sala1 clips/sala2 \
+#       --variante yolo11n.onnx:640 --variante yolo11n_320.onnx:320 \
+#       --variante yolo11n_int8_estatica.onnx:640 [--out variantes.json]
+#
+# Etiquetas en formato YOLO (una .txt por imagen: "clase cx cy w h" normalizados), en
+# <clip>/labels/ si las imágenes están en <clip>/images/, o junto a cada imagen.
+# Se reportan dos niveles:
+#   - cajas:  emparejamiento con IoU >= --iou contra las cajas de persona etiquetadas
+#   - frames: "¿hay alguien?" por frame, que es lo que decide el estado del servidor
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+import cv2
+
+from captura import IMAGE_EXTENSIONS
+from postproceso import PERSON_CLASS, boxes_to_numpy, filtrar_personas
+
+
+def cargar_clip(clip_dir):
+    """Devuelve [(ruta_imagen, ruta_etiqueta)]; la etiqueta puede no existir (frame vacío)."""
+    images_dir = os.path.join(clip_dir, "images")
+    if os.path.isdir(images_dir):
+        labels_dir = os.path.join(clip_dir, "labels")
+    else:
+        images_dir = labels_dir = clip_dir
+
+    muestras = []
+    for nombre in sorted(os.listdir(images_dir)):
+        if not nombre.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        ruta = os.path.join(images_dir, nombre)
+        etiqueta = os.path.join(labels_dir, os.path.splitext(nombre)[0] + ".txt")
+        muestras.append((ruta, etiqueta))
+    return muestras
+
+
+def leer_etiquetas(etiqueta, shape):
+    """Cajas de persona etiquetadas, (G, 4) xyxy en píxeles del frame."""
+    h, w = shape[:2]
+    if not os.path.exists(etiqueta):
+        return np.empty((0, 4), dtype=np.float32)
+    filas = np.loadtxt(etiqueta, ndmin=2, dtype=np.float32)
+    if filas.size == 0:
+        return np.empty((0, 4), dtype=np.float32)
+    filas = filas[filas[:, 0] == PERSON_CLASS]
+    cx, cy, bw, bh = filas[:, 1] * w, filas[:, 2] * h, filas[:, 3] * w, filas[:, 4] * h
+    return np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+
+
+def iou_matrix(a, b):
+    """IoU entre cajas a (N, 4) y b (M, 4) -> (N, M)."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def emparejar(pred, gt, iou_threshold):
+    """Emparejamiento voraz por confianza. Devuelve (tp, fp, fn)."""
+    if len(pred) == 0 or len(gt) == 0:
+        return 0, len(pred), len(gt)
+    pred = pred[np.argsort(-pred[:, 4])]
+    ious = iou_matrix(pred[:, :4], gt)
+    usados = np.zeros(len(gt), dtype=bool)
+    tp = 0
+    for fila in ious:
+        fila = np.where(usados, -1.0, fila)
+        j = int(fila.argmax())
+        if fila[j] >= iou_threshold:
+            usados[j] = True
+            tp += 1
+    return tp, len(pred) - tp, len(gt) - tp
+
+
+def crear_predictor(backend, model_path, imgsz, conf, threads):
+    """Devuelve una función frame -> (K, 5) [x1, y1, x2, y2, conf]."""
+    if backend == "onnxruntime":
+        from onnx_backend import OnnxPersonModel
+        model = OnnxPersonModel(model_path, imgsz=imgsz, conf_threshold=conf, intra_op_threads=threads)
+        return lambda frame: model.predict([frame])[0]
+
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+
+    def predecir(frame):
+        results = model(frame, verbose=False, classes=[PERSON_CLASS], conf=conf, imgsz=imgsz)
+        return filtrar_personas(boxes_to_numpy(results[0].boxes), conf)
+    return predecir
+
+
+def ratio(a, b):
+    return a / b if b else 0.0
+
+
+def evaluar(predecir, muestras, iou_threshold, warmup=3):
+    primera = cv2.imread(muestras[0][0])
+    for _ in range(warmup):
+        predecir(primera)
+
+    tp = fp = fn = 0
+    f_tp = f_fp = f_fn = 0
+    latencias = []
+    for ruta, etiqueta in muestras:
+        frame = cv2.imread(ruta)
+        if frame is None:
+            continue
+        gt = leer_etiquetas(etiqueta, frame.shape)
+
+        t0 = time.perf_counter()
+        pred = predecir(frame)
+        latencias.append(time.perf_counter() - t0)
+
+        a, b, c = emparejar(pred, gt, iou_threshold)
+        tp, fp, fn = tp + a, fp + b, fn + c
+        hay_pred, hay_gt = len(pred) > 0, len(gt) > 0
+        f_tp += hay_pred and hay_gt
+        f_fp += hay_pred and not hay_gt
+        f_fn += hay_gt and not hay_pred
+
+    ms = np.asarray(latencias) * 1e3
+    return {
+        "frames": len(latencias),
+        "cajas": {"precision": ratio(tp, tp + fp), "recall": ratio(tp, tp + fn), "tp": tp, "fp": fp, "fn": fn},
+        "presencia": {"precision": ratio(f_tp, f_tp + f_fp), "recall": ratio(f_tp, f_tp + f_fn)},
+        "latencia_ms": {"media": float(ms.mean()), "p50": float(np.percentile(ms, 50)),
+                        "p95": float(np.percentile(ms, 95))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión/recall y latencia por variante del modelo")
+    parser.add_argument("--clips", nargs="+", required=True, help="carpetas de clips etiquetados")
+    parser.add_argument("--variante", action="append", required=True,
+                        help="ruta[:imgsz], p. ej. yolo11n_int8_estatica.onnx:416 (repetible)")
+    parser.add_argument("--backend", choices=["ultralytics", "onnxruntime"], default="onnxruntime")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--out", default=None, help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    muestras = [m for clip in args.clips for m in cargar_clip(clip)]
+    if not muestras:
+        raise SystemExit("No se encontraron imágenes en los clips indicados")
+
+    resultados = {}
+    for variante in args.variante:
+        ruta, _, imgsz = variante.partition(":")
+        imgsz = int(imgsz) if imgsz else 640
+        predecir = crear_predictor(args.backend, ruta, imgsz, args.conf, args.threads)
+        resultados[f"{os.path.basename(ruta)}@{imgsz}"] = evaluar(predecir, muestras, args.iou)
+
+    print(f"\n{len(muestras)} frames, backend {args.backend}, conf {args.conf}, IoU {args.iou}")
+    print(f"{'variante':>32} | {'P cajas':>7} | {'R cajas':>7} | {'P frames':>8} | {'R frames':>8} | "
+          f"{'ms p50':>7} | {'ms p95':>7}")
+    print("-" * 96)
+    for nombre, r in resultados.items():
+        print(f"{nombre:>32} | {r['cajas']['precision']:>7.3f} | {r['cajas']['recall']:>7.3f} | "
+              f"{r['presencia']['precision']:>8.3f} | {r['presencia']['recall']:>8.3f} | "
+              f"{r['latencia_ms']['p50']:>7.2f} | {r['latencia_ms']['p95']:>7.2f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), "variantes": resultados}, f, indent=2)
+        print(f"Resultados guardados en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
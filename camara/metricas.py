@@ -0,0 +1,122 @@
+# metricas.py
+from bisect import bisect_left
+from threading import Lock
+from collections import defaultdict
+
+import numpy as np
+
+
+# ------------------ Registro de latencias (benchmarks offline) ------------------
+class LatencyRecorder:
+    """
+    Guarda cada muestra de duración por etapa y contadores simples.
+    El detector solo usa `observe(nombre, segundos)`, `incr(nombre, n)` y `set(nombre, valor)`,
+    así que cualquier objeto con esa interfaz puede recibir sus tiempos.
+    """
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.gauges = {}
+
+    def observe(self, nombre, segundos):
+        self.samples[nombre].append(segundos)
+
+    def incr(self, nombre, n=1):
+        self.counters[nombre] += n
+
+    def set(self, nombre, valor):
+        self.gauges[nombre] = valor
+
+    def resumen(self):
+        """Por etapa: nº de muestras, media y percentiles p50/p95/p99 en milisegundos."""
+        etapas = {}
+        for nombre, valores in self.samples.items():
+            ms = np.asarray(valores) * 1e3
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            etapas[nombre] = {
+                "n": len(ms),
+                "media_ms": float(ms.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+            }
+        return etapas
+
+
+# ------------------ Métricas estilo Prometheus ------------------
+# Límites superiores (s) de los buckets de los histogramas de latencia
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = Lock()
+
+
+class PrometheusMetrics:
+    """
+    Histogramas, contadores y gauges con la misma interfaz que LatencyRecorder
+    (`observe`, `incr`) más `set` para gauges. Registrar una muestra es una búsqueda
+    binaria y un incremento bajo un lock sin contención; el texto en formato de
+    exposición de Prometheus solo se genera cuando alguien consulta /metrics.
+    """
+    def __init__(self, prefix="deteccion", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._lock = Lock()
+        self._externo = ""     # exposición ya renderizada de otro proceso (detector separado)
+
+    def observe(self, nombre, segundos):
+        h = self._histograms.get(nombre)
+        if h is None:
+            with self._lock:
+                h = self._histograms.setdefault(nombre, _Histogram(len(self.buckets)))
+        i = bisect_left(self.buckets, segundos)
+        with h.lock:
+            h.counts[i] += 1
+            h.sum += segundos
+            h.count += 1
+
+    def incr(self, nombre, n=1):
+        with self._lock:
+            self._counters[nombre] += n
+
+    def set(self, nombre, valor):
+        self._gauges[nombre] = valor
+
+    def incluir(self, texto):
+        """Añade tal cual al final de `render()` las métricas renderizadas por otro proceso."""
+        self._externo = texto
+
+    def render(self):
+        """Texto en formato de exposición de Prometheus (text/plain; version=0.0.4)."""
+        lineas = []
+        for nombre, h in sorted(self._histograms.items()):
+            metrica = f"{self.prefix}_{nombre}_segundos"
+            with h.lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            lineas.append(f"# TYPE {metrica} histogram")
+            acumulado = 0
+            for limite, c in zip(self.buckets, counts):
+                acumulado += c
+                lineas.append(f'{metrica}_bucket{{le="{limite}"}} {acumulado}')
+            lineas.append(f'{metrica}_bucket{{le="+Inf"}} {count}')
+            lineas.append(f"{metrica}_sum {total}")
+            lineas.append(f"{metrica}_count {count}")
+        with self._lock:
+            counters = dict(self._counters)
+        for nombre, valor in sorted(counters.items()):
+            lineas.append(f"# TYPE {self.prefix}_{nombre}_total counter")
+            lineas.append(f"{self.prefix}_{nombre}_total {valor}")
+        for nombre, valor in sorted(self._gauges.items()):
+            lineas.append(f"# TYPE {self.prefix}_{nombre} gauge")
+            lineas.append(f"{self.prefix}_{nombre} {float(valor)}")
+        return "\n".join(lineas) + "\n" + self._externo
@@ -0,0 +1,85 @@
+# movimiento.py
+import time
+import logging
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Pre-etapa de movimiento ------------------
+class MotionGate:
+    """
+    Decide si vale la pena ejecutar YOLO sobre un frame.
+    Compara una versión reducida en escala de grises del frame con la del último frame
+    inferido: si la fracción de píxeles que cambiaron supera `min_changed_fraction`, hay
+    movimiento y se infiere. Además se fuerza una inferencia cada `recheck_interval`
+    segundos para confirmar a una persona quieta antes de que venza `no_persons_grace`.
+    Con varias cámaras, cada una lleva su propia referencia (parámetro `key`).
+    """
+    def __init__(self, size=(160, 120), pixel_threshold=25, min_changed_fraction=0.01,
+                 recheck_interval=2.0, log_interval=30.0):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.recheck_interval = recheck_interval
+        self.log_interval = log_interval
+
+        self._reference = {}            # key -> frame reducido del último frame inferido
+        self._last_inference = {}       # key -> instante de la última inferencia
+        self.last_score = 0.0           # fracción de píxeles cambiados del último frame
+
+        # Estadísticas (totales y de la ventana de log actual)
+        self.inferred = 0
+        self.skipped = 0
+        self._window_inferred = 0
+        self._window_skipped = 0
+        self._last_log = time.monotonic()
+
+    def _reduce(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_infer(self, frame, now, key=0):
+        """Devuelve True si hay que ejecutar el modelo sobre este frame."""
+        small = self._reduce(frame)
+        reference = self._reference.get(key)
+
+        if reference is None or now - self._last_inference[key] >= self.recheck_interval:
+            infer = True
+        else:
+            diff = cv2.absdiff(small, reference)
+            self.last_score = cv2.countNonZero(
+                cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1]) / diff.size
+            infer = self.last_score >= self.min_changed_fraction
+
+        if infer:
+            self._reference[key] = small
+            self._last_inference[key] = now
+            self.inferred += 1
+            self._window_inferred += 1
+        else:
+            self.skipped += 1
+            self._window_skipped += 1
+
+        self._maybe_log()
+        return infer
+
+    def skip_ratio(self):
+        total = self.inferred + self.skipped
+        return self.skipped / total if total else 0.0
+
+    def _maybe_log(self):
+        now = time.monotonic()
+        if now - self._last_log < self.log_interval:
+            return
+        total = self._window_inferred + self._window_skipped
+        if total:
+            ratio = self._window_skipped / total
+            logger.info(f"🎞️ Gate de movimiento: {self._window_skipped}/{total} frames sin inferencia "
+                        f"({ratio:.0%}) en los últimos {now - self._last_log:.0f}s")
+        self._window_inferred = 0
+        self._window_skipped = 0
+        self._last_log = now
@@ -0,0 +1,98 @@
+# notificacion.py
+import logging
+from threading import Thread, Condition
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Notificación en proceso ------------------
+class LocalNotifier:
+    """
+    Entrega el estado directamente a un DetectionServer del mismo proceso,
+    sin pasar por HTTP. `procesar_mensaje` solo toma un lock, así que no bloquea.
+    """
+    def __init__(self, server):
+        self.server = server
+
+    def notify(self, personas_presentes, timestamp, camaras=None, traza=None):
+        self.server.procesar_mensaje(personas_presentes, timestamp, camaras, traza)
+        estado = "ACTIVAR" if personas_presentes else "DESACTIVAR"
+        logger.info(f"✅ Notificación entregada (en proceso): {estado}")
+
+    def stop(self):
+        pass
+
+
+# ------------------ Notificación HTTP en segundo plano ------------------
+class HttpNotifier:
+    """
+    Envía el estado a un servidor remoto desde un hilo propio, para que el loop de
+    detección nunca espere a la red. Solo importa el último estado: si llegan varias
+    actualizaciones mientras un POST está en curso, se fusionan y se envía la más reciente.
+    Si un envío falla y no hay uno más nuevo, se reintenta tras `retry_interval`.
+    """
+    def __init__(self, server_url, timeout=2, retry_interval=1.0):
+        # requests solo hace falta con servidor remoto: no retrasa el arranque en proceso
+        import requests
+        self._session = requests.Session()  # reutiliza la conexión entre envíos
+        self.server_url = server_url
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+
+        self._cond = Condition()
+        self._pending = None        # (personas_presentes, timestamp, camaras, traza) pendiente de enviar
+        self.coalesced = 0          # actualizaciones sustituidas antes de enviarse
+
+        self.running = True
+        self._thread = Thread(target=self._loop, name="notificador-http", daemon=True)
+        self._thread.start()
+
+    def notify(self, personas_presentes, timestamp, camaras=None, traza=None):
+        """No bloquea: deja el estado en el slot y despierta al hilo emisor."""
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (personas_presentes, timestamp, camaras, traza)
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self.running)
+                if not self.running:
+                    return
+                pending = self._pending
+                self._pending = None
+
+            if self._post(*pending):
+                continue
+
+            # Reintentar el mismo estado salvo que entretanto haya llegado uno más nuevo
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self.running,
+                                    self.retry_interval)
+                if self._pending is None:
+                    self._pending = pending
+
+    def _post(self, personas_presentes, timestamp, camaras=None, traza=None):
+        try:
+            payload = {"personas_detectadas": personas_presentes, "timestamp": timestamp}
+            if camaras is not None:
+                payload["camaras"] = camaras
+            if traza is not None:
+                payload["traza"] = traza
+            resp = self._session.post(self.server_url, json=payload, timeout=self.timeout)
+            if resp.status_code == 200:
+                estado = "ACTIVAR" if personas_presentes else "DESACTIVAR"
+                logger.info(f"✅ Notificación enviada: {estado}")
+                return True
+            logger.warning(f"⚠️ Respuesta inesperada del servidor: {resp.status_code}")
+        except Exception as e:
+            logger.error(f"❌ Error al notificar servidor: {e}")
+        return False
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=self.timeout + 1)
@@ -0,0 +1,176 @@
+# onnx_backend.py
+import time
+import logging
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from postproceso import PERSON_CLASS
+
+logger = logging.getLogger(__name__)
+
+# Estrides de las cabezas de detección de YOLOv8/YOLO11
+STRIDES = (8, 16, 32)
+
+
+def nms(boxes, scores, iou_threshold):
+    """
+    NMS voraz en NumPy. boxes (K, 4) xyxy, scores (K,). Devuelve índices conservados,
+    de mayor a menor score.
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+# ------------------ Backend ONNX Runtime ------------------
+class OnnxPersonModel:
+    """
+    Ejecuta el export ONNX de YOLO directamente con onnxruntime, sin el wrapper de ultralytics.
+    - Letterbox hacia un buffer de entrada (B, 3, H, W) preasignado y reutilizado.
+    - Salida enlazada con io_binding a un buffer preasignado cuando su forma es estática.
+    - Decodificación y NMS en NumPy solo para la clase persona.
+    `predict(frames)` devuelve, por frame, un array (K, 5) [x1, y1, x2, y2, conf] en
+    coordenadas del frame original, igual que `filtrar_personas`.
+    """
+    def __init__(self, model_path="yolo11n.onnx", imgsz=640, conf_threshold=0.5,
+                 iou_threshold=0.45, intra_op_threads=0, inter_op_threads=0,
+                 execution_mode="sequential", providers=None, max_batch=1):
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.metrics = None     # receptor opcional de tiempos (inferencia / postproceso)
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = intra_op_threads   # 0: lo decide onnxruntime
+        opts.inter_op_num_threads = inter_op_threads
+        opts.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if execution_mode == "parallel"
+                               else ort.ExecutionMode.ORT_SEQUENTIAL)
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=opts,
+                                            providers=providers or ["CPUExecutionProvider"])
+
+        inp = self.session.get_inputs()[0]
+        out = self.session.get_outputs()[0]
+        self.input_name = inp.name
+        self.output_name = out.name
+
+        # Dimensiones: las del modelo si son estáticas, si no `imgsz`
+        _, _, h, w = inp.shape
+        self.height = h if isinstance(h, int) else imgsz
+        self.width = w if isinstance(w, int) else imgsz
+        if isinstance(h, int) and (h, w) != (imgsz, imgsz):
+            logger.warning(f"El modelo tiene entrada fija {w}x{h}; se ignora imgsz={imgsz} "
+                           f"(exportar con dynamic=True o con ese imgsz)")
+        self.dynamic_batch = not isinstance(inp.shape[0], int)
+        self.max_batch = max_batch if self.dynamic_batch else 1
+
+        # Salida (B, 4 + nc, N): si canales y anclas son estáticos se preasigna
+        out_shape = out.shape
+        self._out_dims = None
+        if len(out_shape) == 3 and isinstance(out_shape[1], int):
+            n = out_shape[2] if isinstance(out_shape[2], int) else \
+                sum((self.height // s) * (self.width // s) for s in STRIDES)
+            self._out_dims = (out_shape[1], n)
+        self._io = self.session.io_binding()
+        self._outputs = {}
+
+        # Buffers reutilizados entre llamadas
+        self._input = np.empty((self.max_batch, 3, self.height, self.width), dtype=np.float32)
+        self._canvas = np.full((self.height, self.width, 3), 114, dtype=np.uint8)
+        self._geometry = None
+
+        logger.info(f"Backend ONNX Runtime: {model_path} {self.width}x{self.height}, "
+                    f"batch {'dinámico' if self.dynamic_batch else 'fijo'}, "
+                    f"providers={self.session.get_providers()}")
+
+    def _letterbox(self, frame, slot):
+        """Redimensiona manteniendo aspecto dentro de self._input[slot]. Devuelve (escala, pad_x, pad_y)."""
+        fh, fw = frame.shape[:2]
+        r = min(self.height / fh, self.width / fw)
+        nw, nh = int(round(fw * r)), int(round(fh * r))
+        pad_x, pad_y = (self.width - nw) // 2, (self.height - nh) // 2
+
+        # El relleno gris solo se repinta si cambia la geometría (frames de otro tamaño)
+        canvas = self._canvas
+        if self._geometry != (nw, nh, pad_x, pad_y):
+            canvas[...] = 114
+            self._geometry = (nw, nh, pad_x, pad_y)
+        # Se redimensiona directamente sobre su hueco del lienzo: sin buffers por tamaño, que
+        # con recortes ROI (uno distinto por frame) crecerían sin límite
+        cv2.resize(frame, (nw, nh), dst=canvas[pad_y:pad_y + nh, pad_x:pad_x + nw],
+                   interpolation=cv2.INTER_LINEAR)
+
+        # HWC BGR uint8 -> CHW RGB float32 [0, 1], escrito directamente en el buffer de entrada
+        np.multiply(canvas.transpose(2, 0, 1)[::-1], np.float32(1 / 255), out=self._input[slot],
+                    casting="unsafe")
+        return r, pad_x, pad_y
+
+    def _infer(self, batch):
+        inp = self._input[:batch]
+        if self._out_dims is None:
+            return self.session.run([self.output_name], {self.input_name: inp})[0]
+
+        out = self._outputs.get(batch)
+        if out is None:
+            out = self._outputs[batch] = np.empty((batch,) + self._out_dims, dtype=np.float32)
+        self._io.bind_cpu_input(self.input_name, inp)
+        self._io.bind_output(self.output_name, "cpu", 0, np.float32, out.shape, out.ctypes.data)
+        self.session.run_with_iobinding(self._io)
+        return out
+
+    def _decode(self, pred, r, pad_x, pad_y, frame_shape):
+        """pred (4 + nc, N) -> (K, 5) personas en coordenadas del frame."""
+        scores = pred[4 + PERSON_CLASS]
+        idx = np.flatnonzero(scores >= self.conf_threshold)
+        if idx.size == 0:
+            return np.empty((0, 5), dtype=np.float32)
+
+        cx, cy, w, h = pred[0, idx], pred[1, idx], pred[2, idx], pred[3, idx]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        conf = scores[idx]
+
+        keep = nms(boxes, conf, self.iou_threshold)
+        boxes, conf = boxes[keep], conf[keep]
+
+        # Deshacer letterbox
+        boxes[:, [0, 2]] -= pad_x
+        boxes[:, [1, 3]] -= pad_y
+        boxes /= r
+        fh, fw = frame_shape[:2]
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, fw)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, fh)
+
+        result = np.empty((len(keep), 5), dtype=np.float32)
+        result[:, :4] = boxes
+        result[:, 4] = conf
+        return result
+
+    def predict(self, frames):
+        """Infiere una lista de frames BGR y devuelve una lista de arrays (K, 5)."""
+        salida = []
+        for start in range(0, len(frames), self.max_batch):
+            chunk = frames[start:start + self.max_batch]
+            t0 = time.perf_counter()
+            params = [self._letterbox(frame, slot) for slot, frame in enumerate(chunk)]
+            out = self._infer(len(chunk))
+            t1 = time.perf_counter()
+            for b, (frame, (r, pad_x, pad_y)) in enumerate(zip(chunk, params)):
+                salida.append(self._decode(out[b], r, pad_x, pad_y, frame.shape))
+            if self.metrics is not None:
+                self.metrics.observe("inferencia", t1 - t0)
+                self.metrics.observe("postproceso", time.perf_counter() - t1)
+        return salida
@@ -0,0 +1,69 @@
+# planificador.py
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Ritmo del loop de detección ------------------
+class FrameRateGovernor:
+    """
+    Fija el ritmo del loop de detección en lugar de dejarlo correr a toda velocidad.
+    - `fps_estable`: objetivo con el estado asentado (alguien detectado hace poco, o nadie
+      y sin evidencia nueva); ahorra CPU y energía en el equipo de la cámara.
+    - `fps_incierto`: objetivo mientras el estado puede cambiar: con alguien presente, pasada
+      la fracción `grace_fraction` de la ventana de gracia sin verlo; sin nadie, en cuanto
+      un frame muestra a una persona que todavía no se confirmó.
+    - `cpu_budget`: fracción de un núcleo que puede consumir el proceso (p. ej. 0.5); si
+      con el objetivo actual se pasaría, se duerme lo necesario para no superarla.
+    Cada `log_interval` segundos se reporta el FPS logrado frente al objetivo.
+    """
+    def __init__(self, fps_estable=5.0, fps_incierto=15.0, cpu_budget=None, grace_fraction=0.5,
+                 log_interval=30.0):
+        if cpu_budget is not None and cpu_budget <= 0:
+            raise ValueError("cpu_budget debe ser positivo")
+        self.fps_estable = fps_estable
+        self.fps_incierto = fps_incierto
+        self.cpu_budget = cpu_budget
+        self.grace_fraction = grace_fraction
+        self.log_interval = log_interval
+
+        self.objetivo = fps_estable      # FPS objetivo de la última iteración
+        self.fps_logrado = 0.0           # iteraciones/s de la última ventana de medición
+        self.cpu_uso = 0.0               # fracción de núcleo consumida en esa ventana
+
+        self._t = None                   # fin de la espera anterior (monotonic)
+        self._cpu = None                 # process_time() en ese instante
+        self._ventana = (time.monotonic(), time.process_time(), 0)  # inicio, cpu, iteraciones
+        self._last_log = time.monotonic()
+
+    def esperar(self, incierto):
+        """Llamar al final de cada iteración: duerme lo que falte para cumplir el objetivo y el presupuesto."""
+        self.objetivo = self.fps_incierto if incierto else self.fps_estable
+        ahora, cpu = time.monotonic(), time.process_time()
+        if self._t is not None:
+            transcurrido = ahora - self._t
+            espera = 1.0 / self.objetivo - transcurrido
+            if self.cpu_budget is not None:
+                # cpu / (transcurrido + espera) <= cpu_budget
+                espera = max(espera, (cpu - self._cpu) / self.cpu_budget - transcurrido)
+            if espera > 0:
+                time.sleep(espera)
+        self._t, self._cpu = time.monotonic(), time.process_time()
+        self._medir(incierto)
+
+    def _medir(self, incierto):
+        t0, cpu0, n = self._ventana
+        n += 1
+        elapsed = self._t - t0
+        if elapsed < 1.0:
+            self._ventana = (t0, cpu0, n)
+            return
+        self.fps_logrado = n / elapsed
+        self.cpu_uso = (self._cpu - cpu0) / elapsed
+        self._ventana = (self._t, self._cpu, 0)
+
+        if self._t - self._last_log >= self.log_interval:
+            self._last_log = self._t
+            logger.info(f"🎛️ FPS logrado {self.fps_logrado:.1f} / objetivo {self.objetivo:.1f} "
+                        f"({'incierto' if incierto else 'estable'}), CPU {self.cpu_uso:.0%} de un núcleo")
@@ -0,0 +1,26 @@
+# postproceso.py
+import numpy as np
+
+PERSON_CLASS = 0  # clase persona (COCO)
+
+
+def boxes_to_numpy(boxes):
+    """
+    Convierte `result.boxes` de ultralytics a un array (N, 6) [x1, y1, x2, y2, conf, cls]
+    con una sola conversión tensor -> NumPy, en lugar de una por caja y por atributo.
+    """
+    if boxes is None:
+        return np.empty((0, 6), dtype=np.float32)
+    data = boxes.data
+    if hasattr(data, "cpu"):  # torch.Tensor
+        data = data.cpu().numpy()
+    return np.asarray(data, dtype=np.float32).reshape(-1, 6)
+
+
+def filtrar_personas(data, conf_threshold, person_cls=PERSON_CLASS):
+    """
+    Filtra de una vez todas las detecciones (N, 6) y devuelve un array compacto (K, 5)
+    [x1, y1, x2, y2, conf] con las personas por encima del umbral.
+    """
+    mask = (data[:, 5] == person_cls) & (data[:, 4] >= conf_threshold)
+    return np.ascontiguousarray(data[mask, :5])
@@ -0,0 +1,97 @@
+# preview.py
+import time
+import queue
+import logging
+from threading import Lock
+from multiprocessing.sharedctypes import RawValue
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Preview MJPEG bajo demanda ------------------
+class PreviewStream:
+    """
+    Publica frames anotados como MJPEG solo mientras haya al menos un visor conectado.
+    Sin visores, `wants_frame()` devuelve False y el detector no dibuja ni codifica nada.
+    La codificación JPEG se limita a `max_fps` frames por segundo, sea cual sea la
+    velocidad de inferencia.
+    El contador de visores vive en memoria compartida (`viewers`), de modo que un detector
+    en otro proceso puede consultarlo con su propio PreviewStream (ver procesos.py).
+    Cada visor se da de alta con `subscribe()`, que le entrega una cola thread-safe con el
+    último frame publicado, y de baja con `unsubscribe()`.
+    """
+    BOUNDARY = "frame"
+
+    def __init__(self, max_fps=5.0, jpeg_quality=70, viewers=None):
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+
+        self._lock = Lock()
+        self._colas = set()               # una cola por visor suscrito
+        self._last_encode = 0.0
+        self.shared_viewers = viewers if viewers is not None else RawValue("i", 0)
+
+    @property
+    def viewers(self):
+        return self.shared_viewers.value
+
+    def wants_frame(self):
+        """Barato: lo consulta el detector en cada frame antes de anotar."""
+        if self.viewers <= 0:
+            return False
+        return time.monotonic() - self._last_encode >= self.min_interval
+
+    def publish(self, frame):
+        """Codifica el frame a JPEG y despierta a los visores."""
+        self._last_encode = time.monotonic()
+        ok, buf = cv2.imencode(".jpg", frame, self.encode_params)
+        if not ok:
+            logger.warning("No se pudo codificar el frame de preview")
+            return
+        self.publish_jpeg(buf.tobytes())
+
+    def publish_jpeg(self, jpeg):
+        """Publica un frame ya codificado como parte multipart en la cola de cada visor."""
+        parte = (b"--" + self.BOUNDARY.encode() + b"\r\n"
+                 b"Content-Type: image/jpeg\r\n"
+                 b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        with self._lock:
+            for cola in self._colas:
+                # Un visor lento solo recibe el frame más reciente
+                try:
+                    cola.get_nowait()
+                except queue.Empty:
+                    pass
+                cola.put_nowait(parte)
+
+    def subscribe(self):
+        """Alta de un visor: devuelve la cola de la que leer sus frames."""
+        cola = queue.Queue(maxsize=1)
+        with self._lock:
+            self._colas.add(cola)
+            self.shared_viewers.value += 1
+        logger.info(f"👀 Visor de preview conectado ({self.viewers} activos)")
+        return cola
+
+    def unsubscribe(self, cola):
+        """Baja de un visor; se puede llamar desde cualquier hilo y más de una vez."""
+        with self._lock:
+            if cola not in self._colas:
+                return
+            self._colas.discard(cola)
+            self.shared_viewers.value -= 1
+        logger.info(f"👋 Visor de preview desconectado ({self.viewers} activos)")
+
+    def stream(self):
+        """Generador multipart/x-mixed-replace para una respuesta Flask."""
+        cola = self.subscribe()
+        try:
+            while True:
+                try:
+                    yield cola.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+        finally:
+            self.unsubscribe(cola)
@@ -0,0 +1,379 @@
+# procesos.py
+# Detector en procesos separados del servidor HTTP:
+#
+#   proceso principal  -> DetectionServer (Flask o async) + hilo receptor del canal IPC
+#   proceso "captura"  -> un hilo por cámara escribiendo en un anillo de memoria compartida
+#   proceso "deteccion"-> PersonDetector leyendo los anillos sin copiar los frames
+#
+# Así la inferencia no compite por el GIL con las peticiones a /estado. Los frames no se
+# serializan: cada cámara tiene un anillo de `slots` buffers NumPy preasignados en
+# memoria compartida; solo viajan por el Pipe los mensajes de estado (y el JPEG del
+# preview cuando hay visores).
+import time
+import logging
+import multiprocessing as mp
+from threading import Thread, Lock
+from multiprocessing import shared_memory
+
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Cabecera de cada anillo (int64)
+_SEQ, _SLOT, _LEYENDO, _CONSUMIDO, _EOF, _DESCARTADOS, _ERRORES = range(7)
+_HEADER = 8
+
+
+# ------------------ Anillo de frames en memoria compartida ------------------
+class SharedFrameRing:
+    """
+    `slots` frames (alto, ancho, 3) uint8 preasignados en un bloque de memoria compartida,
+    con un único escritor (la captura) y un único lector (la inferencia).
+
+    El escritor nunca toca el último frame publicado ni el que el lector tiene tomado,
+    así que con 3 o más slots siempre tiene uno libre y nunca espera al lector; el lector
+    recibe una vista del slot (sin copia) válida hasta que toma el siguiente frame.
+    Cada campo de la cabecera es un int64 alineado, que se lee y escribe de forma atómica.
+    Cada slot guarda además su número de secuencia, escrito antes de publicarlo, de modo
+    que el lector nunca empareja un frame con la secuencia de otro.
+    """
+    def __init__(self, name=None, slots=4, shape=(480, 640, 3), create=False):
+        if slots < 3:
+            raise ValueError("SharedFrameRing necesita al menos 3 slots")
+        self.slots = slots
+        self.shape = tuple(shape)
+        frame_bytes = int(np.prod(self.shape))
+        offset = _HEADER * 8 + slots * 16
+        size = offset + slots * frame_bytes
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = _adjuntar(name)
+        self.name = self.shm.name
+        self.header = np.ndarray((_HEADER,), dtype=np.int64, buffer=self.shm.buf)
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=self.shm.buf, offset=_HEADER * 8)
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf, offset=_HEADER * 8 + slots * 8)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+        if create:
+            self.header[:] = 0
+            self.seqs[:] = 0
+            self.header[_SLOT] = self.header[_LEYENDO] = -1
+
+    # --- escritor ---
+    def slot_libre(self):
+        """Índice de un slot que ni está publicado ni lo tiene el lector."""
+        ocupados = (self.header[_SLOT], self.header[_LEYENDO])
+        for slot in range(self.slots):
+            if slot not in ocupados:
+                return slot
+
+    def publicar(self, slot, ts):
+        seq = self.header[_SEQ] + 1
+        self.timestamps[slot] = ts
+        self.seqs[slot] = seq
+        if self.header[_SEQ] > self.header[_CONSUMIDO]:
+            self.header[_DESCARTADOS] += 1
+        self.header[_SLOT] = slot
+        self.header[_SEQ] = seq         # el último: a partir de aquí el lector puede tomarlo
+
+    def pendiente(self):
+        """True si el último frame publicado aún no se consumió (lockstep)."""
+        return self.header[_SEQ] > self.header[_CONSUMIDO]
+
+    def marcar_fin(self):
+        self.header[_EOF] = 1
+
+    def error_lectura(self):
+        self.header[_ERRORES] += 1
+
+    # --- lector ---
+    def tomar(self, ultimo_seq):
+        """
+        Si hay un frame más nuevo que `ultimo_seq`, lo reserva y devuelve (seq, vista, ts);
+        si no, None. La vista sigue siendo válida hasta la siguiente llamada que devuelva un frame.
+        """
+        while True:
+            if self.header[_SEQ] <= ultimo_seq:
+                return None
+            slot = self.header[_SLOT]
+            self.header[_LEYENDO] = slot
+            # Si el escritor publicó otro slot entre medias, puede estar reutilizando este
+            if self.header[_SLOT] == slot:
+                # El slot ya no puede cambiar: su secuencia es la del frame que se devuelve
+                # (nunca menor que la _SEQ leída arriba, que se publica después del slot)
+                seq = self.seqs[slot]
+                self.header[_CONSUMIDO] = seq
+                return int(seq), self.frames[slot], float(self.timestamps[slot])
+
+    def terminado(self):
+        return bool(self.header[_EOF])
+
+    def stats(self):
+        return {
+            "frames_capturados": int(self.header[_SEQ]),
+            "frames_descartados": int(self.header[_DESCARTADOS]),
+            "errores_lectura": int(self.header[_ERRORES]),
+        }
+
+    def close(self):
+        # Las vistas NumPy deben soltarse antes de cerrar el bloque
+        self.header = self.timestamps = self.seqs = self.frames = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _adjuntar(name):
+    # Solo el proceso que crea el bloque lo libera. Los hijos (spawn) comparten su
+    # resource_tracker, donde registrar el mismo nombre otra vez no tiene efecto; desde
+    # 3.13 se evita el registro directamente con track=False
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrameReader:
+    """
+    Lado de la inferencia: misma interfaz que FrameGrabberGroup (start / read / finished /
+    stats / stop), leyendo de un SharedFrameRing por cámara. Entre procesos no hay una
+    Condition que esperar, así que `read()` sondea las cabeceras cada `poll_interval` s.
+    """
+    def __init__(self, rings, batch_window=0.01, poll_interval=0.001):
+        self.rings = rings
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self._seqs = [0] * len(rings)
+
+    def __len__(self):
+        return len(self.rings)
+
+    def start(self):
+        return self
+
+    def _nuevos(self):
+        return [ring.header[_SEQ] > seq for ring, seq in zip(self.rings, self._seqs)]
+
+    def read(self, timeout=1.0):
+        limite = time.monotonic() + timeout
+        while not any(self._nuevos()):
+            if self.finished() or time.monotonic() >= limite:
+                return []
+            time.sleep(self.poll_interval)
+
+        if len(self.rings) > 1:
+            limite = time.monotonic() + self.batch_window
+            while not all(n or ring.terminado() for n, ring in zip(self._nuevos(), self.rings)):
+                if time.monotonic() >= limite:
+                    break
+                time.sleep(self.poll_interval)
+
+        frames = []
+        for i, ring in enumerate(self.rings):
+            tomado = ring.tomar(self._seqs[i])
+            if tomado is not None:
+                self._seqs[i], frame, ts = tomado
+                frames.append((i, frame, ts))
+        return frames
+
+    def finished(self):
+        return all(ring.terminado() and ring.header[_SEQ] <= seq
+                   for ring, seq in zip(self.rings, self._seqs))
+
+    def stats(self):
+        return [ring.stats() for ring in self.rings]
+
+    def stop(self):
+        pass
+
+
+# ------------------ Proceso de captura ------------------
+def _capturar(cap, ring, realtime, parar):
+    from captura import FileSource
+    is_file = isinstance(cap, FileSource)
+    lockstep = is_file and not realtime
+    h, w = ring.shape[:2]
+    while not parar.is_set():
+        if lockstep:
+            # Replays sin pérdidas: no pisar un frame que la inferencia aún no tomó
+            while ring.pendiente() and not parar.is_set():
+                time.sleep(0.0005)
+
+        slot = ring.slot_libre()
+        destino = ring.frames[slot]
+        if is_file:
+            ret, frame = cap.read()
+            ts = cap.timestamp()
+        else:
+            # VideoCapture escribe directamente en el buffer compartido si coincide el tamaño
+            ret, frame = cap.read(destino)
+            ts = time.monotonic()
+        if not ret:
+            if is_file:
+                ring.marcar_fin()
+                return
+            ring.error_lectura()
+            time.sleep(0.05)
+            continue
+        if frame.ctypes.data != destino.ctypes.data:
+            destino[:] = frame if frame.shape == destino.shape else cv2.resize(frame, (w, h))
+        ring.publicar(slot, ts)
+
+
+def proceso_captura(cam_indices, nombres, shape, slots, realtime, parar):
+    from captura import abrir_fuente
+    logging.basicConfig(level=logging.INFO)
+    rings = [SharedFrameRing(n, slots=slots, shape=shape) for n in nombres]
+    caps = [abrir_fuente(idx, realtime=realtime) for idx in cam_indices]
+    hilos = [Thread(target=_capturar, args=(cap, ring, realtime, parar), name=f"captura-{i}", daemon=True)
+             for i, (cap, ring) in enumerate(zip(caps, rings))]
+    for t in hilos:
+        t.start()
+    for t in hilos:
+        t.join()
+    for ring in rings:
+        ring.marcar_fin()  # también al parar cámaras en vivo: el detector sale de su loop
+    for cap in caps:
+        cap.release()
+    for ring in rings:
+        ring.close()
+
+
+# ------------------ Canal IPC detector -> servidor ------------------
+class _Canal:
+    """Extremo de escritura del Pipe, compartido por los hilos del proceso detector."""
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = Lock()
+
+    def send(self, mensaje):
+        with self.lock:
+            self.conn.send(mensaje)
+
+
+class PipeNotifier:
+    """Misma interfaz que LocalNotifier/HttpNotifier: entrega el estado al servidor por el Pipe."""
+    def __init__(self, canal):
+        self.canal = canal
+
+    def notify(self, personas, ts, camaras=None, traza=None):
+        self.canal.send(("estado", personas, ts, camaras, traza))
+
+    def stop(self):
+        pass
+
+
+def _preview_remoto(canal, viewers, max_fps):
+    from preview import PreviewStream
+
+    class PreviewRemoto(PreviewStream):
+        # Codifica en el proceso detector y envía el JPEG; los visores están en el servidor
+        def publish_jpeg(self, jpeg):
+            canal.send(("preview", jpeg))
+
+    return PreviewRemoto(max_fps=max_fps, viewers=viewers)
+
+
+def proceso_deteccion(cam_indices, nombres, shape, slots, conn, viewers, preview_fps,
+                      detector_kwargs, t_arranque, metricas_interval=2.0):
+    import deteccion_server
+    from metricas import PrometheusMetrics
+    logging.basicConfig(level=logging.INFO)
+    deteccion_server.T_ARRANQUE = t_arranque  # el tiempo a la primera detección cuenta desde el proceso padre
+
+    canal = _Canal(conn)
+    metrics = PrometheusMetrics()
+    rings = [SharedFrameRing(n, slots=slots, shape=shape) for n in nombres]
+    detector = deteccion_server.PersonDetector(
+        cam_index=cam_indices,
+        notifier=PipeNotifier(canal),
+        grabbers=SharedFrameReader(rings),
+        preview=_preview_remoto(canal, viewers, preview_fps) if viewers is not None else None,
+        metrics=metrics,
+        **detector_kwargs,
+    )
+
+    def enviar_metricas():
+        while True:
+            time.sleep(metricas_interval)
+            canal.send(("metricas", metrics.render()))
+    Thread(target=enviar_metricas, name="metricas-ipc", daemon=True).start()
+
+    try:
+        detector.run()
+    finally:
+        canal.send(("fin",))
+
+
+class DetectorProcesos:
+    """
+    Lanza la captura y la detección en procesos propios (contexto "spawn": no hereda
+    los hilos de Flask ni el estado de OpenCV/torch) y aplica en `server` los mensajes
+    que llegan por el Pipe. `run()` bloquea hasta que el detector termina.
+    """
+    def __init__(self, server, cam_indices, detector_kwargs, preview=None, preview_fps=5.0,
+                 shape=(480, 640, 3), slots=4, replay_realtime=False, t_arranque=None,
+                 metricas_interval=2.0):
+        self.server = server
+        self.preview = preview
+        ctx = mp.get_context("spawn")
+        self.rings = [SharedFrameRing(slots=slots, shape=shape, create=True) for _ in cam_indices]
+        nombres = [r.name for r in self.rings]
+        self._parar = ctx.Event()
+        self._recv, envio = ctx.Pipe(duplex=False)
+
+        self.captura = ctx.Process(
+            target=proceso_captura, name="captura", daemon=True,
+            args=(cam_indices, nombres, shape, slots, replay_realtime, self._parar))
+        self.deteccion = ctx.Process(
+            target=proceso_deteccion, name="deteccion", daemon=True,
+            args=(cam_indices, nombres, shape, slots, envio,
+                  preview.shared_viewers if preview is not None else None, preview_fps,
+                  dict(detector_kwargs, replay_realtime=replay_realtime), t_arranque if t_arranque is not None else time.monotonic(),
+                  metricas_interval))
+
+    def start(self):
+        self.captura.start()
+        self.deteccion.start()
+        logger.info(f"🧩 Captura (pid {self.captura.pid}) y detección (pid {self.deteccion.pid}) "
+                    f"en procesos separados")
+        return self
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    if not self._recv.poll(1.0):
+                        if not self.deteccion.is_alive():
+                            logger.error("El proceso de detección terminó inesperadamente")
+                            break
+                        continue
+                    mensaje = self._recv.recv()
+                except EOFError:
+                    break
+                tipo = mensaje[0]
+                if tipo == "estado":
+                    self.server.procesar_mensaje(*mensaje[1:])
+                elif tipo == "preview" and self.preview is not None:
+                    self.preview.publish_jpeg(mensaje[1])
+                elif tipo == "metricas" and self.server.metrics is not None:
+                    self.server.metrics.incluir(mensaje[1])
+                elif tipo == "fin":
+                    break
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._parar.set()
+        for p in (self.deteccion, self.captura):
+            p.join(timeout=3)
+            if p.is_alive():
+                p.terminate()
+        # run() también llama a stop() al terminar: los anillos se liberan una sola vez
+        rings, self.rings = self.rings, []
+        for ring in rings:
+            ring.close()
+            ring.unlink()
@@ -0,0 +1,298 @@
+# registro.py
+# Registro binario de solo-anexado de lo que ve el detector (un registro por frame inferido)
+# y de los cambios de estado que recibe el servidor, para estudiar paradas en falso a posteriori.
+#
+#   python camara/registro.py registros/ --desde 2026-10-17T10:00 --hasta 2026-10-17T10:30
+#   python camara/registro.py registros/ --desde 2026-10-17T10:00 --replay --velocidad 4
+#
+# Cada segmento es una cabecera de 16 bytes seguida de registros de ancho fijo
+# (REGISTRO_DTYPE), así que el lector los abre con np.memmap sin parsear nada.
+import os
+import glob
+import time
+import argparse
+import logging
+from datetime import datetime
+from threading import Thread, Condition
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_BOXES = 8                      # cajas guardadas por frame (las de mayor confianza)
+TIPO_FRAME, TIPO_TRANSICION = 0, 1
+CAMARA_GLOBAL = 255                # las transiciones son del estado global
+
+REGISTRO_DTYPE = np.dtype([
+    ("t", "<f8"),                  # epoch (s)
+    ("tipo", "u1"),                # TIPO_FRAME / TIPO_TRANSICION
+    ("camara", "u1"),              # índice de cámara (CAMARA_GLOBAL en transiciones)
+    ("personas", "<u2"),           # cajas de persona en el frame / estado nuevo (0-1) en transiciones
+    ("conf_max", "<f4"),
+    ("boxes", "<i2", (MAX_BOXES, 4)),  # x1, y1, x2, y2 en píxeles
+    ("box_conf", "u1", (MAX_BOXES,)),  # confianza * 255
+])
+
+MAGIC = b"DETLOG\x00\x01"
+HEADER = np.dtype([("magic", "S8"), ("itemsize", "<u4"), ("max_boxes", "<u4")])
+
+
+# ------------------ Escritura ------------------
+class EventLog:
+    """
+    Escritor en lotes: `registrar_frame` y `registrar_transicion` solo rellenan una fila
+    de un array estructurado preasignado; un hilo vuelca los lotes llenos (o lo pendiente
+    cada `flush_interval` s) al segmento actual, y abre uno nuevo al superar `max_bytes`.
+    Con `max_segmentos` se borran los más antiguos de este prefijo, pero solo los propios o
+    los de procesos que ya terminaron: con --procesos, cada proceso escribe sus segmentos
+    (los nombres llevan el pid) y uno no borra el que otro tiene abierto.
+    """
+    def __init__(self, directorio, prefijo="eventos", max_bytes=64 * 2**20, max_segmentos=None,
+                 batch=512, flush_interval=1.0):
+        self.directorio = directorio
+        self.prefijo = prefijo
+        self.max_bytes = max_bytes
+        self.max_segmentos = max_segmentos
+        self.batch = batch
+        self.flush_interval = flush_interval
+        os.makedirs(directorio, exist_ok=True)
+
+        self._cond = Condition()
+        self._buf = np.zeros(batch, dtype=REGISTRO_DTYPE)
+        self._n = 0
+        self._pendientes = []
+        self._fichero = None
+        self._bytes = 0
+        self._segmento = 0
+        self.registros = 0
+        self.running = True
+        self._thread = Thread(target=self._loop, name="registro-eventos", daemon=True)
+        self._thread.start()
+
+    def __reduce__(self):
+        # Al pasar a otro proceso se crea un escritor propio (sus segmentos llevan otro pid)
+        return (EventLog, (self.directorio, self.prefijo, self.max_bytes, self.max_segmentos,
+                           self.batch, self.flush_interval))
+
+    def _fila(self):
+        # Llamar con self._cond tomado
+        fila = self._buf[self._n]
+        self._n += 1
+        if self._n == len(self._buf):
+            self._pendientes.append(self._buf)
+            self._buf = np.zeros(self.batch, dtype=REGISTRO_DTYPE)
+            self._n = 0
+            self._cond.notify()
+        return fila
+
+    def registrar_frame(self, t, camara, boxes):
+        """boxes: (K, 5) [x1, y1, x2, y2, conf] de las personas del frame."""
+        n, k = len(boxes), min(len(boxes), MAX_BOXES)
+        if n > MAX_BOXES:
+            boxes = boxes[np.argsort(-boxes[:, 4])[:MAX_BOXES]]
+        with self._cond:
+            fila = self._fila()
+            fila["t"] = t
+            fila["tipo"] = TIPO_FRAME
+            fila["camara"] = camara
+            fila["personas"] = n
+            fila["conf_max"] = boxes[:, 4].max() if k else 0.0
+            fila["boxes"][:k] = boxes[:k, :4]
+            fila["box_conf"][:k] = boxes[:k, 4] * 255
+
+    def registrar_transicion(self, t, personas):
+        with self._cond:
+            fila = self._fila()
+            fila["t"] = t
+            fila["tipo"] = TIPO_TRANSICION
+            fila["camara"] = CAMARA_GLOBAL
+            fila["personas"] = int(personas)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendientes or not self.running, self.flush_interval)
+                if self._n:
+                    # Lo pendiente del lote en curso también se vuelca (como mucho flush_interval de retraso)
+                    self._pendientes.append(self._buf[:self._n].copy())
+                    self._buf[:self._n] = 0
+                    self._n = 0
+                lotes, self._pendientes = self._pendientes, []
+                running = self.running
+            for lote in lotes:
+                self._escribir(lote)
+            if not running:
+                return
+
+    def _escribir(self, lote):
+        datos = lote.tobytes()
+        if self._fichero is None or self._bytes + len(datos) > self.max_bytes:
+            self._rotar()
+        self._fichero.write(datos)
+        self._fichero.flush()
+        self._bytes += len(datos)
+        self.registros += len(lote)
+
+    def _rotar(self):
+        if self._fichero is not None:
+            self._fichero.close()
+        nombre = (f"{self.prefijo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_"
+                  f"{self._segmento:04d}.bin")
+        self._segmento += 1
+        self._fichero = open(os.path.join(self.directorio, nombre), "ab")
+        cabecera = np.array([(MAGIC, REGISTRO_DTYPE.itemsize, MAX_BOXES)], dtype=HEADER)
+        self._fichero.write(cabecera.tobytes())
+        self._bytes = HEADER.itemsize
+
+        if self.max_segmentos:
+            segmentos = sorted((path for path in glob.glob(os.path.join(self.directorio, f"{self.prefijo}_*.bin"))
+                                if not _de_otro_proceso_vivo(path)),
+                               key=os.path.getmtime)
+            for viejo in segmentos[:-self.max_segmentos]:
+                os.remove(viejo)
+
+    def close(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        if self._fichero is not None:
+            self._fichero.close()
+            self._fichero = None
+        logger.info(f"🗃️ Registro de eventos: {self.registros} registros en {self.directorio}")
+
+
+def _de_otro_proceso_vivo(path):
+    """True si el segmento es de otro proceso que sigue en marcha (y puede estar escribiéndolo)."""
+    try:
+        pid = int(os.path.basename(path).rsplit("_", 2)[-2])
+    except (IndexError, ValueError):
+        return False                  # no es un nombre de EventLog
+    if pid == os.getpid():
+        return False
+    if os.name != "posix":
+        return True                   # sin forma barata de comprobarlo: no se toca
+    try:
+        os.kill(pid, 0)               # señal 0: solo comprueba que existe
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass                          # existe, pero es de otro usuario
+    return True
+
+
+# ------------------ Lectura ------------------
+class EventLogReader:
+    """
+    Abre los segmentos de un directorio con np.memmap. Las consultas por rango de tiempo
+    descartan segmentos enteros por su tiempo mínimo y máximo y, dentro de cada uno,
+    filtran con una máscara: un segmento no está ordenado por tiempo (los frames llevan el
+    instante de captura, las transiciones el de notificación, y escriben varios hilos).
+    """
+    def __init__(self, directorio, patron="*.bin"):
+        self.directorio = directorio
+        self.patron = patron
+
+    def segmentos(self):
+        return sorted(glob.glob(os.path.join(self.directorio, self.patron)))
+
+    @staticmethod
+    def abrir(path):
+        cabecera = np.fromfile(path, dtype=HEADER, count=1)
+        if len(cabecera) == 0 or cabecera["magic"][0] != MAGIC:
+            raise ValueError(f"{path} no es un segmento del registro de eventos")
+        if cabecera["itemsize"][0] != REGISTRO_DTYPE.itemsize:
+            raise ValueError(f"{path}: formato de registro distinto ({cabecera['itemsize'][0]} bytes)")
+        n = (os.path.getsize(path) - HEADER.itemsize) // REGISTRO_DTYPE.itemsize
+        if n == 0:
+            return np.empty(0, dtype=REGISTRO_DTYPE)
+        return np.memmap(path, dtype=REGISTRO_DTYPE, mode="r", offset=HEADER.itemsize, shape=(n,))
+
+    def consultar(self, desde=None, hasta=None, tipo=None, camara=None):
+        """Registros con desde <= t < hasta (epoch), ordenados por tiempo, como array estructurado."""
+        desde = -np.inf if desde is None else desde
+        hasta = np.inf if hasta is None else hasta
+        partes = []
+        for path in self.segmentos():
+            mm = self.abrir(path)
+            if len(mm) == 0:
+                continue
+            t = np.asarray(mm["t"])
+            if t.max() < desde or t.min() >= hasta:
+                continue
+            mascara = (t >= desde) & (t < hasta)
+            if tipo is not None:
+                mascara &= mm["tipo"] == tipo
+            if camara is not None:
+                mascara &= mm["camara"] == camara
+            partes.append(np.asarray(mm[mascara]))
+        if not partes:
+            return np.empty(0, dtype=REGISTRO_DTYPE)
+        registros = np.concatenate(partes)
+        return registros[np.argsort(registros["t"], kind="stable")]
+
+    def transiciones(self, desde=None, hasta=None):
+        return self.consultar(desde, hasta, tipo=TIPO_TRANSICION)
+
+    def replay(self, server, desde=None, hasta=None, velocidad=None):
+        """
+        Reinyecta las transiciones en `server.procesar_mensaje` (DetectionServer o cualquier
+        objeto con esa firma). Con `velocidad` se respetan los intervalos originales
+        divididos por ese factor; sin ella, se entregan seguidas.
+        """
+        transiciones = self.transiciones(desde, hasta)
+        t_prev = None
+        for registro in transiciones:
+            t = float(registro["t"])
+            if velocidad and t_prev is not None:
+                time.sleep((t - t_prev) / velocidad)
+            server.procesar_mensaje(bool(registro["personas"]), t)
+            t_prev = t
+        return len(transiciones)
+
+
+def _epoch(texto):
+    return datetime.fromisoformat(texto).timestamp() if texto else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta y replay del registro de eventos del detector")
+    parser.add_argument("directorio")
+    parser.add_argument("--desde", default=None, help="fecha/hora ISO, p. ej. 2026-10-17T10:00")
+    parser.add_argument("--hasta", default=None)
+    parser.add_argument("--replay", action="store_true",
+                        help="levanta un DetectionServer en --port y reinyecta las transiciones")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--velocidad", type=float, default=1.0, help="factor de velocidad del replay")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    reader = EventLogReader(args.directorio)
+    desde, hasta = _epoch(args.desde), _epoch(args.hasta)
+    t0 = time.perf_counter()
+    registros = reader.consultar(desde, hasta)
+    dt = time.perf_counter() - t0
+
+    frames = registros[registros["tipo"] == TIPO_FRAME]
+    trans = registros[registros["tipo"] == TIPO_TRANSICION]
+    print(f"{len(registros)} registros en {len(reader.segmentos())} segmentos (consulta {dt * 1e3:.1f} ms)")
+    if len(frames):
+        con_persona = frames["personas"] > 0
+        print(f"Frames: {len(frames)}, con persona {con_persona.mean():.1%}, "
+              f"confianza media con persona {frames['conf_max'][con_persona].mean() if con_persona.any() else 0:.2f}")
+    for r in trans:
+        hora = datetime.fromtimestamp(r["t"]).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        print(f"  {hora}  {'🟢 PRESENTES' if r['personas'] else '🔴 AUSENTES'}")
+
+    if args.replay:
+        from threading import Thread as _Thread
+        from deteccion_server import DetectionServer
+        server = DetectionServer(host="0.0.0.0", port=args.port)
+        _Thread(target=server.run, daemon=True).start()
+        time.sleep(0.5)
+        n = reader.replay(server, desde, hasta, velocidad=args.velocidad)
+        print(f"Replay terminado: {n} transiciones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# roi.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Inferencia sobre la región de interés ------------------
+class _EstadoRoi:
+    __slots__ = ("boxes", "t_completo", "desde_completo")
+
+    def __init__(self):
+        self.boxes = None            # últimas cajas de persona (K, 5) en coordenadas del frame
+        self.t_completo = 0.0        # instante de la última inferencia a frame completo
+        self.desde_completo = 0      # inferencias sobre recorte desde entonces
+
+
+class RoiSelector:
+    """
+    Decide, por cámara (parámetro `key`), si el siguiente frame se infiere completo o solo
+    sobre un recorte alrededor de la unión de las últimas cajas de persona, ampliado un
+    `padding` (fracción del lado mayor de la unión) y nunca menor que `min_size` píxeles.
+    El recorte se infiere con una entrada más pequeña (`imgsz`).
+
+    Se vuelve al frame completo si no hay cajas recientes, cada `full_every` inferencias,
+    pasados `max_interval` segundos, o si el recorte cubre más de `max_area` del frame
+    (ya no ahorraría nada). Un recorte sin personas se repite a frame completo en el
+    mismo frame, para no perder a alguien que salió del recorte.
+    """
+    def __init__(self, imgsz=320, padding=0.3, min_size=160, full_every=15, max_interval=2.0,
+                 max_area=0.6, model_path=None):
+        self.imgsz = imgsz
+        self.padding = padding
+        self.min_size = min_size
+        self.full_every = full_every
+        self.max_interval = max_interval
+        self.max_area = max_area
+        self.model_path = model_path     # ONNX exportado a `imgsz` (si el principal es de entrada fija)
+
+        self._estados = {}               # key -> _EstadoRoi
+
+        # Estadísticas
+        self.completos = 0
+        self.recortes = 0
+        self.fallos = 0                  # recortes sin personas repetidos a frame completo
+
+    def _estado(self, key):
+        st = self._estados.get(key)
+        if st is None:
+            st = self._estados[key] = _EstadoRoi()
+        return st
+
+    def plan(self, shape, now, key=0):
+        """Devuelve el recorte (x1, y1, x2, y2) a inferir, o None para el frame completo."""
+        st = self._estado(key)
+        if (st.boxes is None
+                or st.desde_completo >= self.full_every
+                or now - st.t_completo >= self.max_interval):
+            return None
+
+        h, w = shape[:2]
+        x1, y1 = st.boxes[:, 0].min(), st.boxes[:, 1].min()
+        x2, y2 = st.boxes[:, 2].max(), st.boxes[:, 3].max()
+        lado = max(x2 - x1, y2 - y1)
+        pad_x = max(self.padding * lado, (self.min_size - (x2 - x1)) / 2, 0)
+        pad_y = max(self.padding * lado, (self.min_size - (y2 - y1)) / 2, 0)
+        x1, x2 = int(max(x1 - pad_x, 0)), int(min(x2 + pad_x, w))
+        y1, y2 = int(max(y1 - pad_y, 0)), int(min(y2 + pad_y, h))
+        if x2 <= x1 or y2 <= y1 or (x2 - x1) * (y2 - y1) > self.max_area * w * h:
+            return None
+        return x1, y1, x2, y2
+
+    def update(self, boxes, now, completo, key=0):
+        """Registra el resultado (cajas ya en coordenadas del frame) de una inferencia."""
+        st = self._estado(key)
+        if completo:
+            self.completos += 1
+            st.t_completo = now
+            st.desde_completo = 0
+        else:
+            self.recortes += 1
+            st.desde_completo += 1
+        st.boxes = boxes if len(boxes) else None
+
+    @staticmethod
+    def to_frame(boxes, rect):
+        """Lleva cajas (K, 5) del recorte `rect` a coordenadas del frame (in-place)."""
+        x1, y1 = rect[0], rect[1]
+        boxes[:, [0, 2]] += x1
+        boxes[:, [1, 3]] += y1
+        return boxes
+
+    def roi_ratio(self):
+        total = self.completos + self.recortes
+        return self.recortes / total if total else 0.0
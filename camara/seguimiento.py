@@ -0,0 +1,141 @@
+# seguimiento.py
+import logging
+
+import numpy as np
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Seguimiento entre detecciones ------------------
+class _Pista:
+    """Puntos seguidos de una cámara: frame reducido previo, puntos y caja a la que pertenecen."""
+    __slots__ = ("gray", "points", "owner", "boxes", "n_inicial", "t_deteccion", "frames", "confianza")
+
+    def __init__(self, gray, points, owner, boxes, now):
+        self.gray = gray
+        self.points = points          # (P, 1, 2) float32, en coordenadas del frame reducido
+        self.owner = owner            # (P,) índice de la caja de cada punto
+        self.boxes = boxes            # (K, 5) [x1, y1, x2, y2, conf] en coordenadas del frame original
+        self.n_inicial = len(points)
+        self.t_deteccion = now
+        self.frames = 0               # frames seguidos desde la última detección
+        self.confianza = 1.0
+
+
+class PersonTracker:
+    """
+    Mantiene la evidencia de presencia entre pasadas de YOLO con flujo óptico disperso
+    (Lucas-Kanade piramidal) sobre esquinas de las cajas detectadas, en un frame reducido
+    en escala de grises. Cuesta una fracción de una inferencia y no necesita opencv-contrib.
+
+    YOLO vuelve a ejecutarse cuando:
+      - no hay personas seguidas (sin nadie, cada frame pasa por el modelo),
+      - se siguieron `redetect_every` frames seguidos,
+      - pasaron `max_interval` segundos desde la última detección, o
+      - la confianza (fracción de puntos que sobreviven a la comprobación ida y vuelta)
+        cae por debajo de `min_confidence`.
+    Con varias cámaras, cada una lleva sus propias pistas (parámetro `key`).
+    """
+    def __init__(self, redetect_every=10, max_interval=1.0, min_confidence=0.5,
+                 size=(320, 240), max_points_per_box=40, fb_threshold=1.0):
+        self.redetect_every = redetect_every
+        self.max_interval = max_interval
+        self.min_confidence = min_confidence
+        self.size = size
+        self.max_points_per_box = max_points_per_box
+        self.fb_threshold = fb_threshold   # error ida y vuelta máximo (px del frame reducido)
+
+        self._pistas = {}                  # key -> _Pista
+        self._lk_params = dict(winSize=(15, 15), maxLevel=2,
+                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+        # Estadísticas
+        self.detectados = 0
+        self.seguidos = 0
+
+    def _reduce(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def _escala(self, frame):
+        h, w = frame.shape[:2]
+        return np.array([self.size[0] / w, self.size[1] / h, self.size[0] / w, self.size[1] / h],
+                        dtype=np.float32)
+
+    def should_detect(self, now, key=0):
+        """Devuelve True si este frame debe pasar por YOLO en vez de seguirse."""
+        pista = self._pistas.get(key)
+        return (pista is None
+                or pista.frames >= self.redetect_every
+                or now - pista.t_deteccion >= self.max_interval
+                or pista.confianza < self.min_confidence
+                or len(pista.points) == 0)
+
+    def start(self, frame, boxes, now, key=0):
+        """Reinicia las pistas de `key` con las cajas (K, 5) de una detección; sin cajas, las descarta."""
+        self.detectados += 1
+        if len(boxes) == 0:
+            self._pistas.pop(key, None)
+            return
+
+        gray = self._reduce(frame)
+        rects = (boxes[:, :4] * self._escala(frame)).astype(np.int32)
+        mask = np.zeros_like(gray)
+        points, owner = [], []
+        for j, (x1, y1, x2, y2) in enumerate(rects):
+            mask[:] = 0
+            mask[max(y1, 0):max(y2, 0), max(x1, 0):max(x2, 0)] = 255
+            p = cv2.goodFeaturesToTrack(gray, self.max_points_per_box, 0.01, 5, mask=mask)
+            if p is not None:
+                points.append(p)
+                owner.append(np.full(len(p), j))
+
+        if not points:
+            self._pistas.pop(key, None)   # cajas sin textura: mejor volver a detectar
+            return
+        self._pistas[key] = _Pista(gray, np.concatenate(points).astype(np.float32),
+                                   np.concatenate(owner), boxes.copy(), now)
+
+    def update(self, frame, key=0):
+        """
+        Sigue las pistas de `key` hasta este frame.
+        Devuelve (persona_presente, cajas (K, 5) desplazadas).
+        """
+        self.seguidos += 1
+        pista = self._pistas[key]
+        gray = self._reduce(frame)
+
+        p1, st, _ = cv2.calcOpticalFlowPyrLK(pista.gray, gray, pista.points, None, **self._lk_params)
+        p0r, st_r, _ = cv2.calcOpticalFlowPyrLK(gray, pista.gray, p1, None, **self._lk_params)
+        fb_error = np.abs(pista.points - p0r).reshape(-1, 2).max(axis=1)
+        ok = (st.ravel() == 1) & (st_r.ravel() == 1) & (fb_error < self.fb_threshold)
+
+        # Cada caja se desplaza con la mediana del movimiento de sus puntos válidos
+        escala = self._escala(frame)
+        desplazamiento = (p1 - pista.points).reshape(-1, 2)
+        boxes = pista.boxes.copy()
+        for j in range(len(boxes)):
+            validos = ok & (pista.owner == j)
+            if validos.any():
+                dx, dy = np.median(desplazamiento[validos], axis=0)
+                boxes[j, [0, 2]] += dx / escala[0]
+                boxes[j, [1, 3]] += dy / escala[1]
+
+        pista.gray = gray
+        pista.points = p1[ok]
+        pista.owner = pista.owner[ok]
+        pista.boxes = boxes
+        pista.frames += 1
+        pista.confianza = ok.sum() / pista.n_inicial
+
+        # Solo se conservan las cajas que aún tienen puntos
+        vivas = np.isin(np.arange(len(boxes)), pista.owner)
+        presente = pista.confianza >= self.min_confidence and vivas.any()
+        return presente, boxes[vivas]
+
+    def tracked_ratio(self):
+        total = self.detectados + self.seguidos
+        return self.seguidos / total if total else 0.0
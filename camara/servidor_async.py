@@ -0,0 +1,138 @@
+# servidor_async.py
+# Núcleo HTTP asíncrono (aiohttp) para el mismo DetectionServer: un único hilo con un
+# event loop atiende cientos de robots y dashboards haciendo polling o suscritos por SSE,
+# sin un hilo por conexión como el servidor de desarrollo de Flask.
+#
+#   python camara/deteccion_server.py --server async
+import time
+import queue
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDetectionServer:
+    """
+    Expone las mismas rutas que DetectionServer (/persona_detectada, /estado,
+    /estado/stream, /metrics y /preview.mjpg) leyendo su snapshot pre-serializado.
+    El estado sigue viviendo en `server`: el detector llama a `procesar_mensaje` como
+    siempre y este servidor se entera por el callback registrado con `suscribir`.
+    """
+    def __init__(self, server, host=None, port=None):
+        try:
+            from aiohttp import web  # dependencia opcional, solo para este modo
+        except ImportError as e:
+            raise ImportError("El modo --server async requiere aiohttp (pip install aiohttp)") from e
+        self.web = web
+        self.server = server
+        self.host = host or server.host
+        self.port = port or server.port
+
+        self._loop = None
+        self._cambio = None          # asyncio.Event que se reemplaza en cada cambio de estado
+        server.suscribir(self._notificar)
+
+    # ------------------ Puente hilo detector -> event loop ------------------
+    def _notificar(self):
+        # Se llama desde el hilo que ejecuta procesar_mensaje
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._despertar)
+
+    def _despertar(self):
+        evento, self._cambio = self._cambio, asyncio.Event()
+        evento.set()
+
+    # ------------------ Rutas ------------------
+    async def persona_detectada(self, request):
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        cuerpo, codigo = self.server.recibir_json(data)
+        return self.web.json_response(cuerpo, status=codigo)
+
+    async def estado(self, request):
+        t0 = time.perf_counter()
+        _, body = self.server.snapshot
+        resp = self.web.Response(body=body, content_type="application/json")
+        metrics = self.server.metrics
+        if metrics is not None:
+            metrics.observe("estado_http", time.perf_counter() - t0)
+            metrics.incr("estado_peticiones")
+        return resp
+
+    async def reloj(self, request):
+        return self.web.json_response({"t": time.time()})
+
+    async def estado_stream(self, request):
+        resp = self.web.StreamResponse(headers={"Content-Type": "text/event-stream",
+                                                "Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        await resp.prepare(request)
+        version, body = self.server.snapshot
+        await resp.write(b"event: estado\ndata: " + body + b"\n\n")
+        while True:
+            cambio = self._cambio
+            if self.server.snapshot[0] == version:
+                try:
+                    await asyncio.wait_for(cambio.wait(), self.server.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    pass
+            nueva, body = self.server.snapshot
+            evento = b"estado" if nueva != version else b"heartbeat"
+            version = nueva
+            await resp.write(b"event: " + evento + b"\ndata: " + body + b"\n\n")
+
+    async def metrics(self, request):
+        return self.web.Response(body=self.server.metrics.render().encode(),
+                                 headers={"Content-Type": "text/plain; version=0.0.4"})
+
+    async def preview(self, request):
+        # La cola del visor es bloqueante: cada frame se espera en el pool de hilos, con un
+        # timeout corto para que una espera en curso no sobreviva mucho a la desconexión
+        preview = self.server.preview
+        resp = self.web.StreamResponse(headers={
+            "Content-Type": f"multipart/x-mixed-replace; boundary={preview.BOUNDARY}"})
+        await resp.prepare(request)
+        cola = preview.subscribe()
+        try:
+            while True:
+                try:
+                    parte = await self._loop.run_in_executor(None, cola.get, True, 1.0)
+                except queue.Empty:
+                    continue
+                await resp.write(parte)
+        except ConnectionResetError:
+            pass                          # el visor cerró la conexión
+        finally:
+            preview.unsubscribe(cola)
+        return resp
+
+    # ------------------ Arranque ------------------
+    def build_app(self):
+        app = self.web.Application()
+        app.router.add_post("/persona_detectada", self.persona_detectada)
+        app.router.add_get("/estado", self.estado)
+        app.router.add_get("/estado/stream", self.estado_stream)
+        app.router.add_get("/reloj", self.reloj)
+        if self.server.metrics is not None:
+            app.router.add_get("/metrics", self.metrics)
+        if self.server.preview is not None:
+            app.router.add_get("/preview.mjpg", self.preview)
+        return app
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._cambio = asyncio.Event()
+        runner = self.web.AppRunner(self.build_app(), access_log=None)
+        await runner.setup()
+        await self.web.TCPSite(runner, self.host, self.port, backlog=1024).start()
+        logger.info(f"⚡ Servidor async escuchando en {self.host}:{self.port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    def run(self):
+        """Bloqueante, como DetectionServer.run: pensado para ejecutarse en un hilo propio."""
+        asyncio.run(self._serve())
@@ -0,0 +1,67 @@
+# suavizado.py
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Votación k-de-n sobre frames inferidos ------------------
+class _Ventana:
+    """Buffer circular de tamaño fijo con el recuento de positivos al día."""
+    __slots__ = ("buf", "i", "positivos")
+
+    def __init__(self, n):
+        self.buf = bytearray(n)   # 1: persona en ese frame; empieza "todo negativo"
+        self.i = 0
+        self.positivos = 0
+
+    def push(self, hit):
+        hit = 1 if hit else 0
+        self.positivos += hit - self.buf[self.i]
+        self.buf[self.i] = hit
+        self.i = (self.i + 1) % len(self.buf)
+
+
+class PresenceFilter:
+    """
+    Confirma la presencia con evidencia de varios frames en vez de con uno solo.
+    Cada cámara (parámetro `key`) guarda el resultado de sus últimos `n` frames inferidos:
+      - entrada: hay persona confirmada si al menos `k_on` de esos `n` frames la vieron
+      - salida:  solo se puede declarar ausencia si al menos `k_off` de los `n` frames
+                 fueron negativos (además de que venza `no_persons_grace` en el detector)
+    Con n = k_on = k_off = 1 equivale a no filtrar. Cada actualización es O(1):
+    se sustituye el frame más antiguo y se ajusta el recuento.
+    """
+    def __init__(self, n=5, k_on=3, k_off=5):
+        if not (1 <= k_on <= n and 1 <= k_off <= n):
+            raise ValueError(f"Se requiere 1 <= k_on, k_off <= n (n={n}, k_on={k_on}, k_off={k_off})")
+        self.n = n
+        self.k_on = k_on
+        self.k_off = k_off
+        self._ventanas = {}       # key -> _Ventana
+
+        # Estadísticas: positivos sueltos que no llegaron a confirmarse
+        self.positivos = 0
+        self.descartados = 0
+
+    def _ventana(self, key):
+        v = self._ventanas.get(key)
+        if v is None:
+            v = self._ventanas[key] = _Ventana(self.n)
+        return v
+
+    def push(self, hit, key=0):
+        """Registra el resultado de un frame inferido; devuelve True si la presencia queda confirmada."""
+        v = self._ventana(key)
+        v.push(hit)
+        confirmada = v.positivos >= self.k_on
+        if hit:
+            self.positivos += 1
+            self.descartados += not confirmada
+        return confirmada
+
+    def ausente(self, key=0):
+        """True si la ventana de `key` tiene suficientes negativos para declarar ausencia."""
+        return self.n - self._ventana(key).positivos >= self.k_off
+
+    def __repr__(self):
+        return f"{self.k_on}/{self.n} para entrar, {self.k_off}/{self.n} para salir"
@@ -0,0 +1,61 @@
+# test_onnx_backend.py
+# Letterbox de OnnxPersonModel: resultado correcto y memoria constante con recortes ROI
+# de tamaños distintos.
+#
+#   python -m pytest camara/test_onnx_backend.py
+import tracemalloc
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+onnx = pytest.importorskip("onnx")
+
+from onnx_backend import OnnxPersonModel
+
+
+@pytest.fixture
+def modelo(tmp_path):
+    # Grafo identidad con entrada dinámica: el letterbox no necesita inferir nada
+    from onnx import TensorProto, helper
+    x = helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, "h", "w"])
+    y = helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 3, "h", "w"])
+    grafo = helper.make_graph([helper.make_node("Identity", ["images"], ["output0"])], "identidad", [x], [y])
+    path = str(tmp_path / "identidad.onnx")
+    onnx.save(helper.make_model(grafo, opset_imports=[helper.make_opsetid("", 13)], ir_version=8), path)
+    return OnnxPersonModel(path, imgsz=320)
+
+
+def test_letterbox_igual_que_referencia(modelo):
+    rng = np.random.default_rng(0)
+    for fh, fw in [(240, 240), (100, 300), (480, 640), (240, 240)]:
+        frame = rng.integers(0, 255, (fh, fw, 3), dtype=np.uint8)
+        r, pad_x, pad_y = modelo._letterbox(frame, 0)
+
+        nw, nh = int(round(fw * r)), int(round(fh * r))
+        lienzo = np.full((320, 320, 3), 114, dtype=np.uint8)
+        lienzo[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+        esperado = lienzo.transpose(2, 0, 1)[::-1].astype(np.float32) / 255
+        np.testing.assert_allclose(modelo._input[0], esperado, atol=1e-6)
+
+
+def test_memoria_constante_con_recortes_distintos(modelo):
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    def recortes(n):
+        for _ in range(n):
+            x1, y1 = rng.integers(0, 320), rng.integers(0, 240)
+            x2, y2 = x1 + rng.integers(160, 320), y1 + rng.integers(160, 240)
+            modelo._letterbox(frame[y1:y2, x1:x2], 0)
+
+    recortes(50)
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        recortes(2000)
+        despues = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert despues - antes < 256 * 1024
@@ -0,0 +1,66 @@
+# test_procesos.py
+# SharedFrameRing: cada frame se entrega como mucho una vez y siempre con su propia
+# secuencia, aunque el escritor publique mientras el lector lo está tomando.
+#
+#   python -m pytest camara/test_procesos.py
+import pytest
+
+from procesos import SharedFrameRing, _SLOT
+
+
+@pytest.fixture
+def anillo():
+    ring = SharedFrameRing(slots=3, shape=(4, 4, 3), create=True)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def escribir(ring, k):
+    slot = ring.slot_libre()
+    ring.frames[slot][0, 0, 0] = k
+    ring.publicar(slot, float(k))
+
+
+class CabeceraConEscritor:
+    """Envuelve la cabecera: la primera lectura de _SLOT publica antes un frame nuevo."""
+    def __init__(self, ring, k):
+        self.header, self.ring, self.k = ring.header, ring, k
+
+    def __getitem__(self, campo):
+        if campo == _SLOT and self.k is not None:
+            k, self.k = self.k, None
+            self.ring.header = self.header       # el escritor usa la cabecera real
+            escribir(self.ring, k)
+            self.ring.header = self
+        return self.header[campo]
+
+    def __setitem__(self, campo, valor):
+        self.header[campo] = valor
+
+
+def test_publicacion_durante_tomar(anillo):
+    escribir(anillo, 1)
+    seq, frame, ts = anillo.tomar(0)
+    assert (seq, ts, frame[0, 0, 0]) == (1, 1.0, 1)
+
+    escribir(anillo, 2)
+    anillo.header = CabeceraConEscritor(anillo, 3)   # publica el 3 entre leer _SEQ y _SLOT
+    try:
+        seq, frame, ts = anillo.tomar(seq)
+    finally:
+        anillo.header = anillo.header.header
+    # La vista es la del frame 3: la secuencia y el instante deben ser los suyos
+    assert (seq, ts, frame[0, 0, 0]) == (3, 3.0, 3)
+    # ...y no se vuelve a entregar como nuevo
+    assert anillo.tomar(seq) is None
+
+
+def test_descartados(anillo):
+    escribir(anillo, 1)
+    escribir(anillo, 2)                  # el 1 no llegó a consumirse
+    seq, _, _ = anillo.tomar(0)
+    escribir(anillo, 3)
+    seq, _, _ = anillo.tomar(seq)
+    assert seq == 3
+    assert anillo.stats()["frames_descartados"] == 1
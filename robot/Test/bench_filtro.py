@@ -0,0 +1,94 @@
+# bench_filtro.py
+# Comprueba que DistanceFilter (modo "std") da la misma distancia que el filtro original
+# con pandas de robot_avoidance.run() y mide el coste por muestra de cada variante.
+#
+#   python robot/Test/bench_filtro.py [--muestras 20000] [--ventana 5]
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from filtro_distancia import DistanceFilter
+
+
+def filtro_pandas(lecturas, ventana=5):
+    """Filtro original de robot_avoidance.run(), tal cual, como referencia."""
+    distance_data = []
+    distance = 0
+    salida = []
+    for distance_ in lecturas:
+        distance_data.append(distance_)
+        if len(distance_data) > 1:
+            data = pd.DataFrame(distance_data)
+            data_ = data.copy()
+            u = data_.mean()
+            std = data_.std()
+            data_c = data[np.abs(data - u) <= std] if std[0] > 0 else data
+            distance = data_c.mean()[0] if len(data_c) > 0 else distance_
+        else:
+            distance = distance_
+        if len(distance_data) >= ventana:
+            distance_data.pop(0)
+        salida.append(distance)
+    return np.array(salida)
+
+
+def lecturas_sinteticas(n, seed=0):
+    """Pared que se acerca y se aleja, ruido, ecos espurios y lecturas cuantizadas a mm."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) * 0.05
+    d = 60 + 35 * np.sin(t / 3) + rng.normal(0, 1.5, n)
+    espurios = rng.random(n) < 0.05
+    d[espurios] = rng.uniform(0, 400, espurios.sum())
+    return np.round(d * 10) / 10
+
+
+def comprobar(lecturas, ventana):
+    ref = filtro_pandas(lecturas, ventana)
+    filtro = DistanceFilter(n=ventana, modo="std")
+    nuevo = np.array([filtro.push(x) for x in lecturas])
+    diff = np.abs(nuevo - ref)
+    distintas = int((diff > 1e-6).sum())
+    print(f"Equivalencia con pandas ({len(lecturas)} muestras, ventana {ventana}): "
+          f"máx. diferencia {diff.max():.2e} cm, {distintas} muestras distintas")
+    return distintas
+
+
+def por_muestra(fn, lecturas):
+    t0 = time.process_time()
+    fn(lecturas)
+    return (time.process_time() - t0) / len(lecturas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filtro de distancia: equivalencia con pandas y coste por muestra")
+    parser.add_argument("--muestras", type=int, default=20000)
+    parser.add_argument("--ventana", type=int, default=5)
+    args = parser.parse_args()
+
+    lecturas = lecturas_sinteticas(args.muestras)
+    distintas = comprobar(lecturas, args.ventana)
+    # Casos límite: lecturas constantes (desviación 0) y ventana a medio llenar
+    distintas += comprobar(np.full(50, 42.0), args.ventana)
+    distintas += comprobar(lecturas[:3], args.ventana)
+
+    valores = lecturas.tolist()   # como llegan del sensor: floats de Python
+    n_pandas = min(len(valores), 2000)
+    costes = {
+        "pandas": por_muestra(lambda v: filtro_pandas(v, args.ventana), valores[:n_pandas]),
+        "std": por_muestra(lambda v: [f.push(x) for f in [DistanceFilter(args.ventana)] for x in v], valores),
+        "mad": por_muestra(lambda v: [f.push(x) for f in [DistanceFilter(args.ventana, "mad")] for x in v], valores),
+    }
+    print(f"\n{'filtro':>7} | {'µs/muestra (CPU)':>16} | {'vs pandas':>9}")
+    print("-" * 40)
+    for nombre, coste in costes.items():
+        print(f"{nombre:>7} | {coste * 1e6:>16.1f} | {costes['pandas'] / coste:>8.0f}x")
+
+    if distintas:
+        raise SystemExit("❌ El filtro no coincide con la referencia de pandas")
+    print("\n✅ Mismo resultado que el filtro con pandas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# bench_marchas.py
+# CPU por paso de marcha: IK llamado directamente (calcula y mueve), grabado y reproducido
+# en cada paso (PreemptibleGait sin caché) y reproducido desde GaitCache. Usa el IK simulado
+# de ik_simulado.py con pausas muy cortas para que cuente solo el cálculo; en el robot
+# el IK real es más caro, así que el ahorro absoluto es mayor.
+#
+#   python robot/Test/bench_marchas.py [--pasos 300] [--cache-path /tmp/marchas.json]
+import os
+import time
+import argparse
+
+from controlador import FORWARD, BACK, TURN_LEFT
+from ik_simulado import BoardSimulado, IKSimulado
+from marcha import PreemptibleGait, GaitCache
+
+
+def cpu_por_paso(fn, pasos):
+    t0 = time.process_time()
+    for i in range(pasos):
+        fn(i)
+    return (time.process_time() - t0) / pasos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU por paso de marcha con y sin caché de trayectorias")
+    parser.add_argument("--pasos", type=int, default=300)
+    parser.add_argument("--fotogramas", type=int, default=6)
+    parser.add_argument("--cache-path", default=None,
+                        help="fichero para comprobar también el arranque en caliente desde disco")
+    args = parser.parse_args()
+
+    board = BoardSimulado()
+    ik = IKSimulado(board, ciclo=1e-4 * args.fotogramas, fotogramas=args.fotogramas)
+    marchas = [FORWARD, BACK, TURN_LEFT]
+
+    def directo(i):
+        gait, *params = marchas[i % 3]
+        getattr(ik, gait)(ik.initial_pos, *params)
+
+    sin_cache = PreemptibleGait(ik, board)
+    cache = GaitCache(path=args.cache_path)
+    con_cache = PreemptibleGait(ik, board, cache=cache)
+
+    def grabado(gait_exec):
+        def paso(i):
+            gait, *params = marchas[i % 3]
+            gait_exec.run(gait, ik.initial_pos, *params)
+        return paso
+
+    filas = [("IK directo", cpu_por_paso(directo, args.pasos)),
+             ("sin caché", cpu_por_paso(grabado(sin_cache), args.pasos)),
+             ("con caché", cpu_por_paso(grabado(con_cache), args.pasos))]
+
+    print(f"\n{args.pasos} pasos ({args.fotogramas} fotogramas de 18 servos por paso)")
+    print(f"{'modo':>11} | {'µs CPU/paso':>11} | {'vs directo':>10}")
+    print("-" * 40)
+    for nombre, coste in filas:
+        print(f"{nombre:>11} | {coste * 1e6:>11.1f} | {filas[0][1] / coste:>9.1f}x")
+    print(f"Caché: {cache.hits} aciertos, {cache.misses} fallos")
+
+    if args.cache_path:
+        cache.guardar()
+        t0 = time.process_time()
+        caliente = GaitCache(path=args.cache_path)
+        carga = time.process_time() - t0
+        print(f"Arranque en caliente: {len(caliente)} secuencias cargadas de {args.cache_path} "
+              f"({os.path.getsize(args.cache_path) / 1024:.0f} KiB) en {carga * 1e3:.1f} ms de CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_parada.py
+# Mide, sin hardware, el tiempo desde stop_robot() hasta el último comando de servo
+# (el stand) del MovementController, con un IK simulado cuyas marchas bloquean lo que
+# dura un ciclo real. Compara las marchas enteras (bloqueante) con la ejecución
+# fotograma a fotograma de PreemptibleGait, y comprueba el consumo de CPU en reposo.
+#
+#   python robot/Test/bench_parada.py [--paradas 30] [--ciclo 0.6] [--fotogramas 6] [--stand 0.2]
+import time
+import random
+import argparse
+
+from controlador import MovementController, IDLE
+from ik_simulado import BoardSimulado, IKSimulado
+from marcha import PreemptibleGait
+
+
+def medir(modo, args):
+    rng = random.Random(args.seed)
+    board = BoardSimulado()
+    ik = IKSimulado(board, args.ciclo, args.stand, args.fotogramas)
+    gait = PreemptibleGait(ik, board) if modo == "preemptible" else None
+    controller = MovementController(ik, step_pause=0.1, max_age=None, gait=gait).start()
+
+    # Reposo: el hilo debe estar dormido en el Condition
+    cpu0, t0 = time.process_time(), time.monotonic()
+    time.sleep(1.0)
+    cpu_reposo = (time.process_time() - cpu0) / (time.monotonic() - t0)
+
+    latencias = []
+    for _ in range(args.paradas):
+        controller.update_distance(20.0 if rng.random() < args.obstaculos else 100.0)
+        controller.enable()
+        time.sleep(rng.uniform(0.2, 2.0))
+        controller.update_distance(100.0)
+        t_stop = time.monotonic()
+        controller.disable()
+        while controller.state != IDLE or controller.active:
+            time.sleep(0.005)
+        latencias.append(board.t_ultimo - t_stop)
+    controller.shutdown()
+
+    latencias.sort()
+    return {"modo": modo, "cpu_reposo": cpu_reposo,
+            "p50": latencias[len(latencias) // 2],
+            "p95": latencias[min(int(0.95 * len(latencias)), len(latencias) - 1)],
+            "max": latencias[-1],
+            "reaccion": gait.reaction_stats() if gait is not None else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de parada del controlador de movimiento")
+    parser.add_argument("--paradas", type=int, default=30)
+    parser.add_argument("--ciclo", type=float, default=0.6, help="duración de una marcha (s)")
+    parser.add_argument("--fotogramas", type=int, default=6, help="comandos de servo por marcha")
+    parser.add_argument("--stand", type=float, default=0.2, help="duración del stand (s)")
+    parser.add_argument("--obstaculos", type=float, default=0.3,
+                        help="probabilidad de que haya un obstáculo delante en cada parada")
+    parser.add_argument("--modos", nargs="+", choices=["bloqueante", "preemptible"],
+                        default=["bloqueante", "preemptible"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    filas = [medir(modo, args) for modo in args.modos]
+
+    print(f"\nParada ({args.paradas} veces, marcha {args.ciclo:.2f}s en {args.fotogramas} fotogramas, "
+          f"stand {args.stand:.2f}s); de stop_robot() al último comando de servo:")
+    print(f"{'modo':>12} | {'p50 ms':>7} | {'p95 ms':>7} | {'máx ms':>7} | {'cota ms':>7} | {'CPU reposo':>10}")
+    print("-" * 66)
+    for r in filas:
+        # Bloqueante: lo que quede de la marcha en curso. Fotograma a fotograma la pausa se
+        # interrumpe al cancelar, así que solo cuenta un comando de servo ya en vuelo.
+        cota = f"{args.ciclo * 1e3:>7.0f}" if r["modo"] == "bloqueante" else f"{'1 cmd':>7}"
+        print(f"{r['modo']:>12} | {r['p50'] * 1e3:>7.1f} | {r['p95'] * 1e3:>7.1f} | {r['max'] * 1e3:>7.1f} | "
+              f"{cota} | {r['cpu_reposo']:>10.2%}")
+        if r["reaccion"] and r["reaccion"][0]:
+            n, p50, maximo = r["reaccion"]
+            print(f"{'':>12}   reacción a la cancelación: {n} veces, p50 {p50 * 1e3:.1f} ms, máx {maximo * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
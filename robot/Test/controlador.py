@@ -0,0 +1,249 @@
+# controlador.py
+# Máquina de estados del movimiento del robot: reposo, caminando, evitando y deteniéndose.
+import time
+import logging
+import threading
+from collections import deque
+
+from marcha import CancelToken
+
+logger = logging.getLogger(__name__)
+
+IDLE, WALKING, AVOIDING, STOPPING = "reposo", "caminando", "evitando", "deteniendo"
+
+# Marchas que usa el controlador: (método del IK, parámetros tras initial_pos)
+FORWARD = ("go_forward", 2, 80, 50, 1)
+BACK = ("back", 2, 80, 50, 1)
+TURN_LEFT = ("turn_left", 2, 50, 50, 1)
+
+
+class MovementController:
+    """
+    Hilo de movimiento dirigido por eventos. `enable()`/`disable()` (callbacks del
+    RobotClient) y `update_distance()` (cada lectura del sensor) cambian el estado bajo
+    un Condition y despiertan al hilo; en reposo espera sin consumir CPU.
+
+    - caminando: un ciclo de `go_forward` por iteración mientras no haya obstáculo.
+    - evitando: retrocede mientras la distancia sea menor que `back_off` (como mucho
+      `max_back_steps` pasos) y gira `turn_steps` pasos a la izquierda; cada paso comprueba
+      antes si se deshabilitó.
+    - deteniendo: `stand` y vuelta a reposo.
+
+    Se mide el tiempo desde `disable()` hasta el último comando de servo de la parada
+    (`stand`); su cota es la duración del comando de marcha en curso más la del stand.
+
+    Con `max_age`, una distancia más vieja que eso (sensor colgado o sin muestrear) no
+    autoriza a avanzar ni a seguir retrocediendo: el robot espera en el sitio a una lectura
+    nueva, y si no llega abandona la maniobra.
+
+    Con `gait` (PreemptibleGait) las marchas se ejecutan fotograma a fotograma: `disable()`
+    y un obstáculo detectado mientras avanza las cancelan entre dos comandos de servo, y
+    la cota de la parada baja a un fotograma más el stand.
+    """
+    def __init__(self, ik, threshold=40.0, back_off=25.0, turn_steps=6, step_pause=0.1,
+                 max_age=0.5, gait=None, historial=200, max_back_steps=10):
+        self.ik = ik
+        self.gait = gait
+        self.threshold = threshold        # cm: por debajo se inicia la evasión
+        self.back_off = back_off          # cm: por debajo se retrocede
+        self.turn_steps = turn_steps      # pasos de giro de 15° tras retroceder
+        self.max_back_steps = max_back_steps  # pasos máximos de retroceso por maniobra
+        self.step_pause = step_pause      # pausa entre pasos de la evasión (s)
+        self.max_age = max_age            # antigüedad máxima de la distancia para avanzar (s)
+
+        self._cond = threading.Condition()
+        self._enabled = False             # el servidor permite moverse
+        self._running = True              # False al cerrar el programa
+        self._distance = 0.0              # última distancia filtrada (cm); 0 = sin lectura
+        self._t_distance = None           # instante de esa lectura (monotonic)
+        self._t_disable = None            # instante de la última orden de parada (monotonic)
+        self._aviso_lectura = True        # avisar una vez por espera de lectura nueva
+        self._token = None                # CancelToken de la marcha en curso (con gait)
+        self.state = IDLE
+
+        self.stop_latencies = deque(maxlen=historial)  # s desde disable() hasta el stand
+
+        self._thread = threading.Thread(target=self._loop, name="movimiento", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    # ------------------ Señales ------------------
+    def enable(self):
+        with self._cond:
+            self._enabled = True
+            self._cond.notify_all()
+
+    def disable(self):
+        with self._cond:
+            if self._enabled:
+                self._t_disable = time.monotonic()
+            self._enabled = False
+            if self._token is not None:
+                self._token.cancel("parada")
+            self._cond.notify_all()
+
+    def update_distance(self, distance, t=None):
+        """Nueva distancia filtrada; `t` es el instante (monotonic) de la lectura, por defecto ahora."""
+        with self._cond:
+            self._distance = distance
+            self._t_distance = t if t is not None else time.monotonic()
+            if self.state == WALKING and self._token is not None and 0 < distance < self.threshold:
+                # Obstáculo mientras avanza: cortar el paso hacia delante en el siguiente fotograma
+                self._token.cancel("obstaculo")
+            self._cond.notify_all()
+
+    def update_reading(self, lectura):
+        """Callback para UltrasonicSampler(on_sample=...)."""
+        self.update_distance(lectura.distance, lectura.t)
+
+    def shutdown(self, timeout=5.0):
+        with self._cond:
+            self._running = False
+            self._enabled = False
+            if self._token is not None:
+                self._token.cancel("parada")
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    @property
+    def active(self):
+        """True mientras el robot está habilitado o terminando una maniobra."""
+        return self.state != IDLE or self._enabled
+
+    @property
+    def distance(self):
+        return self._distance
+
+    # ------------------ Hilo de movimiento ------------------
+    def _puede_moverse(self):
+        return self._enabled and self._running
+
+    def _esperar(self, segundos):
+        """Pausa entre pasos que termina antes si se deshabilita el movimiento."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._puede_moverse(), segundos)
+            return self._puede_moverse()
+
+    def _fresca(self):
+        # Llamar con self._cond tomado
+        return (self.max_age is None
+                or (self._t_distance is not None and time.monotonic() - self._t_distance <= self.max_age))
+
+    def _esperar_lectura(self):
+        """Espera a una distancia reciente; False si entretanto se deshabilita el movimiento."""
+        with self._cond:
+            if self._fresca():
+                return self._puede_moverse()
+            if self._aviso_lectura:
+                self._aviso_lectura = False
+                print("⏸️ Distancia sin actualizar: esperando al sensor antes de avanzar")
+            self._cond.wait_for(lambda: self._fresca() or not self._puede_moverse(), self.max_age)
+            return self._puede_moverse()
+
+    def _paso(self, gait, *params):
+        """Ejecuta una marcha desde ik.initial_pos; False si se canceló a mitad (solo con gait)."""
+        if self.gait is None:
+            getattr(self.ik, gait)(self.ik.initial_pos, *params)
+            return True
+        with self._cond:
+            token = self._token = CancelToken()
+            if not self._puede_moverse():
+                token.cancel("parada")
+        try:
+            return self.gait.run(gait, self.ik.initial_pos, *params, token=token)
+        finally:
+            with self._cond:
+                self._token = None
+
+    def precalcular(self):
+        """Graba de antemano las marchas del controlador (con gait y caché: el primer paso ya no calcula IK)."""
+        if self.gait is None:
+            return
+        for gait, *params in (FORWARD, BACK, TURN_LEFT):
+            self.gait.secuencia(gait, self.ik.initial_pos, *params)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                # En reposo, dormir hasta que el servidor habilite el movimiento
+                self._cond.wait_for(lambda: self._enabled or not self._running)
+                if not self._running:
+                    return
+            try:
+                self._ciclo()
+            except Exception as e:
+                print(f"❌ Error en movimiento: {e}")
+                time.sleep(0.1)
+
+    def _ciclo(self):
+        """Una pasada de la máquina de estados hasta volver a reposo."""
+        self.state = WALKING
+        self._aviso_lectura = True
+        while self._esperar_lectura():
+            with self._cond:
+                if not self._fresca():
+                    continue
+                distance = self._distance
+                self._aviso_lectura = True
+            if 0 < distance < self.threshold:
+                self.state = AVOIDING
+                self._evitar(distance)
+                self.state = WALKING
+            elif not self._paso(*FORWARD) and self._puede_moverse():
+                # Paso cortado por un obstáculo: asentar antes de la evasión
+                self.ik.stand(self.ik.initial_pos)
+        self._detener()
+
+    def _evitar(self, distance):
+        print(f"⚠️ Obstáculo detectado a {distance:.1f}cm - Iniciando maniobra de evasión")
+
+        # Retroceder mientras esté muy cerca, siempre con una lectura reciente
+        for paso in range(self.max_back_steps + 1):
+            if not self._esperar_lectura():
+                return
+            with self._cond:
+                if not self._fresca():
+                    print("⏸️ Sin lecturas nuevas del sensor: se abandona la maniobra")
+                    return
+                distance = self._distance
+            if distance >= self.back_off:
+                break
+            if paso == self.max_back_steps:
+                print(f"⚠️ Sigue a {distance:.1f}cm tras {paso} pasos atrás: se gira sin retroceder más")
+                break
+            if not self._paso(*BACK) or not self._esperar(self.step_pause):
+                return
+
+        # Realizar giro completo (6 pasos de 15° = 90°)
+        for i in range(self.turn_steps):
+            if not self._puede_moverse():
+                return
+            if not self._paso(*TURN_LEFT):
+                return
+            print(f"🔄 Girando {(i+1)*15}°...")
+            if not self._esperar(self.step_pause):
+                return
+        print("✅ Maniobra de evasión completada")
+
+    def _detener(self):
+        self.state = STOPPING
+        self.ik.stand(self.ik.initial_pos)
+        with self._cond:
+            t_disable, self._t_disable = self._t_disable, None
+        if t_disable is not None:
+            latencia = time.monotonic() - t_disable
+            self.stop_latencies.append(latencia)
+            print(f"🛑 Robot detenido completamente ({latencia * 1e3:.0f} ms desde la orden de parada)")
+        else:
+            print('🛑 Robot detenido completamente')
+        self.state = IDLE
+
+    def stop_latency_stats(self):
+        """(n, p50, máx) en segundos de las últimas paradas."""
+        if not self.stop_latencies:
+            return 0, None, None
+        ordenadas = sorted(self.stop_latencies)
+        return len(ordenadas), ordenadas[len(ordenadas) // 2], ordenadas[-1]
@@ -0,0 +1,164 @@
+# filtro_distancia.py
+# Filtro de la distancia del sensor ultrasónico sobre una ventana deslizante de tamaño fijo.
+import math
+from array import array
+from bisect import bisect_left, insort
+
+
+class DistanceFilter:
+    """
+    Estima la distancia descartando lecturas atípicas de las últimas `n` muestras.
+    - modo "std": media de las muestras a no más de una desviación estándar (muestral)
+      de la media; es el filtro original con pandas, sin construir un DataFrame por muestra.
+    - modo "mad": media de las muestras a no más de `k_mad` desviaciones robustas
+      (1.4826 * MAD) de la mediana; un eco espurio no arrastra el centro del filtro.
+    Todo el estado está preasignado: un buffer circular con suma y suma de cuadrados
+    acumuladas (recalculadas cada `recalc` muestras para acotar el error de redondeo) y,
+    en modo "mad", una copia ordenada de la ventana. `push` no crea listas ni arrays.
+
+    El coste por muestra no es constante sino lineal en `n`: la media con descarte tiene
+    que mirar cada muestra de la ventana (una pasada en modo "std"; en "mad", además, la
+    inserción ordenada y la ordenación de las desviaciones). Con las ventanas de este robot
+    (5 a 25 muestras) son unos pocos microsegundos; ver bench_filtro.py.
+    """
+    def __init__(self, n=5, modo="std", k_mad=3.0, recalc=1000):
+        if n < 1:
+            raise ValueError("n debe ser al menos 1")
+        if modo not in ("std", "mad"):
+            raise ValueError("modo debe ser 'std' o 'mad'")
+        self.n = n
+        self.modo = modo
+        self.k_mad = k_mad
+        self.recalc = recalc
+
+        self._buf = array('d', [0.0] * n)   # ventana circular
+        self._pos = 0                       # próxima posición a escribir
+        self._count = 0                     # muestras en la ventana (<= n)
+        self._suma = 0.0
+        self._suma2 = 0.0
+        self._desde_recalc = 0
+        self._ordenada = []                 # ventana ordenada (modo "mad"), nunca pasa de n
+        self._desv = [0.0] * n              # desviaciones a la mediana (modo "mad")
+
+        self.distance = None                # última estimación
+
+    def push(self, x):
+        """Añade una lectura y devuelve la distancia filtrada."""
+        x = float(x)
+        if self._count == self.n:
+            viejo = self._buf[self._pos]
+            self._suma -= viejo
+            self._suma2 -= viejo * viejo
+            if self.modo == "mad":
+                del self._ordenada[bisect_left(self._ordenada, viejo)]
+        else:
+            self._count += 1
+        self._buf[self._pos] = x
+        self._pos = (self._pos + 1) % self.n
+        self._suma += x
+        self._suma2 += x * x
+        if self.modo == "mad":
+            insort(self._ordenada, x)
+
+        self._desde_recalc += 1
+        if self._desde_recalc >= self.recalc:
+            self._recalcular()
+
+        if self._count == 1:
+            self.distance = x
+        elif self.modo == "std":
+            self.distance = self._media_std(x)
+        else:
+            self.distance = self._media_mad(x)
+        return self.distance
+
+    def _recalcular(self):
+        self._desde_recalc = 0
+        self._suma = self._suma2 = 0.0
+        for i in range(self._count):
+            v = self._buf[i]
+            self._suma += v
+            self._suma2 += v * v
+
+    def _media_std(self, x):
+        count = self._count
+        media = self._suma / count
+        var = (self._suma2 - self._suma * media) / (count - 1)
+        std = math.sqrt(var) if var > 0 else 0.0
+        total, dentro, frontera = self._dentro(media, std)
+        if frontera:
+            # Alguna muestra cae (casi) justo a una desviación de la media. Con lecturas
+            # cuantizadas a milímetros ocurre a menudo, y ahí el redondeo de las sumas
+            # acumuladas decide si entra: se recalcula como lo hacía pandas
+            media, std = self._estadisticos_exactos()
+            if std > 0:
+                total, dentro, _ = self._dentro(media, std)
+        if std == 0:
+            return media
+        return total / dentro if dentro else x
+
+    def _dentro(self, media, std):
+        """
+        Una pasada por la ventana en orden cronológico (como sumaba pandas): suma y número
+        de muestras a no más de `std` de `media`, y si alguna está en la frontera.
+        """
+        buf = self._buf
+        eps = 1e-9 * (abs(media) + std + 1.0)
+        inicio = self._pos if self._count == self.n else 0
+        total, dentro, frontera = 0.0, 0, False
+        for rango in (range(inicio, self._count), range(inicio)):
+            for i in rango:
+                v = buf[i]
+                d = abs(v - media)
+                if d <= std:
+                    total += v
+                    dentro += 1
+                if abs(d - std) <= eps:
+                    frontera = True
+        return total, dentro, frontera
+
+    def _estadisticos_exactos(self):
+        # Media y desviación muestral en dos pasadas y en orden cronológico (igual que pandas)
+        count = self._count
+        inicio = self._pos if count == self.n else 0
+        suma = 0.0
+        for j in range(count):
+            suma += self._buf[(inicio + j) % self.n]
+        media = suma / count
+        sq = 0.0
+        for j in range(count):
+            d = media - self._buf[(inicio + j) % self.n]
+            sq += d * d
+        return media, math.sqrt(sq / (count - 1))
+
+    def _media_mad(self, x):
+        count = self._count
+        ordenada, desv = self._ordenada, self._desv
+        mediana = self._mediana(ordenada, count)
+        for i in range(count):
+            desv[i] = abs(ordenada[i] - mediana)
+        # Solo las primeras `count` posiciones son válidas: las demás quedan a +inf al ordenar
+        for i in range(count, self.n):
+            desv[i] = math.inf
+        desv.sort()
+        limite = self.k_mad * 1.4826 * self._mediana(desv, count)
+        total, dentro = 0.0, 0
+        for i in range(count):
+            v = ordenada[i]
+            if abs(v - mediana) <= limite:
+                total += v
+                dentro += 1
+        return total / dentro if dentro else x
+
+    @staticmethod
+    def _mediana(ordenados, count):
+        mitad = count // 2
+        if count % 2:
+            return ordenados[mitad]
+        return (ordenados[mitad - 1] + ordenados[mitad]) / 2
+
+    def reset(self):
+        self._pos = self._count = self._desde_recalc = 0
+        self._suma = self._suma2 = 0.0
+        del self._ordenada[:]
+        self.distance = None
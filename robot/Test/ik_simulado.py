@@ -0,0 +1,65 @@
+# ik_simulado.py
+# IK y Board simulados para medir el control de movimiento sin el robot: misma interfaz
+# que common.kinematics.IK y common.ros_robot_controller_sdk.Board en lo que se usa aquí.
+import math
+import time
+import threading
+
+
+class BoardSimulado:
+    """Cuenta los comandos de servo y guarda el instante del último."""
+    def __init__(self):
+        self.comandos = 0
+        self.t_ultimo = None           # monotonic del último comando
+        self._lock = threading.Lock()
+
+    def bus_servo_set_position(self, duracion, posiciones):
+        with self._lock:
+            self.comandos += 1
+            self.t_ultimo = time.monotonic()
+
+
+class IKSimulado:
+    """
+    Cada marcha son `fotogramas` comandos de 18 servos separados por su pausa, de modo
+    que una llamada bloquea `ciclo` segundos por repetición, como el IK real. Las
+    posiciones se calculan con algo de trigonometría por pata para simular su coste.
+    """
+    def __init__(self, board, ciclo=0.6, stand=0.2, fotogramas=6):
+        self.board = board
+        self.ciclo = ciclo
+        self.stand_s = stand
+        self.fotogramas = fotogramas
+        self.initial_pos = [(100.0, 100.0, -70.0)] * 6
+
+    def _pulsos(self, pos, fase, paso):
+        pulsos = []
+        for pata, (x, y, z) in enumerate(pos):
+            dx = paso * math.cos(fase + pata * math.pi / 3)
+            dz = 20 * max(0.0, math.sin(fase + pata * math.pi / 3))
+            femur = math.atan2(z + dz, math.hypot(x + dx, y))
+            coxa = math.atan2(y, x + dx)
+            tibia = math.acos(max(-1.0, min(1.0, (x * x + y * y) / (2 * 110.0 * 110.0) - 1)))
+            pulsos += [[pata * 3 + 1, int(500 + coxa * 318)], [pata * 3 + 2, int(500 + femur * 318)],
+                       [pata * 3 + 3, int(500 + tibia * 318)]]
+        return pulsos
+
+    def _marcha(self, pos, paso, veces):
+        dt = self.ciclo / self.fotogramas
+        for _ in range(veces):
+            for k in range(self.fotogramas):
+                self.board.bus_servo_set_position(dt, self._pulsos(pos, 2 * math.pi * k / self.fotogramas, paso))
+                time.sleep(dt)
+
+    def go_forward(self, pos, modo, paso, t, veces):
+        self._marcha(pos, paso, veces)
+
+    def back(self, pos, modo, paso, t, veces):
+        self._marcha(pos, -paso, veces)
+
+    def turn_left(self, pos, modo, paso, t, veces):
+        self._marcha(pos, paso / 2, veces)
+
+    def stand(self, pos, t=None):
+        self.board.bus_servo_set_position(self.stand_s, self._pulsos(pos, 0.0, 0.0))
+        time.sleep(self.stand_s)
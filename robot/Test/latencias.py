@@ -0,0 +1,116 @@
+# latencias.py
+# Latencia de extremo a extremo, del frame de la cámara al callback del robot, a partir
+# de la traza que publica el servidor de detección en /estado.
+import time
+import bisect
+import logging
+from collections import deque
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Saltos de la traza: (nombre, instante inicial, instante final). Los instantes del detector
+# y del servidor están en el reloj del equipo de la cámara; los del robot se pasan a ese
+# reloj con el desfase estimado por RelojServidor.
+SALTOS = [
+    ("deteccion", "t_captura", "t_inferencia"),         # captura del frame -> fin de la inferencia
+    ("decision", "t_inferencia", "t_notificacion"),     # filtro, ventana de gracia y notify()
+    ("envio", "t_notificacion", "t_servidor"),          # POST al servidor (o entrega en proceso)
+    ("servidor_robot", "t_servidor", "t_recepcion"),    # publicación -> llegada al robot (SSE o polling)
+    ("callback", "t_recepcion", "t_callback"),          # llegada -> on_start/on_stop
+    ("total", "t_captura", "t_callback"),
+]
+
+
+# ------------------ Desfase de reloj ------------------
+class RelojServidor:
+    """
+    Estima el desfase entre el reloj local y el del servidor (GET /reloj) al estilo NTP:
+    de `muestras` peticiones se queda con la de menor ida y vuelta y supone el instante
+    del servidor en su punto medio. El error queda acotado por la mitad de ese RTT.
+    Se re-sincroniza cada `intervalo` segundos para seguir la deriva.
+    """
+    def __init__(self, url, muestras=8, intervalo=60.0, timeout=1.0, reloj=time.time):
+        self.url = url
+        self.muestras = muestras
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.reloj = reloj
+        self.offset = 0.0          # reloj del servidor - reloj local (s)
+        self.rtt = None            # ida y vuelta de la mejor muestra (s)
+        self._t_sync = None
+
+    def sincronizar(self):
+        mejor = None
+        for _ in range(self.muestras):
+            try:
+                t0 = self.reloj()
+                resp = requests.get(self.url, timeout=self.timeout)
+                t1 = self.reloj()
+                t_servidor = resp.json()["t"]
+            except Exception as e:
+                logger.debug(f"Muestra de reloj fallida: {e}")
+                continue
+            if mejor is None or t1 - t0 < mejor[0]:
+                mejor = (t1 - t0, t_servidor - (t0 + t1) / 2)
+        self._t_sync = time.monotonic()
+        if mejor is None:
+            logger.warning("No se pudo estimar el desfase de reloj con el servidor")
+            return False
+        self.rtt, self.offset = mejor
+        logger.info(f"🕒 Desfase con el servidor: {self.offset * 1e3:+.1f} ms (±{self.rtt * 500:.1f} ms)")
+        return True
+
+    def vencido(self):
+        return self._t_sync is None or time.monotonic() - self._t_sync >= self.intervalo
+
+    def servidor(self, t_local):
+        """Pasa un instante del reloj local al del servidor."""
+        return t_local + self.offset
+
+
+# ------------------ Histogramas ------------------
+class HistogramaLatencias:
+    """
+    Histograma acumulado por salto con cubetas fijas (ms), más las últimas `ventana`
+    muestras de cada salto para percentiles recientes.
+    """
+    CUBETAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self, ventana=500):
+        self.ventana = ventana
+        self.conteos = {}          # salto -> lista de conteos por cubeta (+ desbordamiento)
+        self.recientes = {}        # salto -> deque de muestras (s)
+        self.trazas = 0
+
+    def observe(self, salto, segundos):
+        conteos = self.conteos.get(salto)
+        if conteos is None:
+            conteos = self.conteos[salto] = [0] * (len(self.CUBETAS_MS) + 1)
+            self.recientes[salto] = deque(maxlen=self.ventana)
+        conteos[bisect.bisect_left(self.CUBETAS_MS, segundos * 1e3)] += 1
+        self.recientes[salto].append(segundos)
+
+    def registrar(self, traza):
+        """Añade los saltos de una traza completa (dict con los instantes de SALTOS)."""
+        self.trazas += 1
+        for salto, inicio, fin in SALTOS:
+            if inicio in traza and fin in traza:
+                self.observe(salto, traza[fin] - traza[inicio])
+
+    def percentil(self, salto, q):
+        muestras = sorted(self.recientes.get(salto, ()))
+        if not muestras:
+            return None
+        return muestras[min(int(q / 100 * len(muestras)), len(muestras) - 1)]
+
+    def resumen(self):
+        lineas = [f"Latencias de {self.trazas} cambios de estado (ms, últimas {self.ventana} muestras):"]
+        for salto, _, _ in SALTOS:
+            if salto not in self.recientes:
+                continue
+            p50, p95 = self.percentil(salto, 50), self.percentil(salto, 95)
+            lineas.append(f"  {salto:>15}: p50 {p50 * 1e3:8.1f}  p95 {p95 * 1e3:8.1f}  "
+                          f"máx {max(self.recientes[salto]) * 1e3:8.1f}  (n={sum(self.conteos[salto])})")
+        return "\n".join(lineas)
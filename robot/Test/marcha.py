@@ -0,0 +1,250 @@
+# marcha.py
+# Ejecución de las marchas de common.kinematics.IK fotograma a fotograma, para poder
+# interrumpirlas entre dos comandos de servo en lugar de esperar al ciclo completo.
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------ Cancelación ------------------
+class CancelToken:
+    """Señal de cancelación de una marcha; guarda el motivo y el instante para medir la reacción."""
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+        self.t_cancel = None           # monotonic de la primera cancelación
+
+    def cancel(self, reason="parada"):
+        if not self._event.is_set():
+            self.reason = reason
+            self.t_cancel = time.monotonic()
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def wait(self, segundos):
+        """Duerme hasta `segundos`; devuelve True si se canceló entretanto."""
+        return self._event.wait(segundos)
+
+
+# ------------------ Grabación de fotogramas ------------------
+class _BoardGrabador:
+    """Sustituye al Board durante la grabación: anota los comandos de servo sin enviarlos."""
+    def __init__(self, board, pasos):
+        self._board = board
+        self._pasos = pasos
+
+    def __getattr__(self, nombre):
+        attr = getattr(self._board, nombre)
+        if not callable(attr) or "set" not in nombre:
+            return attr                # lecturas y demás pasan al Board real
+
+        def grabar(*args, **kwargs):
+            # El IK puede reutilizar las listas de posiciones entre fotogramas
+            self._pasos.append((nombre, copy.deepcopy(args), copy.deepcopy(kwargs)))
+        return grabar
+
+
+class _RelojGrabador:
+    """Sustituye al módulo time del IK durante la grabación: sleep() se anota, no se duerme."""
+    def __init__(self, pasos):
+        self._pasos = pasos
+
+    def sleep(self, segundos):
+        self._pasos.append(("sleep", (segundos,), {}))
+
+    def __getattr__(self, nombre):
+        return getattr(time, nombre)
+
+
+def grabar(ik, board, gait, *args, **kwargs):
+    """
+    Ejecuta `ik.<gait>(*args)` sin mover nada y devuelve su secuencia de pasos:
+    [(método del Board, args, kwargs), ("sleep", (s,), {}), ...].
+    El IK calcula igual que siempre; solo se interceptan sus llamadas al Board y sus pausas.
+    """
+    pasos = []
+    grabador = _BoardGrabador(board, pasos)
+    modulo = sys.modules.get(type(ik).__module__)
+    parches = [(ik, nombre) for nombre, valor in vars(ik).items() if valor is board]
+    if modulo is not None:
+        parches += [(modulo, nombre) for nombre in ("time", "sleep")
+                    if getattr(modulo, nombre, None) in (time, time.sleep)]
+    originales = [(obj, nombre, getattr(obj, nombre)) for obj, nombre in parches]
+    reloj = _RelojGrabador(pasos)
+    try:
+        for obj, nombre, original in originales:
+            if original is board:
+                setattr(obj, nombre, grabador)
+            else:
+                setattr(obj, nombre, reloj if original is time else reloj.sleep)
+        getattr(ik, gait)(*args, **kwargs)
+    finally:
+        for obj, nombre, original in originales:
+            setattr(obj, nombre, original)
+    return pasos
+
+
+# ------------------ Caché de trayectorias ------------------
+def _a_json(obj):
+    # Arrays y escalares de NumPy (posiciones del IK) como listas y números de Python
+    return obj.tolist() if hasattr(obj, "tolist") else repr(obj)
+
+
+class GaitCache:
+    """
+    Secuencias de servo ya calculadas, por (marcha, initial_pos, parámetros). El bucle de
+    evasión repite siempre las mismas marchas con los mismos argumentos, así que la
+    cinemática inversa se calcula una vez por clave. Como mucho `max_entries` entradas,
+    expulsando la menos usada.
+
+    Con `path`, se cargan al crearla y `guardar()` las escribe (JSON, reemplazo atómico)
+    para arrancar en caliente. `firma` identifica la calibración con la que se grabaron
+    (p. ej. la config de servos): si no coincide con la del fichero, se ignora.
+    """
+    FORMATO = 1
+
+    def __init__(self, max_entries=32, path=None, firma=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.firma = firma
+        self._entradas = OrderedDict()   # clave -> pasos
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self._cargar()
+
+    @staticmethod
+    def clave(gait, *args):
+        # JSON canónico: las tuplas y listas de initial_pos dan la misma clave
+        return json.dumps([gait, *args], sort_keys=True, default=_a_json)
+
+    def get(self, clave):
+        with self._lock:
+            pasos = self._entradas.get(clave)
+            if pasos is None:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return pasos
+
+    def put(self, clave, pasos):
+        with self._lock:
+            self._entradas[clave] = pasos
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def _cargar(self):
+        try:
+            with open(self.path) as f:
+                datos = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer la caché de marchas {self.path}: {e}")
+            return
+        if not isinstance(datos, dict):
+            logger.warning(f"Caché de marchas {self.path} con formato inesperado: se recalcula")
+            return
+        if datos.get("formato") != self.FORMATO or datos.get("firma") != self.firma:
+            logger.info(f"Caché de marchas {self.path} de otra calibración: se recalcula")
+            return
+        try:
+            entradas = OrderedDict(
+                (clave, [(nombre, tuple(args), dict(kwargs)) for nombre, args, kwargs in pasos])
+                for clave, pasos in datos["entradas"][-self.max_entries:])
+        except (KeyError, TypeError, ValueError) as e:
+            # Fichero con la firma correcta pero estructura rota: como si estuviera corrupto
+            logger.warning(f"Caché de marchas {self.path} con formato inesperado ({e!r}): se recalcula")
+            return
+        self._entradas = entradas
+        logger.info(f"Caché de marchas: {len(self._entradas)} secuencias cargadas de {self.path}")
+
+    def guardar(self):
+        if self.path is None:
+            return
+        with self._lock:
+            datos = {"formato": self.FORMATO, "firma": self.firma,
+                     "entradas": [[clave, pasos] for clave, pasos in self._entradas.items()]}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(datos, f, default=_a_json)
+        os.replace(tmp, self.path)
+
+
+# ------------------ Ejecución interrumpible ------------------
+class PreemptibleGait:
+    """
+    Envuelve un `common.kinematics.IK`: cada marcha (`go_forward`, `back`, `turn_left`...)
+    se graba con `grabar` y se reproduce contra el Board real comando a comando. Antes de
+    cada comando y durante cada pausa se mira el `CancelToken`, así que una parada o un
+    obstáculo se atienden en, como mucho, un fotograma. Quien cancela decide cómo asentar
+    el robot (normalmente `ik.stand`).
+
+    `reaction_latencies` guarda, por cada cancelación atendida, el tiempo desde
+    `token.cancel()` hasta que deja de enviarse la marcha.
+
+    Con `cache` (GaitCache) cada marcha se graba una sola vez por combinación de argumentos
+    y después se reproduce directamente contra el Board.
+    """
+    def __init__(self, ik, board, cache=None, historial=200):
+        self.ik = ik
+        self.board = board
+        self.cache = cache
+        self.reaction_latencies = deque(maxlen=historial)
+        self.fotogramas = 0            # comandos de servo enviados
+        self.canceladas = 0
+
+    def secuencia(self, gait, *args):
+        if self.cache is None:
+            return grabar(self.ik, self.board, gait, *args)
+        clave = self.cache.clave(gait, *args)
+        pasos = self.cache.get(clave)
+        if pasos is None:
+            pasos = grabar(self.ik, self.board, gait, *args)
+            self.cache.put(clave, pasos)
+        return pasos
+
+    def run(self, gait, *args, token=None):
+        """Ejecuta la marcha; devuelve True si terminó y False si se canceló a mitad."""
+        pasos = self.secuencia(gait, *args)
+        return self.reproducir(pasos, token)
+
+    def reproducir(self, pasos, token=None):
+        for nombre, args, kwargs in pasos:
+            if nombre == "sleep":
+                if token is not None and token.wait(args[0]):
+                    return self._cancelada(token)
+                if token is None:
+                    time.sleep(args[0])
+                continue
+            if token is not None and token.cancelled:
+                return self._cancelada(token)
+            getattr(self.board, nombre)(*args, **kwargs)
+            self.fotogramas += 1
+        return True
+
+    def _cancelada(self, token):
+        self.canceladas += 1
+        self.reaction_latencies.append(time.monotonic() - token.t_cancel)
+        return False
+
+    def reaction_stats(self):
+        """(n, p50, máx) en segundos de las últimas cancelaciones."""
+        if not self.reaction_latencies:
+            return 0, None, None
+        ordenadas = sorted(self.reaction_latencies)
+        return len(ordenadas), ordenadas[len(ordenadas) // 2], ordenadas[-1]
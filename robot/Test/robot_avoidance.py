@@ -3,14 +3,16 @@
 # Robot con evitación de obstáculos controlado por servidor remoto
 import os
 import sys
+import json
 import time
-import threading
-import numpy as np
-import pandas as pd
 from common import yaml_handle
 from common import kinematics
 from sensor.ultrasonic_sensor import Ultrasonic
 from robot_client import RobotClient
+from filtro_distancia import DistanceFilter
+from controlador import MovementController
+from marcha import PreemptibleGait, GaitCache
+from sensor_distancia import UltrasonicSampler
 
 if sys.version_info.major == 2:
     print('Please run this program with python3!')
@@ -28,13 +30,11 @@ def load_config():
 load_config()
 
 servo2_pulse = servo_data['servo2']
+GAIT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'marchas_cache.json')
 Threshold = 40.0 # Umbral de detección de obstáculos en cm
 
-# Variables de control
-__isRunning = False
-__serverEnabled = False  # Control desde servidor
-__isAvoiding = False     # Flag para indicar si está evitando obstáculo
-distance = 0
+# Control del movimiento: máquina de estados en su propio hilo (se crea en main() con el IK)
+controller = None
 
 def reset():
     board.pwm_servo_set_position(0.5, [[1, 1800] , [2, servo_data['servo2']]])
@@ -44,17 +44,27 @@ def init():
     print('🤖 Robot Avoidance Init')
 
 def exit():
-    global __isRunning
-    
+    if controller is not None:
+        controller.shutdown()
+        n, p50, maximo = controller.stop_latency_stats()
+        if n:
+            print(f"⏱️ Paradas: {n}, p50 {p50 * 1e3:.0f} ms, máx {maximo * 1e3:.0f} ms desde la orden al stand")
+        cache = controller.gait.cache
+        cache.guardar()
+        print(f"🗂️ Caché de marchas: {cache.hits} aciertos, {cache.misses} fallos, {len(cache)} secuencias")
+        n, p50, maximo = controller.gait.reaction_stats()
+        if n:
+            print(f"⏱️ Marchas cortadas: {n}, reacción p50 {p50 * 1e3:.1f} ms, máx {maximo * 1e3:.1f} ms")
     ultrasonic.setRGBMode(0)
     ultrasonic.setRGB(1, (0, 0, 0))
     ultrasonic.setRGB(2, (0, 0, 0))
-    __isRunning = False
     print('🤖 Robot Avoidance Exit')
 
 def setThreshold(args):
     global Threshold
     Threshold = args[0]
+    if controller is not None:
+        controller.threshold = Threshold
     return (True, (Threshold,))
 
 def getThreshold(args):
@@ -63,110 +73,30 @@ def getThreshold(args):
 
 def start_robot():
     """Inicia el movimiento del robot (llamado por el cliente)"""
-    global __isRunning, __serverEnabled
-    __serverEnabled = True
-    __isRunning = True
+    controller.enable()
     print('🟢 Robot movimiento HABILITADO por servidor')
 
 def stop_robot():
     """Detiene el movimiento del robot de forma controlada"""
-    global __serverEnabled
-    __serverEnabled = False
+    # La maniobra en curso se interrumpe en el siguiente paso y el robot queda en stand
+    controller.disable()
     print('🔴 Robot movimiento DESHABILITADO por servidor')
-    # No detenemos __isRunning inmediatamente para permitir que termine maniobras
 
 def server_disconnected():
     """Maneja desconexión del servidor"""
-    global __serverEnabled
-    __serverEnabled = False
+    controller.disable()
     print('⚠️ Servidor desconectado - Robot en modo seguro')
 
-def controlled_stop():
-    """Detiene el robot de forma controlada"""
-    global __isRunning
-    __isRunning = False
-    ik.stand(ik.initial_pos)
-    print('🛑 Robot detenido completamente')
-
-def move():
-    """Hilo principal de movimiento con control del servidor"""
-    global __isRunning, __serverEnabled, __isAvoiding
-    
-    while True:
-        try:
-            # Solo se mueve si el servidor lo permite Y el sistema está activo
-            if __isRunning and __serverEnabled:
-                if 0 < distance < Threshold:
-                    __isAvoiding = True
-                    print(f"⚠️ Obstáculo detectado a {distance:.1f}cm - Iniciando maniobra de evasión")
-                    
-                    # Retroceder mientras esté muy cerca
-                    while distance < 25 and __isRunning:
-                        if not __serverEnabled:  # Verificar durante retroceso
-                            break
-                        ik.back(ik.initial_pos, 2, 80, 50, 1)
-                        time.sleep(0.1)
-                    
-                    # Realizar giro completo (6 pasos de 15° = 90°)
-                    for i in range(6):
-                        if not __isRunning or not __serverEnabled:
-                            break
-                        ik.turn_left(ik.initial_pos, 2, 50, 50, 1)
-                        print(f"🔄 Girando {(i+1)*15}°...")
-                        time.sleep(0.1)
-                    
-                    __isAvoiding = False
-                    print("✅ Maniobra de evasión completada")
-                    
-                else: 
-                    # Avanzar normalmente
-                    if not __isAvoiding:  # Solo avanzar si no está evitando
-                        ik.go_forward(ik.initial_pos, 2, 80, 50, 1)
-                        
-            else:
-                # Si el servidor deshabilitó el movimiento y no está evitando, detener
-                if not __serverEnabled and not __isAvoiding and __isRunning:
-                    controlled_stop()
-                
-                time.sleep(0.01)
-                
-        except Exception as e:
-            print(f"❌ Error en movimiento: {e}")
-            time.sleep(0.1)
-
-# Iniciar hilo de movimiento
-movement_thread = threading.Thread(target=move, daemon=True)
-movement_thread.start()
-
-distance_data = []
-
-def run():
-    """Procesa datos del sensor ultrasónico"""
-    global __isRunning, __serverEnabled, distance, distance_data
-
-    if __isRunning:
-        # Procesamiento de datos del sensor ultrasónico con filtrado estadístico
-        distance_ = ultrasonic.getDistance() / 10.0
-        distance_data.append(distance_)
-        
-        if len(distance_data) > 1:
-            data = pd.DataFrame(distance_data)
-            data_ = data.copy()
-            u = data_.mean()  # Media
-            std = data_.std()  # Desviación estándar
-
-            # Filtrar valores atípicos (fuera de 1 desviación estándar)
-            data_c = data[np.abs(data - u) <= std] if std[0] > 0 else data
-            distance = data_c.mean()[0] if len(data_c) > 0 else distance_
-        else:
-            distance = distance_
-            
-        # Mantener ventana deslizante de 5 mediciones
-        if len(distance_data) >= 5:
-            distance_data.pop(0)
+# Muestreo del sensor cada 10 ms como mínimo. La ventana del filtro se fija en tiempo: los
+# ~250 ms que cubrían 5 mediciones cuando se leía en el loop principal (~20 Hz), es decir
+# 25 muestras a 100 Hz; modo="mad" para un filtro más robusto a ecos espurios
+SAMPLE_INTERVAL = 0.01
+FILTER_WINDOW = 0.25
+distance_filter = DistanceFilter(n=round(FILTER_WINDOW / SAMPLE_INTERVAL), modo="std")
+sampler = None
 
 def main():
-    global board, ik, ultrasonic, client
+    global board, ik, ultrasonic, client, controller, sampler
     
     print("🤖 Iniciando Robot con Evitación de Obstáculos Controlado por Servidor")
     
@@ -174,10 +104,19 @@ def main():
     from common.ros_robot_controller_sdk import Board
     board = Board()
     ik = kinematics.IK(board)
+    # Marchas fotograma a fotograma: una parada o un obstáculo las cortan entre dos comandos de servo.
+    # Sus secuencias de servo se calculan una vez y se guardan junto a este script para el próximo arranque
+    gait_cache = GaitCache(path=GAIT_CACHE_PATH, firma=json.dumps(servo_data, sort_keys=True, default=str))
+    controller = MovementController(ik, threshold=Threshold, gait=PreemptibleGait(ik, board, cache=gait_cache))
+    controller.precalcular()
+    controller.start()
     ultrasonic = Ultrasonic()
+    # El sensor se muestrea siempre en su hilo: al habilitar la marcha ya hay una distancia reciente
+    sampler = UltrasonicSampler(ultrasonic, distance_filter, min_interval=SAMPLE_INTERVAL,
+                                on_sample=controller.update_reading).start()
     
     # Inicializar cliente del servidor
-    client = RobotClient(server_ip="192.168.18.13", server_port=5000, interval=0.8)
+    client = RobotClient(server_ip="192.168.18.13", server_port=5000, interval=0.8, mode="stream")
     
     # Registrar callbacks
     client.set_callbacks(
@@ -195,9 +134,9 @@ def main():
     print("✅ Sistema inicializado. Presiona CTRL+C para salir")
     
     try:
+        # Sensor, movimiento y cliente trabajan en sus hilos; aquí solo se espera a CTRL+C
         while True:
-            run()
-            time.sleep(0.05)
+            time.sleep(1)
                 
     except KeyboardInterrupt:
         print("\n🛑 Deteniendo robot por interrupción del usuario")
@@ -206,6 +145,8 @@ def main():
         # Limpieza
         print("🧹 Cerrando sistema...")
         client.stop()
+        sampler.stop()
+        print(f"📡 Sensor ultrasónico: {sampler.stats()}")
         exit()
         print("✅ Sistema cerrado correctamente")
 
@@ -1,21 +1,46 @@
 # robot_client.py
+import json
+import argparse
 import requests
 import time
 import logging
 import threading
 from datetime import datetime
+from latencias import RelojServidor, HistogramaLatencias
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RobotClient:
-    def __init__(self, server_ip="192.168.18.13", server_port=5000, interval=0.8):
+    def __init__(self, server_ip="192.168.18.13", server_port=5000, interval=0.8,
+                 mode="poll",               # "poll": GET /estado periódico; "stream": suscripción SSE
+                 heartbeat_timeout=3.0,     # sin eventos ni latidos en este tiempo => conexión caída
+                 max_stream_failures=3,     # fallos seguidos del stream antes de pasar a polling
+                 stream_retry_interval=30.0,  # tiempo en polling antes de reintentar el stream
+                 trazas=True,               # mide la latencia cámara -> callback con la traza de /estado
+                 sync_interval=60.0,        # re-sincronización del desfase de reloj con el servidor (s)
+                 reloj=time.time):          # reloj local (inyectable para simular desfases)
         self.estado_url = f"http://{server_ip}:{server_port}/estado"
+        self.stream_url = f"http://{server_ip}:{server_port}/estado/stream"
         self.interval = interval
+        self.mode = mode
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_stream_failures = max_stream_failures
+        self.stream_retry_interval = stream_retry_interval
+        self._stream_resp = None
+        self.reloj = reloj
+        # Latencias de extremo a extremo: desfase con el reloj del servidor e histogramas por salto
+        self.reloj_servidor = (RelojServidor(f"http://{server_ip}:{server_port}/reloj",
+                                             intervalo=sync_interval, reloj=reloj) if trazas else None)
+        self.latencias = HistogramaLatencias()
+        self._traza_recibida = None   # traza del último /estado consultado, con su t_recepcion
+        self._traza_id = None         # última traza medida (los latidos repiten la misma)
         self.personas_presentes = None  # desconocido inicialmente
         self.server_connected = True
         self.running = False
         self._thread = None
+        self._sync_thread = None
+        self._sync_stop = threading.Event()
         
         # Callbacks que el robot puede registrar
         self.on_start_callback = None
@@ -35,28 +60,93 @@ class RobotClient:
                 data = resp.json()
                 personas = bool(data.get("personas_presentes", False))
                 ts = data.get("timestamp", time.time())
+                self._traza_recibida = self._recibir_traza(data)
                 
-                # Marcar servidor como conectado
-                if not self.server_connected:
-                    self.server_connected = True
-                    logger.info("Reconectado al servidor")
-                
+                self._marcar_conectado()
                 return personas, ts
             else:
                 logger.warning(f"Respuesta inesperada del servidor: {resp.status_code}")
                 return None, None
         except Exception as e:
-            # Marcar servidor como desconectado
-            if self.server_connected:
-                self.server_connected = False
-                logger.error(f"Servidor desconectado: {e}")
-                if self.on_server_disconnect_callback:
-                    self.on_server_disconnect_callback()
+            self._marcar_desconectado(e)
             return None, None
 
-    def procesar_estado(self, personas_detectadas, timestamp):
+    def _marcar_conectado(self):
+        if not self.server_connected:
+            self.server_connected = True
+            logger.info("Reconectado al servidor")
+
+    def _marcar_desconectado(self, error):
+        if self.server_connected:
+            self.server_connected = False
+            logger.error(f"Servidor desconectado: {error}")
+            if self.on_server_disconnect_callback:
+                self.on_server_disconnect_callback()
+
+    def suscribir_estado(self):
+        """
+        Consume /estado/stream (Server-Sent Events) hasta que la conexión se cierre.
+        Cada evento, incluidos los latidos, trae el estado completo.
+        Devuelve True si llegó a recibir datos, False si no se pudo suscribir.
+        """
+        recibido = False
+        try:
+            # El timeout de lectura detecta un servidor colgado: los latidos llegan cada ~1 s
+            with requests.get(self.stream_url, stream=True,
+                              timeout=(2, self.heartbeat_timeout)) as resp:
+                if resp.status_code != 200:
+                    logger.warning(f"Respuesta inesperada del stream: {resp.status_code}")
+                    return False
+                self._stream_resp = resp
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not self.running:
+                        break
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:"):])
+                    recibido = True
+                    self._marcar_conectado()
+                    self.procesar_estado(bool(data.get("personas_presentes", False)),
+                                         data.get("timestamp", time.time()),
+                                         self._recibir_traza(data))
+            if self.running:
+                # Cierre limpio por parte del servidor: se trata como caída
+                self._marcar_desconectado("stream cerrado por el servidor")
+        except Exception as e:
+            if self.running:
+                self._marcar_desconectado(e)
+        finally:
+            self._stream_resp = None
+        return recibido
+
+    def _recibir_traza(self, data):
+        """Copia la traza de un estado recibido y le añade la llegada al robot (en el reloj del servidor)."""
+        traza = data.get("traza")
+        if traza is None or self.reloj_servidor is None or self.reloj_servidor.rtt is None:
+            return None               # sin desfase estimado todavía no se puede medir
+        return dict(traza, t_recepcion=self.reloj_servidor.servidor(self.reloj()))
+
+    def _medir_traza(self, traza):
+        # Llamar justo antes del callback de un cambio de estado
+        if traza is None or traza.get("id") == self._traza_id:
+            return
+        self._traza_id = traza.get("id")
+        traza["t_callback"] = self.reloj_servidor.servidor(self.reloj())
+        self.latencias.registrar(traza)
+        logger.info(f"⏱️ Traza {traza.get('id')}: {(traza['t_callback'] - traza['t_captura']) * 1e3:.0f} ms "
+                    f"de la captura al callback")
+
+    def _run_sync_loop(self):
+        """Hilo del desfase de reloj: sus GET /reloj no retrasan la lectura de estados."""
+        while not self._sync_stop.is_set():
+            if self.reloj_servidor.vencido():
+                self.reloj_servidor.sincronizar()
+            self._sync_stop.wait(1.0)
+
+    def procesar_estado(self, personas_detectadas, timestamp, traza=None):
         """
         Procesa cambios de estado y ejecuta callbacks correspondientes.
+        `traza` (opcional) es la del servidor con `t_recepcion`; en un cambio se mide su latencia.
         """
         if personas_detectadas is None:
             # No pudimos consultar, no cambiamos estado
@@ -65,6 +155,8 @@ class RobotClient:
         # Si es la primera vez que consultamos, mostramos estado inicial
         if self.personas_presentes is None:
             self.personas_presentes = personas_detectadas
+            # La traza del estado inicial es de un cambio anterior a la conexión: no se mide
+            self._traza_id = traza.get("id") if traza else None
             fecha_hora = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
             estado_txt = "PERSONAS DETECTADAS" if personas_detectadas else "NO HAY PERSONAS"
             print(f"ℹ️ [{fecha_hora}] Estado inicial: {estado_txt}")
@@ -79,6 +171,7 @@ class RobotClient:
         # Detectar cambios de estado
         if personas_detectadas != self.personas_presentes:
             fecha_hora = datetime.fromtimestamp(timestamp).strftime('%H:%M:%S')
+            self._medir_traza(traza)
             
             if personas_detectadas:
                 print(f"🟢 [{fecha_hora}] SEGUIR PRESENTACIÓN (PERSONAS DETECTADAS)")
@@ -97,15 +190,36 @@ class RobotClient:
             return
             
         self.running = True
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
-        print("🤖 Robot cliente: consultando servidor periódicamente...")
+        if self.reloj_servidor is not None:
+            self._sync_stop.clear()
+            self._sync_thread = threading.Thread(target=self._run_sync_loop, name="reloj-servidor", daemon=True)
+            self._sync_thread.start()
+        if self.mode == "stream":
+            self._thread = threading.Thread(target=self._run_stream_loop, daemon=True)
+            self._thread.start()
+            print("🤖 Robot cliente: suscrito a cambios de estado del servidor...")
+        else:
+            self._thread = threading.Thread(target=self._run_loop, daemon=True)
+            self._thread.start()
+            print("🤖 Robot cliente: consultando servidor periódicamente...")
 
     def stop(self):
         """Detiene el cliente"""
         self.running = False
+        # Cerrar el stream desbloquea la lectura sin esperar al siguiente latido
+        resp = self._stream_resp
+        if resp is not None:
+            try:
+                resp.close()
+            except Exception:
+                pass
+        self._sync_stop.set()
         if self._thread:
             self._thread.join(timeout=2)
+        if self._sync_thread:
+            self._sync_thread.join(timeout=2)
+        if self.latencias.trazas:
+            print(self.latencias.resumen())
         print("\n🛑 Cliente detenido")
 
     def _run_loop(self):
@@ -113,11 +227,41 @@ class RobotClient:
         try:
             while self.running:
                 personas, ts = self.consultar_estado()
-                self.procesar_estado(personas, ts if ts is not None else time.time())
+                self.procesar_estado(personas, ts if ts is not None else time.time(), self._traza_recibida)
                 time.sleep(self.interval)
         except Exception as e:
             logger.error(f"Error en bucle del cliente: {e}")
 
+    def _run_stream_loop(self):
+        """
+        Bucle en modo stream: se reconecta solo con espera creciente y, si el stream
+        falla varias veces seguidas, hace polling durante `stream_retry_interval`.
+        """
+        failures = 0
+        try:
+            while self.running:
+                if self.suscribir_estado():
+                    failures = 0
+                else:
+                    failures += 1
+                if not self.running:
+                    break
+
+                if failures >= self.max_stream_failures:
+                    logger.warning(f"Stream no disponible, usando polling durante {self.stream_retry_interval:.0f}s")
+                    deadline = time.monotonic() + self.stream_retry_interval
+                    while self.running and time.monotonic() < deadline:
+                        personas, ts = self.consultar_estado()
+                        self.procesar_estado(personas, ts if ts is not None else time.time(),
+                                             self._traza_recibida)
+                        time.sleep(self.interval)
+                    failures = 0
+                else:
+                    # Backoff: 0.5 s, 1 s, 2 s...
+                    time.sleep(min(0.5 * (2 ** max(failures - 1, 0)), 5.0))
+        except Exception as e:
+            logger.error(f"Error en bucle del cliente: {e}")
+
     def get_current_state(self):
         """Retorna el estado actual (True si hay personas, False si no, None si desconocido)"""
         if not self.server_connected:
@@ -126,7 +270,17 @@ class RobotClient:
 
 def main():
     """Modo standalone para pruebas"""
-    client = RobotClient(server_ip="192.168.18.13", server_port=5000, interval=0.8)
+    parser = argparse.ArgumentParser(description="Cliente de estado del robot (modo de prueba)")
+    parser.add_argument("--ip", default="192.168.18.13", help="IP del servidor de detección")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--mode", choices=["poll", "stream"], default="stream")
+    parser.add_argument("--sesgo-reloj", type=float, default=0.0,
+                        help="segundos sumados al reloj local: simula otro equipo con ambos extremos en la misma máquina")
+    args = parser.parse_args()
+
+    sesgo = args.sesgo_reloj
+    client = RobotClient(server_ip=args.ip, server_port=args.port, interval=0.8, mode=args.mode,
+                         reloj=lambda: time.time() + sesgo)
     
     def on_start():
         print("-> Robot debería INICIAR movimiento")
@@ -0,0 +1,102 @@
+# sensor_distancia.py
+# Muestreo del sensor ultrasónico en un hilo propio, independiente del loop principal.
+import time
+import logging
+import threading
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# distancia filtrada y cruda (cm), instante de la lectura (monotonic) y número de secuencia
+Lectura = namedtuple("Lectura", ["distance", "raw", "t", "seq"])
+
+
+class UltrasonicSampler:
+    """
+    Lee el sensor tan rápido como responde (`min_interval` impone una pausa mínima
+    entre lecturas: el módulo I2C refresca su registro a su propio ritmo, y leer más
+    deprisa solo repite valores). Cada lectura pasa por `filtro` (DistanceFilter) y se
+    publica como una `Lectura` inmutable con su instante y un número de secuencia
+    creciente, de modo que el consumidor distingue una lectura vieja de una nueva.
+    `on_sample(lectura)` se llama desde este hilo tras cada lectura. Un error del filtro o
+    del callback se registra y se cuenta (`errores_proceso`), pero el muestreo sigue: si el
+    hilo muriera, el consumidor se quedaría con una lectura cada vez más vieja.
+    """
+    def __init__(self, ultrasonic, filtro, min_interval=0.01, on_sample=None, historial=200):
+        self.ultrasonic = ultrasonic
+        self.filtro = filtro
+        self.min_interval = min_interval
+        self.on_sample = on_sample
+
+        self.lectura = None               # última Lectura publicada (lectura atómica del atributo)
+        self.errores = 0                  # lecturas fallidas del sensor
+        self.errores_proceso = 0          # fallos del filtro o de on_sample
+        self.read_times = deque(maxlen=historial)  # duración de getDistance() (s)
+        self._t_lecturas = deque(maxlen=historial)  # instantes de las últimas lecturas
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, name="sensor-ultrasonico", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def _loop(self):
+        seq = 0
+        fallando = False                  # para no llenar el log a 100 Hz con el mismo error
+        while self.running:
+            t0 = time.monotonic()
+            try:
+                raw = self.ultrasonic.getDistance() / 10.0
+            except Exception as e:
+                self.errores += 1
+                logger.warning(f"Error leyendo el sensor ultrasónico: {e}")
+                time.sleep(0.1)
+                continue
+            t1 = time.monotonic()
+            self.read_times.append(t1 - t0)
+            self._t_lecturas.append(t1)
+
+            try:
+                seq += 1
+                self.lectura = Lectura(self.filtro.push(raw), raw, t1, seq)
+                if self.on_sample is not None:
+                    self.on_sample(self.lectura)
+                fallando = False
+            except Exception:
+                self.errores_proceso += 1
+                if not fallando:
+                    logger.exception("Error procesando la lectura del sensor; se sigue muestreando")
+                fallando = True
+
+            espera = self.min_interval - (time.monotonic() - t0)
+            if espera > 0:
+                time.sleep(espera)
+
+    def age(self, lectura=None):
+        """Segundos desde la lectura dada (o la última); None si aún no hay ninguna."""
+        lectura = lectura if lectura is not None else self.lectura
+        return None if lectura is None else time.monotonic() - lectura.t
+
+    def sample_rate(self):
+        """Lecturas por segundo logradas en la ventana reciente."""
+        t = self._t_lecturas
+        if len(t) < 2 or t[-1] == t[0]:
+            return 0.0
+        return (len(t) - 1) / (t[-1] - t[0])
+
+    def stats(self):
+        tiempos = sorted(self.read_times)
+        p50 = tiempos[len(tiempos) // 2] if tiempos else 0.0
+        return {"lecturas": self.lectura.seq if self.lectura else 0,
+                "hz": round(self.sample_rate(), 1),
+                "lectura_p50_ms": round(p50 * 1e3, 2),
+                "lectura_max_ms": round(tiempos[-1] * 1e3, 2) if tiempos else 0.0,
+                "errores": self.errores,
+                "errores_proceso": self.errores_proceso}
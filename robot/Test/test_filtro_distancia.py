@@ -0,0 +1,89 @@
+# test_filtro_distancia.py
+# DistanceFilter: el modo "std" debe dar exactamente la distancia del filtro original con
+# pandas, y el modo "mad" la de una referencia directa con NumPy.
+#
+#   python -m pytest robot/Test/test_filtro_distancia.py
+import numpy as np
+import pytest
+
+pytest.importorskip("pandas")
+
+from bench_filtro import filtro_pandas, lecturas_sinteticas
+from filtro_distancia import DistanceFilter
+
+
+def filtrar(lecturas, ventana):
+    filtro = DistanceFilter(n=ventana, modo="std")
+    return np.array([filtro.push(x) for x in lecturas])
+
+
+@pytest.mark.parametrize("ventana", [2, 5, 25])
+def test_igual_que_pandas(ventana):
+    # Más muestras que `recalc` para cubrir también el recálculo periódico de las sumas
+    lecturas = lecturas_sinteticas(3000, seed=ventana).tolist()
+    np.testing.assert_allclose(filtrar(lecturas, ventana), filtro_pandas(lecturas, ventana),
+                               rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("lecturas", [
+    [42.0] * 50,                         # desviación 0: se promedia todo
+    [30.0, 31.5, 400.0],                 # ventana a medio llenar
+    [50.0],                              # una sola lectura
+    [10.0, 10.0, 10.0, 250.0, 10.0, 10.0, 0.0, 10.0],   # ecos aislados
+], ids=["constantes", "incompleta", "una", "ecos"])
+def test_casos_limite(lecturas):
+    np.testing.assert_allclose(filtrar(lecturas, 5), filtro_pandas(lecturas, 5), rtol=0, atol=1e-9)
+
+
+# ------------------ Modo "mad" ------------------
+def mad_referencia(lecturas, ventana, k_mad=3.0):
+    """Media de la ventana a no más de k_mad * 1.4826 * MAD de la mediana, con NumPy."""
+    salida = []
+    for fin in range(1, len(lecturas) + 1):
+        w = np.asarray(lecturas[max(0, fin - ventana):fin])
+        mediana = np.median(w)
+        limite = k_mad * 1.4826 * np.median(np.abs(w - mediana))
+        dentro = w[np.abs(w - mediana) <= limite]
+        salida.append(dentro.mean() if len(dentro) else w[-1])
+    return np.array(salida)
+
+
+def filtrar_mad(lecturas, ventana):
+    filtro = DistanceFilter(n=ventana, modo="mad")
+    return np.array([filtro.push(x) for x in lecturas])
+
+
+@pytest.mark.parametrize("ventana", [2, 5, 25])
+def test_mad_igual_que_referencia(ventana):
+    lecturas = lecturas_sinteticas(2000, seed=ventana).tolist()
+    np.testing.assert_allclose(filtrar_mad(lecturas, ventana), mad_referencia(lecturas, ventana),
+                               rtol=0, atol=1e-9)
+
+
+def test_mad_descarta_ecos():
+    # Un eco espurio no mueve la estimación, aunque la dispersión sea pequeña
+    lecturas = [50.0, 50.4, 49.8, 50.2, 50.0, 400.0, 50.1, 0.0, 49.9]
+    salida = filtrar_mad(lecturas, 5)
+    assert salida[5] == pytest.approx(np.mean([50.4, 49.8, 50.2, 50.0]))
+    assert salida[7] == pytest.approx(np.mean([50.2, 50.0, 50.1]))
+    assert np.all(np.abs(salida - 50) < 0.5)
+
+
+def test_mad_ventana_llenandose():
+    filtro = DistanceFilter(n=5, modo="mad")
+    assert filtro.push(30.0) == 30.0                  # una lectura: se devuelve tal cual
+    assert filtro.push(31.5) == pytest.approx(30.75)
+    assert filtro.push(200.0) == pytest.approx(30.75)  # mediana 31.5, MAD 1.5: el eco se descarta
+    for x in (30.5, 31.0, 30.0, 31.0):
+        filtro.push(x)
+    # Ventana llena y desplazada: quedan [200, 30.5, 31, 30, 31]; el eco sigue dentro pero se descarta
+    assert filtro.distance == pytest.approx(np.mean([30.5, 31.0, 30.0, 31.0]))
+
+
+def test_mad_ventana_constante():
+    # MAD = 0: solo cuentan las muestras iguales a la mediana, sin dividir por cero
+    filtro = DistanceFilter(n=5, modo="mad")
+    for _ in range(10):
+        assert filtro.push(42.0) == 42.0
+    assert filtro.push(300.0) == 42.0
+    assert filtro.push(0.0) == 42.0
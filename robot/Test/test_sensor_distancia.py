@@ -0,0 +1,59 @@
+# test_sensor_distancia.py
+# UltrasonicSampler sigue muestreando aunque fallen el filtro o el callback.
+#
+#   python -m pytest robot/Test/test_sensor_distancia.py
+import time
+
+from filtro_distancia import DistanceFilter
+from sensor_distancia import UltrasonicSampler
+
+
+class UltrasonicFalso:
+    """Devuelve 500 mm (50 cm) en cada lectura, como Ultrasonic.getDistance()."""
+    def getDistance(self):
+        return 500
+
+
+def esperar(condicion, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.005)
+    return condicion()
+
+
+def test_callback_que_falla_no_detiene_el_muestreo():
+    recibidas = []
+
+    def on_sample(lectura):
+        recibidas.append(lectura.seq)
+        if lectura.seq % 2:
+            raise RuntimeError("fallo del consumidor")
+
+    sampler = UltrasonicSampler(UltrasonicFalso(), DistanceFilter(5), min_interval=0.001,
+                                on_sample=on_sample).start()
+    try:
+        assert esperar(lambda: len(recibidas) >= 20)
+        assert sampler._thread.is_alive()
+        assert sampler.errores_proceso >= 10
+        assert sampler.lectura.distance == 50.0
+    finally:
+        sampler.stop()
+    assert sampler.stats()["errores_proceso"] == sampler.errores_proceso
+
+
+def test_filtro_que_falla_no_detiene_el_muestreo():
+    class FiltroRoto(DistanceFilter):
+        fallos = 3
+
+        def push(self, x):
+            if self.fallos:
+                self.fallos -= 1
+                raise ValueError("fallo del filtro")
+            return super().push(x)
+
+    sampler = UltrasonicSampler(UltrasonicFalso(), FiltroRoto(5), min_interval=0.001).start()
+    try:
+        assert esperar(lambda: sampler.lectura is not None and sampler.lectura.seq > 10)
+        assert sampler.errores_proceso == 3
+    finally:
+        sampler.stop()